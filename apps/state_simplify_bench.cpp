@@ -0,0 +1,177 @@
+#include <algorithm>
+#include <chrono>
+#include <dirent.h>
+#include <queue>
+#include <unordered_map>
+#include "assert.h"
+#include "config/testpath.h"
+#include "framework/sim_stats.h"
+#include "framework/state_simplify.h"
+#include "framework/term_manip.h"
+#include "frontend/state_read_write.h"
+#include "smt-switch/boolector_factory.h"
+
+using namespace wasim;
+using namespace std;
+using namespace chrono;
+
+// the number of visits of a walk that follows every path of t
+// (what the simplification passes did before they were DAG-aware),
+// saturates at UINT64_MAX
+static uint64_t tree_size(const smt::Term & t,
+                          std::unordered_map<smt::Term, uint64_t> & memo)
+{
+  smt::TermVec stack{ t };
+  while (!stack.empty()) {
+    auto n = stack.back();
+    if (memo.find(n) != memo.end()) {
+      stack.pop_back();
+      continue;
+    }
+    bool ready = true;
+    for (auto pos = n->begin(); pos != n->end(); ++pos)
+      if (memo.find(*pos) == memo.end()) {
+        stack.push_back(*pos);
+        ready = false;
+      }
+    if (!ready)
+      continue;
+    stack.pop_back();
+    uint64_t size = 1;
+    for (auto pos = n->begin(); pos != n->end(); ++pos) {
+      auto c = memo.at(*pos);
+      size = (c > UINT64_MAX - size) ? UINT64_MAX : size + c;
+    }
+    memo.emplace(n, size);
+  }
+  return memo.at(t);
+}
+
+// expr_simplify_ite as it was before the DAG-aware walk: a shared node is
+// expanded again on every path to it, and is_reducible_bool is called on
+// an ITE condition each time it is reached (until it is found reducible)
+static smt::Term old_simplify_ite(const smt::Term & expr,
+                                  const smt::TermVec & assumptions,
+                                  const smt::SmtSolver & solver)
+{
+  smt::UnorderedTermSet cond_set;
+  std::queue<smt::Term> que;
+  que.push(expr);
+  auto T = solver->make_term(1);
+  auto F = solver->make_term(0);
+  smt::UnorderedTermMap subst_map;
+  while (que.size() != 0) {
+    auto node = que.front();
+    que.pop();
+    if (node->get_op() == smt::Ite) {
+      auto childern = args(node);
+      auto cond = childern.at(0);
+      if (cond_set.find(cond) == cond_set.end()) {
+        auto reducible = is_reducible_bool(cond, assumptions, solver);
+        if (reducible == 0) {
+          cond_set.insert(cond);
+          subst_map[cond] = F;
+          que.push(childern.at(2));
+        } else if (reducible == 1) {
+          cond_set.insert(cond);
+          subst_map[cond] = T;
+          que.push(childern.at(1));
+        } else {
+          for (const auto & c : childern)
+            que.push(c);
+        }
+      }
+    } else {
+      for (const auto & c : args(node))
+        que.push(c);
+    }
+  }
+  return solver->substitute(expr, subst_map);
+}
+
+// the old walk is only timed on terms with at most this many path visits
+static const uint64_t OLD_WALK_LIMIT = 100000000;
+
+// time the passes of state_simplify on the states saved in a directory
+static void bench_dir(const std::string & dir, size_t max_states)
+{
+  std::vector<std::string> files;
+  DIR * d = opendir(dir.c_str());
+  if (d == NULL) {
+    cout << dir << " : not found" << endl;
+    return;
+  }
+  while (struct dirent * e = readdir(d)) {
+    std::string name = e->d_name;
+    if (name.compare(0, 12, "state_asmpt_") == 0)
+      files.push_back(dir + name);
+  }
+  closedir(d);
+  std::sort(files.begin(), files.end());
+  if (max_states != 0 && files.size() > max_states)
+    files.resize(max_states);
+
+  uint64_t num_dag = 0, num_tree = 0;
+  double t_contains = 0, t_ite = 0, t_ite_dag = 0, t_ite_old = 0;
+  size_t num_terms = 0, num_old_skipped = 0;
+  for (const auto & f : files) {
+    smt::SmtSolver solver = smt::BoolectorSolverFactory::create(false);
+    solver->set_logic("QF_UFBV");
+    solver->set_opt("incremental", "true");
+    solver->set_opt("produce-models", "true");
+    solver->set_opt("produce-unsat-assumptions", "true");
+    StateRW staterw(solver);
+    auto s = staterw.StateRead(f);
+
+    std::unordered_map<smt::Term, uint64_t> memo;
+    smt::UnorderedTermSet no_xvar;
+    ReducibleMemo cond_memo;
+    for (const auto & sv : s.get_sv()) {
+      num_dag += SimStats::dag_size(sv.second);
+      auto tree = tree_size(sv.second, memo);
+      num_tree = (tree > UINT64_MAX - num_tree) ? UINT64_MAX : num_tree + tree;
+
+      // no X : the walk has to visit the whole term
+      auto start = steady_clock::now();
+      expr_contains_X(sv.second, no_xvar);
+      auto mid = steady_clock::now();
+      expr_simplify_ite(sv.second, s.get_assumptions(), solver, cond_memo);
+      auto end = steady_clock::now();
+      t_contains += duration<double>(mid - start).count();
+      t_ite += duration<double>(end - mid).count();
+
+      // both versions of expr_simplify_ite on the same terms, each
+      // with the conditions of this term only
+      ++num_terms;
+      if (tree > OLD_WALK_LIMIT) {
+        ++num_old_skipped;
+        continue;
+      }
+      start = steady_clock::now();
+      expr_simplify_ite(sv.second, s.get_assumptions(), solver);
+      mid = steady_clock::now();
+      old_simplify_ite(sv.second, s.get_assumptions(), solver);
+      end = steady_clock::now();
+      t_ite_dag += duration<double>(mid - start).count();
+      t_ite_old += duration<double>(end - mid).count();
+    }
+  }
+
+  cout << dir << " : " << files.size() << " states" << endl;
+  cout << "  DAG nodes : " << num_dag << ", visits of a walk over all paths : "
+       << num_tree << endl;
+  cout << "  expr_contains_X : " << t_contains << " (s)" << endl;
+  cout << "  expr_simplify_ite : " << t_ite << " (s)" << endl;
+  cout << "  expr_simplify_ite on " << num_terms - num_old_skipped << " of "
+       << num_terms << " terms, DAG walk : " << t_ite_dag
+       << " (s), old queue walk : " << t_ite_old << " (s)" << endl;
+}
+
+// usage: state_simplify_bench [max states per directory]
+int main(int argc, char ** argv)
+{
+  size_t max_states = argc > 1 ? std::stoul(argv[1]) : 0;
+  bench_dir(PROJECT_SOURCE_DIR "/output/c3/", max_states);
+  bench_dir(PROJECT_SOURCE_DIR "/output/c4/", max_states);
+  return 0;
+}
@@ -63,8 +63,10 @@ smt::TermVec tag2asmpt_c1(std::string flag,
   return ret;
 }
 
-int main()
+int main(int argc, char ** argv)
 {
+  // the threads of each one-step traversal, 0 : the number of cores
+  unsigned num_workers = argc > 1 ? std::stoul(argv[1]) : 1;
   auto start = system_clock::now();
   std::unordered_set<std::string> base_sv = {
     "wen_stage1", "wen_stage2", "stage1", "stage2", "stage3"
@@ -125,7 +127,8 @@ int main()
       asmpt_tag0_1,
       { { "tag0", 1 }, { "tag1", 0 }, { "tag2", 0 }, { "tag3", 0 } },
       order,
-      solver);
+      solver,
+      num_workers);
 
   // step: tag1 --> tag1
   cout << "\n\n\nstep: tag1 --> tag1" << endl;
@@ -153,7 +156,8 @@ int main()
       asmpt_tag1_2,
       { { "tag0", 0 }, { "tag1", 1 }, { "tag2", 0 }, { "tag3", 0 } },
       order,
-      solver);
+      solver,
+      num_workers);
 
   // step: tag2 --> tag2
   cout << "\n\n\nstep: tag2 --> tag2" << endl;
@@ -181,7 +185,8 @@ int main()
       asmpt_tag2_3,
       { { "tag0", 0 }, { "tag1", 0 }, { "tag2", 1 }, { "tag3", 0 } },
       order,
-      solver);
+      solver,
+      num_workers);
 
   // step: tag3 --> tag3
   cout << "\n\n\nstep: tag3 --> tag3" << endl;
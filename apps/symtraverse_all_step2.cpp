@@ -78,8 +78,10 @@ smt::TermVec tag2asmpt_c2(std::string flag,
   return { solver->make_term(smt::And, ret) };
 }
 
-int main()
+int main(int argc, char ** argv)
 {
+  // the threads of each one-step traversal, 0 : the number of cores
+  unsigned num_workers = argc > 1 ? std::stoul(argv[1]) : 1;
   auto start = system_clock::now();
   std::unordered_set<std::string> base_sv = {
     "RTL_id_ex_operand1", "RTL_id_ex_operand2", "RTL_id_ex_op",
@@ -189,7 +191,8 @@ int main()
                              { "ppl_stage_wb", 0 },
                              { "ppl_stage_finish", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   cout << "step: ex --> ex" << endl;
   auto asmpt_ex_ex = tag2asmpt_c2("ex-ex", simulator, solver);
@@ -224,7 +227,8 @@ int main()
                              { "ppl_stage_wb", 0 },
                              { "ppl_stage_finish", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   cout << "step: wb --> wb" << endl;
   auto asmpt_wb_wb = tag2asmpt_c2("wb-wb", simulator, solver);
@@ -258,7 +262,8 @@ int main()
                              { "ppl_stage_wb", 1 },
                              { "ppl_stage_finish", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   auto end = system_clock::now();
   auto duration = duration_cast<seconds>(end - start);
@@ -99,8 +99,10 @@ smt::TermVec tag2asmpt_c3(std::string flag,
   return { solver->make_term(smt::And, ret) };
 }
 
-int main()
+int main(int argc, char ** argv)
 {
+  // the threads of each one-step traversal, 0 : the number of cores
+  unsigned num_workers = argc > 1 ? std::stoul(argv[1]) : 1;
   auto start = system_clock::now();
   std::unordered_set<std::string> base_sv = {
     "RTL_if_id_inst",     "RTL_if_id_valid",   "RTL_id_ex_operand1",
@@ -224,7 +226,8 @@ int main()
                              { "stage_tracker_ex_wb_iuv", 0 },
                              { "stage_tracker_wb_iuv", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   cout << "step: id --> id" << endl;
   asmpt_input.clear();
@@ -266,7 +269,8 @@ int main()
                              { "stage_tracker_ex_wb_iuv", 0 },
                              { "stage_tracker_wb_iuv", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   cout << "step: ex --> ex" << endl;
   asmpt_input.clear();
@@ -305,7 +309,8 @@ int main()
                              { "stage_tracker_ex_wb_iuv", 0 },
                              { "stage_tracker_wb_iuv", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   cout << "step: wb --> wb" << endl;
   asmpt_input.clear();
@@ -342,7 +347,8 @@ int main()
                              { "stage_tracker_ex_wb_iuv", 1 },
                              { "stage_tracker_wb_iuv", 0 } },
                            order,
-                           solver);
+                           solver,
+                           num_workers);
 
   auto end = system_clock::now();
   auto duration = duration_cast<seconds>(end - start);
@@ -2,6 +2,12 @@
 
 #include "smt-switch/boolector_factory.h"
 
+#include <algorithm>
+#include <exception>
+#include <memory>
+#include <set>
+#include <thread>
+
 namespace wasim {
 // TODO: need to distinguish constant and op?
 bool e_is_always_valid(const smt::Term & e,
@@ -85,51 +91,177 @@ bool e_is_independent_of_v(const smt::Term & e,
   // context of the original solver clear from the new variables we created
   // locally in this function I was hoping push/pop can be used to create
   // temporary SMT variables however, it is not the case.
+  // (the checker keeps them in a local solver of its own)
+  IndependenceChecker checker(assumptions);
+  return checker.is_independent(e, v);
+}
 
+static smt::SmtSolver make_local_solver()
+{
   auto localSolver = smt::BoolectorSolverFactory::create(false);
   localSolver->set_logic("QF_UFBV");
   localSolver->set_opt("incremental", "true");
   localSolver->set_opt("produce-models", "true");
   localSolver->set_opt("produce-unsat-assumptions", "true");
-  smt::TermTranslator translator(localSolver);
-
-  auto e_local = translator.transfer_term(e);
-  auto v_local = translator.transfer_term(v);
-
-  auto w = v_local->get_sort()->get_width();
-  auto sort_w = localSolver->make_sort(smt::BV, w);
-
-  // I think we should never use get_symbol in this function
-  // if it succeeds, it means there has been such a variable (maybe already in
-  // use) but we want a fresh one, which does not interfere with the
-  // constraints!
-  smt::Term v1 = try_get_fresh_variable_in_a_solver(
-      v_local->to_string(), "1", sort_w, localSolver);
-  smt::Term v2 = try_get_fresh_variable_in_a_solver(
-      v_local->to_string(), "2", sort_w, localSolver);
-
-  smt::UnorderedTermMap sub_map1, sub_map2;
-  sub_map1 = { { v_local, v1 } };
-  sub_map2 = { { v_local, v2 } };
-  auto e1 = localSolver->substitute(e_local, sub_map1);
-  auto e2 = localSolver->substitute(e_local, sub_map2);
-
-  auto e1_neq_e2 = localSolver->make_term(
-      smt::Not, localSolver->make_term(smt::Equal, e1, e2));
-  localSolver->push();
-  localSolver->assert_formula(e1_neq_e2);
-
-  // cout << "assump: " << assumptionSub_expr << endl;
-  for (const auto & a : assumptions) {
-    auto a_local = translator.transfer_term(a);
-    localSolver->assert_formula(localSolver->substitute(a_local, sub_map1));
-    localSolver->assert_formula(localSolver->substitute(a_local, sub_map2));
+  return localSolver;
+}
+
+IndependenceChecker::LocalContext::LocalContext(
+    const smt::TermVec & assumptions_in)
+    : solver(make_local_solver()), translator(solver), num_act(0)
+{
+  for (const auto & a : assumptions_in)
+    assumptions.push_back(translator.transfer_term(a));
+}
+
+IndependenceChecker::ExprVarPair IndependenceChecker::LocalContext::translate(
+    const ExprVarPair & p)
+{
+  return { translator.transfer_term(p.first),
+           translator.transfer_term(p.second) };
+}
+
+smt::Term IndependenceChecker::LocalContext::fresh_act()
+{
+  auto bool_sort = solver->make_sort(smt::BOOL);
+  return try_get_fresh_variable_in_a_solver(
+      "__indep_act" + std::to_string(num_act++), "_", bool_sort, solver);
+}
+
+bool IndependenceChecker::LocalContext::is_independent(const smt::Term & e,
+                                                       const smt::Term & v)
+{
+  auto pos = copies.find(v);
+  if (pos == copies.end()) {
+    // I think we should never use get_symbol in this function
+    // if it succeeds, it means there has been such a variable (maybe already
+    // in use) but we want a fresh one, which does not interfere with the
+    // constraints!
+    VarCopies c;
+    c.v1 = try_get_fresh_variable_in_a_solver(
+        v->to_string(), "1", v->get_sort(), solver);
+    c.v2 = try_get_fresh_variable_in_a_solver(
+        v->to_string(), "2", v->get_sort(), solver);
+    c.act = fresh_act();
+    smt::UnorderedTermMap sub_map1 = { { v, c.v1 } };
+    smt::UnorderedTermMap sub_map2 = { { v, c.v2 } };
+    for (const auto & a : assumptions) {
+      solver->assert_formula(solver->make_term(
+          smt::Implies, c.act, solver->substitute(a, sub_map1)));
+      solver->assert_formula(solver->make_term(
+          smt::Implies, c.act, solver->substitute(a, sub_map2)));
+    }
+    pos = copies.emplace(v, c).first;
   }
+  const auto & c = pos->second;
 
-  auto r = localSolver->check_sat();
-  localSolver->pop();
+  smt::UnorderedTermMap sub_map1 = { { v, c.v1 } };
+  smt::UnorderedTermMap sub_map2 = { { v, c.v2 } };
+  auto e1 = solver->substitute(e, sub_map1);
+  auto e2 = solver->substitute(e, sub_map2);
+  auto e1_neq_e2 =
+      solver->make_term(smt::Not, solver->make_term(smt::Equal, e1, e2));
 
+  auto act = fresh_act();
+  solver->assert_formula(solver->make_term(smt::Implies, act, e1_neq_e2));
+  auto r = solver->check_sat_assuming(smt::TermVec{ c.act, act });
+  // retire the query, its literal will never be assumed again
+  solver->assert_formula(solver->make_term(smt::Not, act));
   return r.is_unsat();
 }
 
+IndependenceChecker::IndependenceChecker(const smt::TermVec & assumptions)
+    : assumptions_(assumptions), ctx_(assumptions), num_queries_(0), num_hits_(0)
+{
+}
+
+std::pair<size_t, size_t> IndependenceChecker::key_of(const ExprVarPair & p)
+{
+  return { p.first->get_id(), p.second->get_id() };
+}
+
+bool IndependenceChecker::is_independent(const smt::Term & e,
+                                         const smt::Term & v)
+{
+  return check({ { e, v } }, 1).at(0);
+}
+
+std::vector<bool> IndependenceChecker::check(
+    const std::vector<ExprVarPair> & pairs, unsigned num_threads /*=1*/)
+{
+  // the pairs to solve, each once
+  std::vector<size_t> todo;
+  std::set<std::pair<size_t, size_t>> todo_keys;
+  for (size_t idx = 0; idx < pairs.size(); ++idx) {
+    ++num_queries_;
+    auto key = key_of(pairs.at(idx));
+    if (memo_.find(key) == memo_.end() && todo_keys.insert(key).second)
+      todo.push_back(idx);
+    else
+      ++num_hits_;
+  }
+
+  if (num_threads == 0)
+    num_threads = std::max(1u, std::thread::hardware_concurrency());
+  if (num_threads > todo.size())
+    num_threads = std::max<size_t>(1, todo.size());
+
+  // worker 0 uses ctx_, the others get a context for this batch only
+  std::vector<std::unique_ptr<LocalContext>> extra;
+  std::vector<LocalContext *> ctxs{ &ctx_ };
+  for (unsigned t = 1; t < num_threads; ++t) {
+    extra.emplace_back(new LocalContext(assumptions_));
+    ctxs.push_back(extra.back().get());
+  }
+
+  // translation reads the caller's terms, so it is done here
+  std::vector<ExprVarPair> local(todo.size());
+  for (size_t k = 0; k < todo.size(); ++k)
+    local.at(k) = ctxs.at(k % num_threads)->translate(pairs.at(todo.at(k)));
+
+  std::vector<char> result(todo.size(), 0);
+  auto work = [&](unsigned t) {
+    for (size_t k = t; k < todo.size(); k += num_threads)
+      result.at(k) = ctxs.at(t)->is_independent(local.at(k).first,
+                                                local.at(k).second);
+  };
+
+  if (num_threads == 1)
+    work(0);
+  else {
+    std::vector<std::thread> workers;
+    std::vector<std::exception_ptr> errors(num_threads);
+    for (unsigned t = 0; t < num_threads; ++t)
+      workers.emplace_back([&, t]() {
+        try {
+          work(t);
+        } catch (...) {
+          errors.at(t) = std::current_exception();
+        }
+      });
+    for (auto & w : workers)
+      w.join();
+    for (const auto & err : errors)
+      if (err)
+        std::rethrow_exception(err);
+  }
+
+  for (size_t k = 0; k < todo.size(); ++k)
+    memo_.emplace(key_of(pairs.at(todo.at(k))),
+                  std::make_pair(pairs.at(todo.at(k)), (bool)result.at(k)));
+  std::vector<bool> ret(pairs.size());
+  for (size_t idx = 0; idx < pairs.size(); ++idx)
+    ret.at(idx) = memo_.at(key_of(pairs.at(idx))).second;
+  return ret;
+}
+
+std::vector<bool> e_is_independent_of_v_batch(
+    const std::vector<std::pair<smt::Term, smt::Term>> & pairs,
+    const smt::TermVec & assumptions,
+    unsigned num_threads /*=1*/)
+{
+  IndependenceChecker checker(assumptions);
+  return checker.check(pairs, num_threads);
+}
+
 }  // namespace wasim
@@ -1,6 +1,10 @@
 #pragma once
 
+#include <map>
 #include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
 // #include <iomanip>
 // #include <unordered_map>
 
@@ -49,6 +53,71 @@ bool e_is_independent_of_v(const smt::Term & e,
   // locally in this function I was hoping push/pop can be used to create
   // temporary SMT variables however, it is not the case.
 
+// checks e_is_independent_of_v for many (e, v) pairs under the same
+// assumptions. Instead of a new solver for every pair, a local solver is
+// kept and the two copies of v (and of the assumptions) are made once and
+// guarded by activation literals, so a query only enables what it needs.
+// Results are memoized by the ids of e and v.
+class IndependenceChecker
+{
+ public:
+  typedef std::pair<smt::Term, smt::Term> ExprVarPair;
+
+  IndependenceChecker(const smt::TermVec & assumptions);
+
+  bool is_independent(const smt::Term & e, const smt::Term & v);
+  // the pairs not seen before are split over num_threads workers
+  // (0 : the number of cores), each with a local solver of its own.
+  // By default they are checked on the calling thread in ctx_
+  std::vector<bool> check(const std::vector<ExprVarPair> & pairs,
+                          unsigned num_threads = 1);
+
+  size_t num_queries() const { return num_queries_; }
+  size_t num_hits() const { return num_hits_; }
+
+ protected:
+  // a local solver and what has been made in it
+  struct LocalContext
+  {
+    LocalContext(const smt::TermVec & assumptions);
+
+    struct VarCopies
+    {
+      smt::Term v1, v2;
+      smt::Term act;  // act => assumptions[v/v1] and assumptions[v/v2]
+    };
+
+    smt::SmtSolver solver;
+    smt::TermTranslator translator;
+    smt::TermVec assumptions;  // in solver
+    std::unordered_map<smt::Term, VarCopies> copies;  // keyed by local v
+    size_t num_act;
+
+    // reads the caller's terms, so it is only called on the calling thread
+    ExprVarPair translate(const ExprVarPair & p);
+    // e and v are local terms, only the local solver is used
+    bool is_independent(const smt::Term & e, const smt::Term & v);
+    smt::Term fresh_act();
+  };
+
+  smt::TermVec assumptions_;
+  LocalContext ctx_;  // used when there is a single worker
+  // (id of e, id of v) -> (e, v, result), e and v are kept alive so that
+  // their ids are not reused
+  std::map<std::pair<size_t, size_t>, std::pair<ExprVarPair, bool>> memo_;
+  size_t num_queries_;
+  size_t num_hits_;
+
+  static std::pair<size_t, size_t> key_of(const ExprVarPair & p);
+};
+
+// e_is_independent_of_v for each pair, with an IndependenceChecker that
+// is dropped afterwards, so more workers only pay off on large batches
+std::vector<bool> e_is_independent_of_v_batch(
+    const std::vector<std::pair<smt::Term, smt::Term>> & pairs,
+    const smt::TermVec & assumptions,
+    unsigned num_threads = 1);
+
 // bool is_valid(smt::Term e, smt::SmtSolver& s); // no test
 
 }  // namespace wasim
@@ -0,0 +1,104 @@
+#include "query_cache.h"
+
+#include <algorithm>
+
+namespace wasim {
+
+smt::TermVec QueryCache::normalize(const smt::TermVec & query)
+{
+  smt::TermVec key(query);
+  // equal hashes are ordered by id, so that equal terms end up next to
+  // each other and the order does not depend on the query
+  std::sort(key.begin(), key.end(), [](const smt::Term & a, const smt::Term & b) {
+    auto ha = a->hash();
+    auto hb = b->hash();
+    return ha != hb ? ha < hb : a->get_id() < b->get_id();
+  });
+  key.erase(std::unique(key.begin(), key.end()), key.end());
+  return key;
+}
+
+size_t QueryCache::hash_key(const smt::TermVec & key)
+{
+  size_t h = key.size();
+  for (const auto & t : key)
+    h ^= t->hash() + 0x9e3779b97f4a7c15ULL + (h << 6) + (h >> 2);
+  return h;
+}
+
+std::list<QueryCache::Entry>::iterator QueryCache::find(
+    const smt::TermVec & key, size_t h)
+{
+  auto range = index_.equal_range(h);
+  for (auto pos = range.first; pos != range.second; ++pos) {
+    if (pos->second->key == key)
+      return pos->second;
+  }
+  return lru_.end();
+}
+
+const smt::Result * QueryCache::lookup(const smt::TermVec & query)
+{
+  if (!enabled())
+    return NULL;
+
+  auto key = normalize(query);
+  auto h = hash_key(key);
+  auto pos = find(key, h);
+  if (pos == lru_.end()) {
+    ++misses_;
+    return NULL;
+  }
+  ++hits_;
+  lru_.splice(lru_.begin(), lru_, pos);  // iterators stay valid
+  return &(pos->res);
+}
+
+void QueryCache::insert(const smt::TermVec & query, const smt::Result & res)
+{
+  if (!enabled() || res.is_unknown())
+    return;
+
+  auto key = normalize(query);
+  auto h = hash_key(key);
+  auto pos = find(key, h);
+  if (pos != lru_.end()) {
+    pos->res = res;
+    lru_.splice(lru_.begin(), lru_, pos);
+    return;
+  }
+  lru_.emplace_front(key, h, res);
+  index_.emplace(h, lru_.begin());
+  evict();
+}
+
+void QueryCache::evict()
+{
+  while (lru_.size() > capacity_) {
+    auto last = std::prev(lru_.end());
+    auto range = index_.equal_range(last->hash);
+    for (auto pos = range.first; pos != range.second; ++pos) {
+      if (pos->second == last) {
+        index_.erase(pos);
+        break;
+      }
+    }
+    lru_.pop_back();
+  }
+}
+
+void QueryCache::set_capacity(size_t capacity)
+{
+  capacity_ = capacity;
+  evict();
+}
+
+void QueryCache::clear()
+{
+  lru_.clear();
+  index_.clear();
+  hits_ = 0;
+  misses_ = 0;
+}
+
+}  // namespace wasim
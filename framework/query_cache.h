@@ -0,0 +1,62 @@
+#pragma once
+
+#include "smt-switch/smt.h"
+
+#include <list>
+#include <unordered_map>
+#include <vector>
+
+namespace wasim {
+
+/// an LRU cache of satisfiability results, a query is the set of formulas
+/// that are checked together (the goal and all the assumptions)
+/// a capacity of 0 disables the cache
+class QueryCache
+{
+ public:
+  QueryCache(size_t capacity = 0) : capacity_(capacity), hits_(0), misses_(0)
+  {
+  }
+
+  /// returns the cached result of the query, or NULL if it is not cached
+  const smt::Result * lookup(const smt::TermVec & query);
+  /// record the result of a query, unknown results are not recorded
+  void insert(const smt::TermVec & query, const smt::Result & res);
+
+  bool enabled() const { return capacity_ != 0; }
+  void set_capacity(size_t capacity);
+  void clear();
+
+  size_t size() const { return lru_.size(); }
+  size_t capacity() const { return capacity_; }
+  size_t hits() const { return hits_; }
+  size_t misses() const { return misses_; }
+
+ protected:
+  struct Entry
+  {
+    Entry(const smt::TermVec & k, size_t h, const smt::Result & r)
+        : key(k), hash(h), res(r)
+    {
+    }
+    smt::TermVec key;  // normalized query
+    size_t hash;
+    smt::Result res;
+  };
+
+  size_t capacity_;
+  size_t hits_;
+  size_t misses_;
+  /// most recently used entries first
+  std::list<Entry> lru_;
+  std::unordered_multimap<size_t, std::list<Entry>::iterator> index_;
+
+  /// sort (by term hash, then id) and remove duplicates, so the key is a set
+  static smt::TermVec normalize(const smt::TermVec & query);
+  static size_t hash_key(const smt::TermVec & key);
+
+  std::list<Entry>::iterator find(const smt::TermVec & key, size_t h);
+  void evict();
+};
+
+}  // namespace wasim
@@ -0,0 +1,77 @@
+#pragma once
+
+#include <memory>
+#include <vector>
+
+namespace wasim {
+
+/// a vector of frames whose copies share the frames, a shared frame is
+/// copied only when it is modified (through mutable_back). So copying the
+/// whole history of a simulator only copies pointers
+template <typename T>
+class SharedFrames
+{
+ protected:
+  typedef std::vector<std::shared_ptr<T>> storage_type;
+  storage_type frames_;
+
+ public:
+  class const_iterator
+  {
+   public:
+    const_iterator(typename storage_type::const_iterator pos) : pos_(pos) {}
+    const T & operator*() const { return **pos_; }
+    const T * operator->() const { return pos_->get(); }
+    const_iterator & operator++()
+    {
+      ++pos_;
+      return *this;
+    }
+    bool operator==(const const_iterator & other) const
+    {
+      return pos_ == other.pos_;
+    }
+    bool operator!=(const const_iterator & other) const
+    {
+      return pos_ != other.pos_;
+    }
+
+   protected:
+    typename storage_type::const_iterator pos_;
+  };
+
+  size_t size() const { return frames_.size(); }
+  bool empty() const { return frames_.empty(); }
+  const T & at(size_t idx) const { return *frames_.at(idx); }
+  const T & back() const { return *frames_.back(); }
+  const_iterator begin() const { return const_iterator(frames_.begin()); }
+  const_iterator end() const { return const_iterator(frames_.end()); }
+
+  /// the last frame, copied first if it is shared
+  T & mutable_back()
+  {
+    auto & f = frames_.back();
+    if (f.use_count() > 1)
+      f = std::make_shared<T>(*f);
+    return *f;
+  }
+
+  void push_back(T frame)
+  {
+    frames_.push_back(std::make_shared<T>(std::move(frame)));
+  }
+  void pop_back() { frames_.pop_back(); }
+  void clear() { frames_.clear(); }
+
+  /// the number of leading frames that are the same objects in other
+  size_t common_prefix(const SharedFrames & other) const
+  {
+    size_t idx = 0;
+    while (idx < frames_.size() && idx < other.frames_.size()
+           && frames_[idx] == other.frames_[idx])
+      ++idx;
+    return idx;
+  }
+};
+
+}  // namespace wasim
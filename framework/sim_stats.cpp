@@ -0,0 +1,62 @@
+#include "sim_stats.h"
+
+#include <vector>
+
+namespace wasim {
+
+SimStats::Timer::Timer(SimStats & stats, const char * phase)
+    : stats_(stats.enabled() ? &stats : NULL), phase_(phase)
+{
+  if (stats_)
+    start_ = std::chrono::steady_clock::now();
+}
+
+SimStats::Timer::~Timer()
+{
+  if (stats_) {
+    std::chrono::duration<double> d =
+        std::chrono::steady_clock::now() - start_;
+    stats_->record_phase(phase_, d.count());
+  }
+}
+
+void SimStats::reset()
+{
+  phases_.clear();
+  solver_ = SolverCalls();
+}
+
+void SimStats::record_phase(const std::string & phase, double seconds)
+{
+  auto & p = phases_[phase];
+  p.calls++;
+  p.seconds += seconds;
+}
+
+void SimStats::record_solver(const smt::Result & res, double seconds)
+{
+  if (res.is_sat())
+    solver_.sat++;
+  else if (res.is_unsat())
+    solver_.unsat++;
+  else
+    solver_.unknown++;
+  solver_.seconds += seconds;
+}
+
+size_t SimStats::dag_size(const smt::Term & t)
+{
+  smt::UnorderedTermSet visited;
+  std::vector<smt::Term> stack{ t };
+  while (!stack.empty()) {
+    smt::Term n = stack.back();
+    stack.pop_back();
+    if (!visited.insert(n).second)
+      continue;
+    for (auto pos = n->begin(); pos != n->end(); ++pos)
+      stack.push_back(*pos);
+  }
+  return visited.size();
+}
+
+}  // namespace wasim
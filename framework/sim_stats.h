@@ -0,0 +1,62 @@
+#pragma once
+
+#include "smt-switch/smt.h"
+
+#include <chrono>
+#include <map>
+#include <string>
+
+namespace wasim {
+
+/// counters and timers of a SymbolicSimulator, disabled by default
+/// (then the timers do not even read the clock)
+class SimStats
+{
+ public:
+  struct Phase
+  {
+    size_t calls = 0;
+    double seconds = 0;
+  };
+
+  struct SolverCalls
+  {
+    size_t sat = 0;
+    size_t unsat = 0;
+    size_t unknown = 0;
+    double seconds = 0;
+  };
+
+  /// records the time from its construction to its destruction as a phase
+  class Timer
+  {
+   public:
+    Timer(SimStats & stats, const char * phase);
+    ~Timer();
+
+   protected:
+    SimStats * stats_;  // NULL if disabled
+    const char * phase_;
+    std::chrono::steady_clock::time_point start_;
+  };
+
+  bool enabled() const { return enabled_; }
+  void set_enabled(bool en) { enabled_ = en; }
+  void reset();
+
+  void record_phase(const std::string & phase, double seconds);
+  void record_solver(const smt::Result & res, double seconds);
+
+  const std::map<std::string, Phase> & phases() const { return phases_; }
+  const SolverCalls & solver_calls() const { return solver_; }
+
+  /// the number of distinct nodes in the DAG of t
+  static size_t dag_size(const smt::Term & t);
+
+ protected:
+  bool enabled_ = false;
+  std::map<std::string, Phase> phases_;
+  SolverCalls solver_;
+};
+
+}  // namespace wasim
@@ -3,7 +3,6 @@
 #include "independence_check.h"
 
 #include "smt-switch/utils.h"
-#include <queue>
 
 namespace wasim {
 
@@ -50,22 +49,38 @@ void get_xvar_independent(const smt::TermVec & assumptions,
 
   smt::UnorderedTermSet free_var;
   smt::get_free_symbols(expr, free_var);
+  std::vector<IndependenceChecker::ExprVarPair> pairs;
   for (const auto & v : free_var) {
     if (set_of_xvar.find(v) == set_of_xvar.end()) continue;
     // keep only the intersection of free_var and set_of_xvar
-    if (e_is_independent_of_v(expr, v, assumptions))
-      xvar_that_can_be_removed.emplace(v);
+    pairs.emplace_back(expr, v);
   }
+  // one pair per X variable of expr, checked on this thread
+  auto res = e_is_independent_of_v_batch(pairs, assumptions, 1);
+  for (size_t idx = 0; idx < pairs.size(); ++idx)
+    if (res.at(idx))
+      xvar_that_can_be_removed.emplace(pairs.at(idx).second);
 } // get_xvar_independent
 
 
 bool expr_contains_X(const smt::Term & expr, const smt::UnorderedTermSet & set_of_xvar)
 {
-  smt::UnorderedTermSet vars_in_expr;
-  smt::get_free_symbols(expr, vars_in_expr);
-  for (const auto & var : vars_in_expr)
-    if (set_of_xvar.find(var) != set_of_xvar.end())
-      return true;
+  // stops at the first X, instead of collecting all free vars first
+  smt::UnorderedTermSet visited;
+  smt::TermVec worklist{ expr };
+  while (!worklist.empty()) {
+    auto node = worklist.back();
+    worklist.pop_back();
+    if (!visited.insert(node).second)
+      continue;
+    if (node->is_symbolic_const()) {
+      if (set_of_xvar.find(node) != set_of_xvar.end())
+        return true;
+      continue;
+    }
+    for (const auto & c : args(node))
+      worklist.push_back(c);
+  }
   return false;
 }
 
@@ -146,40 +161,50 @@ smt::Term expr_simplify_ite(const smt::Term & expr,
                             const smt::TermVec & assumptions,
                             const smt::SmtSolver & solver)
 {
-  smt::UnorderedTermSet cond_set; // deduplicate (make sure we visit the same condition only once)
-  std::queue<smt::Term> que;
-  que.push(expr);
+  ReducibleMemo cond_memo;
+  return expr_simplify_ite(expr, assumptions, solver, cond_memo);
+}
+
+smt::Term expr_simplify_ite(const smt::Term & expr,
+                            const smt::TermVec & assumptions,
+                            const smt::SmtSolver & solver,
+                            ReducibleMemo & cond_memo)
+{
+  // a node is expanded once, however many paths lead to it; what is
+  // expanded below an ITE only depends on its condition, so this visits
+  // the same nodes as walking every path
+  smt::UnorderedTermSet visited;
+  smt::TermVec worklist{ expr };
   auto T = solver->make_term(1);
   auto F = solver->make_term(0);
   smt::UnorderedTermMap subst_map;
-  while (que.size() != 0) {
-    auto node = que.front();
-    que.pop();
+  while (!worklist.empty()) {
+    auto node = worklist.back();
+    worklist.pop_back();
+    if (!visited.insert(node).second)
+      continue;
+    auto children = args(node);
     if (node->get_op() == smt::Ite) {
-      auto childern = args(node);
-      auto cond = childern.at(0);
-      if (cond_set.find(cond) == cond_set.end()) {
-        auto reducible = is_reducible_bool(cond, assumptions, solver);
-        if (reducible == 0) {
-          cond_set.insert(cond);
-          subst_map[cond] = F;
-          que.push(childern.at(2));
-        } else if (reducible == 1) {
-          cond_set.insert(cond);
-          subst_map[cond] = T;
-          que.push(childern.at(1));
-        } else {
-          for (const auto & c : childern)
-            que.push(c);
-        } // end else not reducible
-      } // end if not cached in cond_set
-
-    } else {
-      auto children =  args(node);
-      for (const auto & c : children)
-        que.push(c);
+      const auto & cond = children.at(0);
+      auto pos = cond_memo.find(cond);
+      if (pos == cond_memo.end())
+        pos = cond_memo
+                  .emplace(cond, is_reducible_bool(cond, assumptions, solver))
+                  .first;
+      if (pos->second == 0) {
+        subst_map[cond] = F;
+        worklist.push_back(children.at(2));
+        continue;
+      } else if (pos->second == 1) {
+        subst_map[cond] = T;
+        worklist.push_back(children.at(1));
+        continue;
+      }
+      // else not reducible, visit all children
     }
-  } // end of traversal of AST
+    for (const auto & c : children)
+      worklist.push_back(c);
+  } // end of traversal of DAG
   return solver->substitute(expr, subst_map);
 } // end of expr_simplify_ite
 
@@ -196,12 +221,15 @@ void state_simplify_xvar(StateAsmpt & s,
   smt::UnorderedTermMap xvar_sub;
   get_xvar_sub(s.get_assumptions(), set_of_xvar, free_vars, solver, xvar_sub);
   smt::UnorderedTermMap sv_to_replace; // try not to change s.sv_ while traversing
+  // the state vars share conditions, they are decided once for the state
+  ReducibleMemo cond_memo;
 
   for (const auto & sv : s.get_sv()) {
     const auto & var = sv.first;
     const auto & expr = sv.second;
     auto expr_new = solver->substitute(expr, xvar_sub);
-    auto expr_final = expr_simplify_ite(expr_new, s.get_assumptions(), solver);
+    auto expr_final =
+        expr_simplify_ite(expr_new, s.get_assumptions(), solver, cond_memo);
     sv_to_replace.emplace(var, expr_final);
   }
   (s.update_sv()).swap(sv_to_replace); // constant time operation
@@ -3,9 +3,15 @@
 #include "term_manip.h"
 #include "ts.h"
 
+#include <unordered_map>
+
 
 namespace wasim {
 
+// the result of is_reducible_bool for the conditions seen in a pass,
+// so that a condition is sent to the solver once
+typedef std::unordered_map<smt::Term, int> ReducibleMemo;
+
 
 // check if there is an insection between free vars in expr and set_of_xvar
 bool expr_contains_X(const smt::Term & expr, const smt::UnorderedTermSet & set_of_xvar);
@@ -43,9 +49,15 @@ int is_reducible_bv_width1(const smt::Term & expr,
                            const smt::SmtSolver & solver);
 
 // try to simplify the conditions in the ITEs of expr
+// expr is walked as a DAG, a shared subterm is visited once
 smt::Term expr_simplify_ite(const smt::Term & expr,
                             const smt::TermVec & assumptions,
                             const smt::SmtSolver & solver);
+// the same, with the conditions already decided (under the same assumptions)
+smt::Term expr_simplify_ite(const smt::Term & expr,
+                            const smt::TermVec & assumptions,
+                            const smt::SmtSolver & solver,
+                            ReducibleMemo & cond_memo);
 
 // this function will try some heuristics to simplify state update functions in s
 void state_simplify_xvar(StateAsmpt & s,
@@ -0,0 +1,227 @@
+#include "sygus_cache.h"
+#include "utils/exceptions.h"
+
+#include <algorithm>
+#include <cerrno>
+#include <cstdio>
+#include <fstream>
+#include <sstream>
+#include <thread>
+#include <utility>
+#include <vector>
+
+#include <dirent.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#include <utime.h>
+
+namespace wasim {
+
+static const char ENTRY_SUFFIX[] = ".sygus-cache";
+
+static bool is_entry(const std::string & name)
+{
+  const std::string suffix = ENTRY_SUFFIX;
+  return name.size() > suffix.size()
+         && name.compare(name.size() - suffix.size(), suffix.size(), suffix)
+                == 0;
+}
+
+// the entries in dir and their last use
+static std::vector<std::pair<time_t, std::string>> list_entries(
+    const std::string & dir)
+{
+  std::vector<std::pair<time_t, std::string>> ret;
+  DIR * d = opendir(dir.c_str());
+  if (d == NULL)
+    return ret;
+  while (struct dirent * e = readdir(d)) {
+    std::string name = e->d_name;
+    if (!is_entry(name))
+      continue;
+    std::string path = dir + "/" + name;
+    struct stat st;
+    if (stat(path.c_str(), &st) == 0)
+      ret.emplace_back(st.st_mtime, path);
+  }
+  closedir(d);
+  return ret;
+}
+
+// a string stored as its length on a line and then its bytes, so it may
+// hold any character (a result of several lines)
+static void write_sized(std::ostream & out, const std::string & s)
+{
+  out << s.size() << "\n" << s;
+}
+
+static bool read_sized(std::istream & in, std::string & s)
+{
+  std::string size_line;
+  if (!getline(in, size_line) || size_line.empty()
+      || size_line.find_first_not_of("0123456789") != std::string::npos)
+    return false;
+  s.assign(std::stoull(size_line), '\0');
+  in.read(&s[0], s.size());
+  return in.gcount() == static_cast<std::streamsize>(s.size());
+}
+
+SygusCache::SygusCache(const std::string & dir, size_t capacity)
+    : dir_(dir),
+      capacity_(capacity),
+      num_entries_(0),
+      hits_(0),
+      timeout_hits_(0),
+      misses_(0),
+      stores_(0),
+      evictions_(0)
+{
+  if (::mkdir(dir_.c_str(), 0755) != 0 && errno != EEXIST)
+    throw SimulatorException("unable to create sygus cache directory " + dir_);
+  num_entries_ = list_entries(dir_).size();
+}
+
+uint64_t SygusCache::hash(const std::string & text)
+{
+  uint64_t h = 14695981039346656037ULL;
+  for (unsigned char c : text) {
+    h ^= c;
+    h *= 1099511628211ULL;
+  }
+  return h;
+}
+
+std::string SygusCache::entry_file(const std::string & problem) const
+{
+  char buf[17];
+  snprintf(buf, sizeof(buf), "%016llx", (unsigned long long)hash(problem));
+  return dir_ + "/" + buf + ENTRY_SUFFIX;
+}
+
+SygusCache::Status SygusCache::lookup(const std::string & problem,
+                                      unsigned timeout,
+                                      std::string & result)
+{
+  auto fname = entry_file(problem);
+  std::ifstream fin(fname, std::ios::binary);
+  std::string status_line, stored_result;
+  if (fin.is_open() && getline(fin, status_line)
+      && read_sized(fin, stored_result)) {
+    std::stringstream key;
+    key << fin.rdbuf();
+    if (key.str() == problem) {
+      Status ret = MISS;
+      if (status_line == "solved")
+        ret = SOLVED;
+      else if (status_line.compare(0, 8, "timeout ") == 0
+               && std::stoul(status_line.substr(8)) >= timeout)
+        ret = TIMEOUT;
+
+      if (ret != MISS) {
+        utime(fname.c_str(), NULL);  // mark it as recently used
+        std::lock_guard<std::mutex> lock(mtx_);
+        ++hits_;
+        if (ret == TIMEOUT)
+          ++timeout_hits_;
+        result = ret == SOLVED ? stored_result : "";
+        return ret;
+      }
+    }
+  }
+  std::lock_guard<std::mutex> lock(mtx_);
+  ++misses_;
+  return MISS;
+}
+
+void SygusCache::store_result(const std::string & problem,
+                              const std::string & result)
+{
+  store(problem, "solved", result);
+}
+
+void SygusCache::store_timeout(const std::string & problem, unsigned timeout)
+{
+  store(problem, "timeout " + std::to_string(timeout), "");
+}
+
+void SygusCache::store(const std::string & problem,
+                       const std::string & status_line,
+                       const std::string & result)
+{
+  auto fname = entry_file(problem);
+  bool existed = access(fname.c_str(), F_OK) == 0;
+
+  // written aside and renamed, so a reader never sees half an entry
+  std::stringstream tmp_name;
+  tmp_name << fname << ".tmp." << getpid() << "."
+           << std::this_thread::get_id();
+  {
+    std::ofstream fout(tmp_name.str(), std::ios::binary);
+    if (!fout.is_open())
+      throw SimulatorException("unable to open file for write "
+                               + tmp_name.str());
+    fout << status_line << "\n";
+    write_sized(fout, result);
+    fout << problem;
+  }
+  if (rename(tmp_name.str().c_str(), fname.c_str()) != 0) {
+    remove(tmp_name.str().c_str());
+    throw SimulatorException("unable to write sygus cache entry " + fname);
+  }
+
+  std::lock_guard<std::mutex> lock(mtx_);
+  ++stores_;
+  if (!existed)
+    ++num_entries_;
+  if (capacity_ != 0 && num_entries_ > capacity_)
+    evict();
+}
+
+void SygusCache::evict()
+{
+  auto entries = list_entries(dir_);
+  num_entries_ = entries.size();
+  if (capacity_ == 0 || num_entries_ <= capacity_)
+    return;
+  // leave some room, so that a full cache is not scanned on every store
+  size_t target = capacity_ - capacity_ / 10;
+  std::sort(entries.begin(), entries.end());
+  for (const auto & e : entries) {
+    if (num_entries_ <= target)
+      break;
+    if (remove(e.second.c_str()) == 0) {
+      --num_entries_;
+      ++evictions_;
+    }
+  }
+}
+
+void SygusCache::set_capacity(size_t capacity)
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  capacity_ = capacity;
+  if (capacity_ != 0 && num_entries_ > capacity_)
+    evict();
+}
+
+void SygusCache::clear()
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  for (const auto & e : list_entries(dir_))
+    remove(e.second.c_str());
+  num_entries_ = 0;
+}
+
+double SygusCache::hit_rate() const
+{
+  size_t total = hits_ + misses_;
+  return total == 0 ? 0.0 : (double)hits_ / total;
+}
+
+void SygusCache::reset_stats()
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  hits_ = timeout_hits_ = misses_ = stores_ = evictions_ = 0;
+}
+
+}  // namespace wasim
@@ -0,0 +1,75 @@
+#pragma once
+
+#include <cstdint>
+#include <mutex>
+#include <string>
+
+namespace wasim {
+
+/// an on-disk cache of SyGuS results, kept across runs
+/// the key is the text of the SyGuS problem (it holds the expression, its
+/// free variables and the assumptions), an entry is a file named by the
+/// hash of the key, which also stores the key to rule out collisions:
+///   status line ("solved" or "timeout <ms>")
+///   length of the result (a line), the result
+///   the key, up to the end of the file
+/// a timeout is recorded with the time budget it used, so the same query
+/// is retried only with a larger budget
+/// when there are more than capacity entries (0: no limit), the least
+/// recently used ones are removed
+class SygusCache
+{
+ public:
+  enum Status
+  {
+    MISS = 0,
+    SOLVED,   // result holds the synthesized function (may be empty)
+    TIMEOUT   // timed out with a budget not smaller than the one asked
+  };
+
+  SygusCache(const std::string & dir, size_t capacity = 0);
+
+  /// look up a problem that will be run with timeout (in milliseconds)
+  Status lookup(const std::string & problem,
+                unsigned timeout,
+                std::string & result);
+  void store_result(const std::string & problem, const std::string & result);
+  void store_timeout(const std::string & problem, unsigned timeout);
+
+  const std::string & dir() const { return dir_; }
+  size_t capacity() const { return capacity_; }
+  void set_capacity(size_t capacity);
+  /// remove all entries
+  void clear();
+
+  size_t hits() const { return hits_; }
+  size_t timeout_hits() const { return timeout_hits_; }
+  size_t misses() const { return misses_; }
+  size_t stores() const { return stores_; }
+  size_t evictions() const { return evictions_; }
+  double hit_rate() const;
+  void reset_stats();
+
+  /// a stable 64-bit hash (FNV-1a), the same in every run
+  static uint64_t hash(const std::string & text);
+
+ protected:
+  std::string dir_;
+  size_t capacity_;
+  size_t num_entries_;  // an estimate, recounted when evicting
+  std::mutex mtx_;      // entries may be used by several threads
+
+  size_t hits_;
+  size_t timeout_hits_;
+  size_t misses_;
+  size_t stores_;
+  size_t evictions_;
+
+  std::string entry_file(const std::string & problem) const;
+  void store(const std::string & problem, const std::string & status_line,
+             const std::string & result);
+  /// remove the least recently used entries, mtx_ must be held
+  void evict();
+};
+
+}  // namespace wasim
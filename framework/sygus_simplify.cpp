@@ -3,6 +3,7 @@
 #include "term_manip.h"
 #include "state_simplify.h"
 #include "sygus_simplify.h"
+#include "sygus_cache.h"
 #include "config/testpath.h"
 #include "utils/exceptions.h"
 #include "frontend/smt_in.h"
@@ -13,10 +14,20 @@
 #include "smt-switch/cvc5_factory.h"
 
 #include <time.h>
+#include <algorithm>
 #include <chrono>
 #include <fstream>
 #include <iostream>
+#include <atomic>
+#include <condition_variable>
+#include <exception>
+#include <memory>
+#include <mutex>
+#include <sstream>
 #include <string>
+#include <thread>
+#include <unordered_map>
+#include <unistd.h>
 #include <boost/asio.hpp>
 #include <boost/bind.hpp>
 #include <boost/process.hpp>
@@ -38,6 +49,7 @@ class Process
  public:
   Process(const std::string & cmd, int timeout);
   void run();
+  bool timed_out() const { return killed; }
 
  private:
   void timeout_handler(boost::system::error_code ec);
@@ -115,10 +127,27 @@ void Process::run()
   returnStatus = c.exit_code();
 }
 
-void run_cmd(const std::string & cmd_string, int timeout)
+// returns false if the command was killed because of the timeout
+bool run_cmd(const std::string & cmd_string, int timeout)
 {
   Process p(cmd_string, timeout);
   p.run();
+  return !p.timed_out();
+}
+
+static std::unique_ptr<SygusCache> sygus_cache;
+
+void sygus_set_cache(const std::string & dir, size_t capacity)
+{
+  if (dir.empty())
+    sygus_cache.reset();
+  else
+    sygus_cache.reset(new SygusCache(dir, capacity));
+}
+
+SygusCache * sygus_get_cache()
+{
+  return sygus_cache.get();
 }
 
 
@@ -130,9 +159,114 @@ static std::string GetTimeStamp()
   return std::to_string(timestamp);
 }
 
-static parsed_info parse_state(const smt::TermVec & asmpt, const smt::Term & v, const smt::SmtSolver & solver)
+// The symbols of a SyGuS problem are renamed to cv0, cv1, ... in the order
+// they are met (first in the expression, then in the assumptions), so that
+// problems that only differ in the names of their variables (e.g., the
+// counters in the names of X variables) have the same text and share an
+// entry of the cache. The result is renamed back before it is parsed.
+struct canonical_names
+{
+  std::unordered_map<std::string, std::string> to_canonical;
+  std::unordered_map<std::string, std::string> from_canonical;
+  smt::TermVec order;  // the symbols, in the order of their new names
+
+  void add(const smt::Term & sym)
+  {
+    auto name = sym->to_string();
+    if (to_canonical.find(name) != to_canonical.end())
+      return;
+    auto canonical = "cv" + std::to_string(order.size());
+    to_canonical.emplace(name, canonical);
+    from_canonical.emplace(canonical, name);
+    order.push_back(sym);
+  }
+
+  // the symbols of t, in the order of a depth-first walk
+  void add_symbols(const smt::Term & t)
+  {
+    smt::UnorderedTermSet visited;
+    smt::TermVec stack{ t };
+    while (!stack.empty()) {
+      auto n = stack.back();
+      stack.pop_back();
+      if (!visited.insert(n).second)
+        continue;
+      if (n->is_symbolic_const()) {
+        add(n);
+        continue;
+      }
+      auto children = args(n);
+      stack.insert(stack.end(), children.rbegin(), children.rend());
+    }
+  }
+};
+
+// replace the symbols of an SMT-LIB text that are keys of names
+static std::string rename_symbols(
+    const std::string & text,
+    const std::unordered_map<std::string, std::string> & names)
 {
-  auto asmpt_and = solver->make_term(smt::And, asmpt);
+  std::string ret;
+  size_t pos = 0;
+  while (pos < text.size()) {
+    char c = text.at(pos);
+    if (c == '(' || c == ')' || isspace(static_cast<unsigned char>(c))) {
+      ret += c;
+      ++pos;
+      continue;
+    }
+    size_t end = pos + 1;
+    if (c == '|') {
+      // a quoted symbol
+      end = text.find('|', pos + 1);
+      end = end == std::string::npos ? text.size() : end + 1;
+    } else {
+      while (end < text.size() && text.at(end) != '(' && text.at(end) != ')'
+             && !isspace(static_cast<unsigned char>(text.at(end))))
+        ++end;
+    }
+    auto token = text.substr(pos, end - pos);
+    auto found = names.find(token);
+    ret += found == names.end() ? token : found->second;
+    pos = end;
+  }
+  return ret;
+}
+
+static parsed_info parse_state(const smt::TermVec & asmpt,
+                               const smt::Term & v,
+                               const smt::SmtSolver & solver,
+                               canonical_names & names)
+{
+  names.add_symbols(v);
+  // the order of assumptions does not matter, remove it from the problem:
+  // they are sorted by their text, where the symbols that have no new name
+  // yet are left out
+  std::vector<std::pair<std::string, smt::Term>> keyed;
+  for (const auto & a : smt::UnorderedTermSet(asmpt.begin(), asmpt.end())) {
+    smt::UnorderedTermSet syms;
+    smt::get_free_symbols(a, syms);
+    auto key_names = names.to_canonical;
+    for (const auto & sym : syms)
+      key_names.emplace(sym->to_string(), "?");
+    keyed.emplace_back(rename_symbols(a->to_string(), key_names), a);
+  }
+  std::sort(keyed.begin(), keyed.end(),
+            [](const std::pair<std::string, smt::Term> & a,
+               const std::pair<std::string, smt::Term> & b) {
+              if (a.first != b.first)
+                return a.first < b.first;
+              return a.second->to_string() < b.second->to_string();
+            });
+  smt::TermVec asmpt_sorted;
+  for (const auto & k : keyed) {
+    names.add_symbols(k.second);
+    asmpt_sorted.push_back(k.second);
+  }
+
+  auto asmpt_and = asmpt_sorted.empty()       ? solver->make_term(true)
+                   : asmpt_sorted.size() == 1 ? asmpt_sorted.front()
+                                              : solver->make_term(smt::And, asmpt_sorted);
   smt::UnorderedTermSet free_var_asmpt;
   smt::get_free_symbols(asmpt_and, free_var_asmpt);
   smt::UnorderedTermSet free_var;
@@ -141,24 +275,31 @@ static parsed_info parse_state(const smt::TermVec & asmpt, const smt::Term & v,
   return std::make_tuple(free_var, free_var_asmpt, asmpt_and, v, Fun_type);
 }
 
-smt::Term run_sygus(const parsed_info & info,
-                    const smt::UnorderedTermSet & set_of_xvar,
-                    const smt::SmtSolver & solver)
+// the symbols of names.order that are in vars
+static smt::TermVec in_order(const canonical_names & names,
+                             const smt::UnorderedTermSet & vars)
 {
-  const smt::UnorderedTermSet & free_var = std::get<0>(info);
+  smt::TermVec ret;
+  for (const auto & sym : names.order)
+    if (vars.find(sym) != vars.end())
+      ret.push_back(sym);
+  return ret;
+}
+
+// the text of the SyGuS problem, with the symbols renamed by names,
+// which also serves as the cache key
+static std::string sygus_problem(const parsed_info & info,
+                                 const smt::UnorderedTermSet & set_of_xvar,
+                                 const canonical_names & names)
+{
+  const auto free_var = in_order(names, std::get<0>(info));
   const smt::UnorderedTermSet & free_var_asmpt = std::get<1>(info);
   const smt::Term & asmpt_and = std::get<2>(info);
   const smt::Term & Fun = std::get<3>(info);
   const std::string & Fun_type = std::get<4>(info);
-  auto time_stamp = GetTimeStamp();
-  auto template_file = "sygus_template_" + time_stamp + ".sygus";
-  auto result_file = "sygus_result_" + time_stamp + ".sygus";
-  auto result_temp_file = "sygus_result_temp_" + time_stamp + ".sygus";
-  auto bash_file = "sygus_" + time_stamp + ".sh";
 
-  std::ofstream f;
+  std::ostringstream f;
 
-  f.open(template_file.c_str(), ios::out | ios::app);
   auto line1 = "(set-logic BV)\n\n\n(synth-fun FunNew \n   (";
   f << line1 << endl;
 
@@ -173,7 +314,7 @@ smt::Term run_sygus(const parsed_info & info,
   auto line3 = "   )\n   " + Fun_type + "\n  )\n\n\n";
   f << line3 << endl;
 
-  for (const auto & var : free_var_asmpt) {
+  for (const auto & var : in_order(names, free_var_asmpt)) {
     auto line4 = "(declare-var " + var->to_string() + " "
                  + var->get_sort()->to_string() + ")";
     f << line4 << endl;
@@ -205,6 +346,111 @@ smt::Term run_sygus(const parsed_info & info,
 
   auto line9 = ") ;\n    )))\n\n\n;\n\n(check-synth)";
   f << line9 << endl;
+  return rename_symbols(f.str(), names.to_canonical);
+}
+
+// the solver the SyGuS problems are built in
+static smt::SmtSolver make_sygus_solver()
+{
+  smt::SmtSolver solver_cvc5 = smt::Cvc5SolverFactory::create(false);
+  solver_cvc5->set_logic("QF_BV");
+  solver_cvc5->set_opt("produce-models", "true");
+  solver_cvc5->set_opt("incremental", "true");
+  return solver_cvc5;
+}
+
+std::string sygus_problem_text(const smt::Term & expr,
+                               const smt::TermVec & assumptions,
+                               const smt::UnorderedTermSet & set_of_xvar)
+{
+  // built as sygus_simplify does, so the text is the key it uses
+  smt::SmtSolver solver_cvc5 = make_sygus_solver();
+  smt::TermTranslator to_cvc(solver_cvc5);
+  smt::TermVec assumptions_cvc;
+  for (const auto & a : assumptions)
+    assumptions_cvc.push_back(to_cvc.transfer_term(a));
+  smt::UnorderedTermSet xvar_cvc;
+  for (const auto & x : set_of_xvar)
+    xvar_cvc.emplace(to_cvc.transfer_term(x));
+
+  canonical_names names;
+  auto info = parse_state(
+      assumptions_cvc, to_cvc.transfer_term(expr), solver_cvc5, names);
+  return sygus_problem(info, xvar_cvc, names);
+}
+
+// the number of SyGuS processes allowed to run at the same time (in all
+// threads), 0 for the number of cores
+static std::mutex sygus_jobs_mtx;
+static std::condition_variable sygus_jobs_cv;
+static unsigned sygus_jobs_limit = 0;
+static unsigned sygus_jobs_running = 0;
+
+void sygus_set_jobs(unsigned jobs)
+{
+  std::lock_guard<std::mutex> lock(sygus_jobs_mtx);
+  sygus_jobs_limit = jobs;
+  sygus_jobs_cv.notify_all();
+}
+
+unsigned sygus_get_jobs()
+{
+  std::lock_guard<std::mutex> lock(sygus_jobs_mtx);
+  if (sygus_jobs_limit != 0)
+    return sygus_jobs_limit;
+  unsigned cores = std::thread::hardware_concurrency();
+  return cores == 0 ? 1 : cores;
+}
+
+// holds one of the sygus_jobs_limit slots while it lives
+class SygusJobSlot
+{
+ public:
+  SygusJobSlot()
+  {
+    unsigned limit = sygus_get_jobs();
+    std::unique_lock<std::mutex> lock(sygus_jobs_mtx);
+    sygus_jobs_cv.wait(lock, [limit]() { return sygus_jobs_running < limit; });
+    ++sygus_jobs_running;
+  }
+  ~SygusJobSlot()
+  {
+    std::lock_guard<std::mutex> lock(sygus_jobs_mtx);
+    --sygus_jobs_running;
+    sygus_jobs_cv.notify_one();
+  }
+};
+
+// run the SyGuS solver on a problem and return the line of its result
+// (empty if there is none), this does not use any smt-switch solver, so it
+// can be called from several threads
+static std::string run_sygus(const std::string & problem)
+{
+  // timeout table
+  // c1 ->- 100ms
+  // c2 ->- 100ms
+  // c3 ->- 1s
+  const unsigned timeout = 1000;  // milliseconds
+
+  std::string linedata = "";
+
+  SygusCache::Status cached = SygusCache::MISS;
+  if (sygus_cache)
+    cached = sygus_cache->lookup(problem, timeout, linedata);
+  if (cached != SygusCache::MISS)
+    return linedata;
+
+  // the time stamp alone is not unique when jobs run concurrently
+  static std::atomic<unsigned> job_count(0);
+  auto time_stamp = GetTimeStamp() + "_" + std::to_string(getpid()) + "_"
+                    + std::to_string(job_count++);
+  auto template_file = "sygus_template_" + time_stamp + ".sygus";
+  auto result_temp_file = "sygus_result_temp_" + time_stamp + ".sygus";
+  auto bash_file = "sygus_" + time_stamp + ".sh";
+
+  std::ofstream f;
+  f.open(template_file.c_str(), ios::out | ios::app);
+  f << problem;
   f.close();
 
   std::ofstream bash_f;
@@ -221,25 +467,85 @@ smt::Term run_sygus(const parsed_info & info,
   auto cmd = "chmod 755 " + bash_file;
   system(cmd.c_str());
   auto cmd_string = "./" + bash_file;
-  run_cmd(cmd_string, 1000);  // 500 milliseconds -> 0.5s
-  // timeout table
-  // c1 ->- 100ms
-  // c2 ->- 100ms
-  // c3 ->- 1s
+  bool finished;
+  {
+    SygusJobSlot slot;
+    finished = run_cmd(cmd_string, timeout);
+  }
 
-  // only move the second line of sygus output file to a new file
+  // only the second line of sygus output is the result
   std::ifstream infile(result_temp_file.c_str());
-  std::string linedata = "";
-
   getline(infile, linedata);  // get first line, and do nothing
   getline(infile, linedata);  // get second line
   infile.close();
 
-  std::ofstream outfile;
-  outfile.open(result_file.c_str(), ios::out | ios::app);
-  outfile << linedata << endl;
-  outfile.close();
+  if (sygus_cache) {
+    if (!finished && linedata.empty())
+      sygus_cache->store_timeout(problem, timeout);
+    else
+      sygus_cache->store_result(problem, linedata);
+  }
+
+  int rm;
+  // rm = remove(template_file.c_str());
+  rm = remove(result_temp_file.c_str());
+  rm = remove(bash_file.c_str());
+
+  return linedata;
+} // end of run_sygus
+
+// run the problems concurrently, at most sygus_get_jobs() at a time
+static std::vector<std::string> run_sygus_all(
+    const std::vector<std::string> & problems)
+{
+  // the same problem (e.g., a subterm shared by two variables) runs once
+  std::vector<std::string> unique;
+  std::vector<size_t> which(problems.size());
+  std::unordered_map<std::string, size_t> seen;
+  for (size_t idx = 0; idx < problems.size(); ++idx) {
+    auto ins = seen.emplace(problems.at(idx), unique.size());
+    if (ins.second)
+      unique.push_back(problems.at(idx));
+    which.at(idx) = ins.first->second;
+  }
+
+  std::vector<std::string> unique_results(unique.size());
+  size_t num_threads = std::min<size_t>(sygus_get_jobs(), unique.size());
+  if (num_threads <= 1) {
+    for (size_t idx = 0; idx < unique.size(); ++idx)
+      unique_results.at(idx) = run_sygus(unique.at(idx));
+  } else {
+    std::atomic<size_t> next(0);
+    std::mutex error_mtx;
+    std::exception_ptr error;
+    std::vector<std::thread> workers;
+    for (size_t t = 0; t < num_threads; ++t)
+      workers.emplace_back([&]() {
+        try {
+          for (size_t idx = next++; idx < unique.size(); idx = next++)
+            unique_results.at(idx) = run_sygus(unique.at(idx));
+        } catch (...) {
+          std::lock_guard<std::mutex> lock(error_mtx);
+          if (!error)
+            error = std::current_exception();
+        }
+      });
+    for (auto & w : workers)
+      w.join();
+    if (error)
+      std::rethrow_exception(error);
+  }
+
+  std::vector<std::string> results;
+  for (size_t idx = 0; idx < problems.size(); ++idx)
+    results.push_back(unique_results.at(which.at(idx)));
+  return results;
+}
 
+// the term of a result line of run_sygus, or the no_file symbol
+static smt::Term parse_sygus_result(const std::string & linedata,
+                                    const smt::SmtSolver & solver)
+{
   smt::Term new_expr;
   // determine whether the smtlib_result is empty
   if (linedata.empty()) {
@@ -251,97 +557,113 @@ smt::Term run_sygus(const parsed_info & info,
     }
   } else {
     auto solver_copy = solver; // TODO: in the future, change SmtLibReader to use const ref.
-    WasimSmtLib2Parser pi(result_file, solver_copy);
+    WasimSmtLib2Parser pi(solver_copy);
+    if (pi.parse_string(linedata + "\n") != 0)
+      throw SimulatorException("unable to parse sygus result: " + linedata);
     new_expr = pi.return_defs();
   }
-  int rm;
-  // rm = remove(template_file.c_str());
-  rm = remove(result_file.c_str());
-  rm = remove(result_temp_file.c_str());
-  rm = remove(bash_file.c_str());
-
   return new_expr;
-} // end of run_sygus
-
-
-static smt::Term structure_simplify(
-                             const smt::Term & v,
-                             const smt::TermVec & assumptions,
-                             const smt::UnorderedTermSet & set_of_xvar,
-                             smt::TermTranslator & translator);
+}
 
-static smt::TermVec child_vec_simplify(
-                                const smt::TermVec & child_vec,
-                                const smt::TermVec & asmpt,
-                                const smt::UnorderedTermSet & set_of_xvar,
-                                smt::TermTranslator & translator)
+// v with its children replaced
+static smt::Term rebuild_structure(const smt::Term & v,
+                                   const smt::TermVec & child_new_vec,
+                                   const smt::SmtSolver & solver_cvc5)
 {
-  smt::TermVec child_new_vec;
-  for (const auto & child : child_vec) {
-    if (expr_contains_X(child, set_of_xvar))
-      child_new_vec.push_back(
-          structure_simplify(child, asmpt, set_of_xvar, translator));
-    else 
-      child_new_vec.push_back(child);
-    
+  smt::Term new_expr;
+  auto num_child = child_new_vec.size();
+  if ((v->get_op() == smt::Ite) && (num_child == 3)) {
+    new_expr = solver_cvc5->make_term(smt::Ite, child_new_vec);
+  } else if ((v->get_op() == smt::BVNot) && (num_child == 1)) {
+    new_expr = solver_cvc5->make_term(smt::BVNot, child_new_vec);
+  } else if ((v->get_op() == smt::Not) && (num_child == 1)) {
+    new_expr = solver_cvc5->make_term(smt::Not, child_new_vec);
+  } else if ((v->get_op() == smt::BVAnd) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::BVAnd, child_new_vec);
+  } else if ((v->get_op() == smt::And) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::And, child_new_vec);
+  } else if ((v->get_op() == smt::BVMul) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::BVMul, child_new_vec);
+  } else if ((v->get_op() == smt::BVAdd) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::BVAdd, child_new_vec);
+  } else if ((v->get_op() == smt::Concat) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::Concat, child_new_vec);
+  } else if ((v->get_op() == smt::Equal) && (num_child == 2)) {
+    new_expr = solver_cvc5->make_term(smt::Equal, child_new_vec);
+  }
+  // else if
+  else {
+    throw SimulatorException("new structure of " + v->to_string() + " is not handled");
   }
-  return child_new_vec;
+  return new_expr;
 }
 
-// attempt to hierarchically simplify
-static smt::Term structure_simplify(
-                             const smt::Term & v,
+// attempt to hierarchically simplify several expressions: the SyGuS
+// problems of one level run together, then the children of the expressions
+// that could not be simplified directly are tried (as the next level)
+// terms are only made here, in the calling thread
+static smt::TermVec structure_simplify(
+                             const smt::TermVec & vs,
                              const smt::TermVec & assumptions,
                              const smt::UnorderedTermSet & set_of_xvar,
                              smt::TermTranslator & translator)
 {
-  smt::Term new_expr;
-  auto expr_info = parse_state(assumptions, v, translator.get_solver());
-  auto new_expr_direct = run_sygus(expr_info, set_of_xvar, translator.get_solver());
-  if (new_expr_direct->to_string() == "no_file") {
-    auto child_vec = args(v);
-    auto child_new_vec =
-        child_vec_simplify(child_vec, assumptions, set_of_xvar, translator);
-
-    const auto & solver_cvc5 = translator.get_solver();
-    if ((v->get_op() == smt::Ite) && (child_vec.size() == 3)) {
-      new_expr = solver_cvc5->make_term(smt::Ite, child_new_vec);
-    } else if ((v->get_op() == smt::BVNot) && (child_vec.size() == 1)) {
-      new_expr = solver_cvc5->make_term(smt::BVNot, child_new_vec);
-    } else if ((v->get_op() == smt::Not) && (child_vec.size() == 1)) {
-      new_expr = solver_cvc5->make_term(smt::Not, child_new_vec);
-    } else if ((v->get_op() == smt::BVAnd) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::BVAnd, child_new_vec);
-    } else if ((v->get_op() == smt::And) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::And, child_new_vec);
-    } else if ((v->get_op() == smt::BVMul) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::BVMul, child_new_vec);
-    } else if ((v->get_op() == smt::BVAdd) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::BVAdd, child_new_vec);
-    } else if ((v->get_op() == smt::Concat) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::Concat, child_new_vec);
-    } else if ((v->get_op() == smt::Equal) && (child_vec.size() == 2)) {
-      new_expr = solver_cvc5->make_term(smt::Equal, child_new_vec);
+  const auto & solver_cvc5 = translator.get_solver();
+
+  std::vector<std::string> problems;
+  std::vector<canonical_names> names(vs.size());
+  for (size_t idx = 0; idx < vs.size(); ++idx) {
+    auto expr_info = parse_state(assumptions, vs.at(idx), solver_cvc5, names.at(idx));
+    problems.push_back(sygus_problem(expr_info, set_of_xvar, names.at(idx)));
+  }
+  auto results = run_sygus_all(problems);
+
+  smt::TermVec new_exprs(vs.size());
+  // the expressions to rebuild from their children, and where their
+  // children start in the next level
+  std::vector<size_t> failed;
+  std::vector<size_t> child_begin;
+  smt::TermVec next_level;
+  for (size_t idx = 0; idx < vs.size(); ++idx) {
+    auto new_expr_direct = parse_sygus_result(
+        rename_symbols(results.at(idx), names.at(idx).from_canonical), solver_cvc5);
+    if (new_expr_direct->to_string() != "no_file") {
+      new_exprs.at(idx) = new_expr_direct;
+      continue;
     }
-    // else if
-    else {
-      throw SimulatorException("new structure of " + v->to_string() + " is not handled");
+    failed.push_back(idx);
+    child_begin.push_back(next_level.size());
+    for (const auto & child : args(vs.at(idx)))
+      if (expr_contains_X(child, set_of_xvar))
+        next_level.push_back(child);
+  }
+  if (failed.empty())
+    return new_exprs;
+
+  smt::TermVec next_new;
+  if (!next_level.empty())
+    next_new = structure_simplify(next_level, assumptions, set_of_xvar, translator);
+
+  for (size_t f = 0; f < failed.size(); ++f) {
+    const auto & v = vs.at(failed.at(f));
+    size_t pos = child_begin.at(f);
+    smt::TermVec child_new_vec;
+    for (const auto & child : args(v)) {
+      if (expr_contains_X(child, set_of_xvar))
+        child_new_vec.push_back(next_new.at(pos++));
+      else
+        child_new_vec.push_back(child);
     }
-  } else {
-    new_expr = new_expr_direct;
+    new_exprs.at(failed.at(f)) = rebuild_structure(v, child_new_vec, solver_cvc5);
   }
-
-  return new_expr;
+  return new_exprs;
 } // end of structure_simplify
 
 void sygus_simplify(StateAsmpt & state_btor,
                     const smt::UnorderedTermSet & set_of_xvar_btor,
                     smt::SmtSolver & solver)
 {
-  smt::SmtSolver solver_cvc5 = smt::Cvc5SolverFactory::create(false);
-  solver_cvc5->set_logic("QF_BV");
-  solver_cvc5->set_opt("produce-models", "true");
-  solver_cvc5->set_opt("incremental", "true");
+  smt::SmtSolver solver_cvc5 = make_sygus_solver();
   smt::TermTranslator btor2cvc(solver_cvc5);
   smt::TermTranslator cvc2btor(solver);
 
@@ -354,19 +676,28 @@ void sygus_simplify(StateAsmpt & state_btor,
     assmpt_in_cvc.push_back(btor2cvc.transfer_term(a));
 
 
+  // all state variables are simplified together
+  smt::TermVec svs;
+  smt::TermVec vs_cvc;
   for (const auto & sv : state_btor.get_sv()) {
     const auto & s_btor = sv.first;
     const auto & v_btor = sv.second;
 
     if (expr_contains_X(v_btor, set_of_xvar_btor)) {
-      auto v_cvc = btor2cvc.transfer_term(v_btor);
-      auto new_expr =
-          structure_simplify(v_cvc, assmpt_in_cvc, set_of_xvar_in_cvc, btor2cvc);
-      // cout << "new_expr: " << new_expr->to_string() << endl;
-      auto new_expr_btor = cvc2btor.transfer_term(new_expr);
-      state_btor.update_sv().insert_or_assign(s_btor, new_expr_btor);
+      svs.push_back(s_btor);
+      vs_cvc.push_back(btor2cvc.transfer_term(v_btor));
     } // end of if contains X
   } // end of for each sv
+  if (vs_cvc.empty())
+    return;
+
+  auto new_exprs =
+      structure_simplify(vs_cvc, assmpt_in_cvc, set_of_xvar_in_cvc, btor2cvc);
+  for (size_t idx = 0; idx < svs.size(); ++idx) {
+    // cout << "new_expr: " << new_exprs.at(idx)->to_string() << endl;
+    auto new_expr_btor = cvc2btor.transfer_term(new_exprs.at(idx));
+    state_btor.update_sv().insert_or_assign(svs.at(idx), new_expr_btor);
+  }
 } // end of sygus_simplify
 
 }  // namespace wasim
\ No newline at end of file
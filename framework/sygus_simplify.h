@@ -8,6 +8,29 @@ using namespace std;
 
 namespace wasim {
 
+class SygusCache;
+
+// keep the results of the SyGuS solver (including timeouts) in dir, so
+// they are reused by later calls and later runs, capacity is the number of
+// entries (0: no limit), an empty dir disables the cache
+void sygus_set_cache(const std::string & dir, size_t capacity = 0);
+// the cache in use, NULL if there is none
+SygusCache * sygus_get_cache();
+
+// the number of SyGuS solver processes that may run at the same time,
+// over all threads (0: the number of cores); the state variables of a
+// state are simplified concurrently up to this limit
+void sygus_set_jobs(unsigned jobs);
+unsigned sygus_get_jobs();
+
+// the text of the SyGuS problem that sygus_simplify solves for expr, which
+// is also its key in the cache: the symbols are renamed to cv0, cv1, ... in
+// the order they are met, so it does not depend on the names of variables
+// the problem is built in a cvc5 solver of its own
+std::string sygus_problem_text(const smt::Term & expr,
+                               const smt::TermVec & assumptions,
+                               const smt::UnorderedTermSet & set_of_xvar);
+
 // will attempt to simplify (remove the set of xvar)
 // it is better if you can first use independence check to find a set of
 // xvar that can be simplified
@@ -1,7 +1,12 @@
 #include "symsim.h"
+#include "state_simplify.h"
+#include "tracemgr.h"
 
 #include "smt-switch/utils.h"
 
+#include <algorithm>
+#include <optional>
+
 using namespace std;
 
 namespace wasim {
@@ -37,6 +42,7 @@ smt::Term SymbolicSimulator::var(const std::string & n) const
 
 smt::Term SymbolicSimulator::cur(const std::string & n) const
 {
+  SimStats::Timer timer(stats_, "substitute");
   const auto & sv_mapping = trace_.back();
   smt::Term expr = var(n);
   if (!_expr_only_sv(expr)) {
@@ -78,6 +84,7 @@ bool SymbolicSimulator::_expr_only_sv(const smt::Term & expr) const
 smt::UnorderedTermMap SymbolicSimulator::convert(
     const assignment_type & vdict) const
 {
+  SimStats::Timer timer(stats_, "convert");
   smt::UnorderedTermMap retdict;
   for (const auto & v : vdict) {  // check key only
     const auto & key = v.first;
@@ -122,12 +129,15 @@ void SymbolicSimulator::backtrack()
   trace_.pop_back();
   history_assumptions_.pop_back();
   history_assumptions_interp_.pop_back();
-  history_choice_.back().UsedInSim_ = false;
+  history_choice_.mutable_back().UsedInSim_ = false;
+  _mark_frame_dirty(history_assumptions_.size());
+  while (!abstractions_.empty() && abstractions_.back().frame >= trace_.size())
+    abstractions_.pop_back();
 }
 
 void SymbolicSimulator::free_init(const smt::UnorderedTermMap & var_assignment) {
   trace_.push_back(var_assignment);
-  auto & var_assignment_ref = trace_.back();
+  auto & var_assignment_ref = trace_.mutable_back();
   for (const auto & v : svar_) {
     if (var_assignment_ref.find(v) == var_assignment_ref.end()) {
       var_assignment_ref[v] =
@@ -139,6 +149,7 @@ void SymbolicSimulator::free_init(const smt::UnorderedTermMap & var_assignment)
   
   history_assumptions_.push_back({ });
   history_assumptions_interp_.push_back({ });
+  _mark_frame_dirty(history_assumptions_.size() - 1);
   // this will not assumptions
 } // end free_init
 
@@ -147,7 +158,7 @@ void SymbolicSimulator::init(
 {
   trace_.push_back(var_assignment);
 
-  auto & var_assignment_ref = trace_.back();
+  auto & var_assignment_ref = trace_.mutable_back();
   for (const auto & v : svar_) {
     if (var_assignment_ref.find(v) == var_assignment_ref.end()) {
       var_assignment_ref[v] =
@@ -164,6 +175,7 @@ void SymbolicSimulator::init(
   auto init_constr = solver_->substitute(ts_.init(), var_assignment_ref);
   history_assumptions_.push_back({ init_constr });
   history_assumptions_interp_.push_back({ "init" });
+  _mark_frame_dirty(history_assumptions_.size() - 1);
 }
 
 void SymbolicSimulator::set_current_state(const StateAsmpt & s)
@@ -180,6 +192,7 @@ void SymbolicSimulator::set_current_state(const StateAsmpt & s)
   history_assumptions_interp_.clear();
   history_assumptions_interp_.push_back(s.get_assumption_interpretations());
   history_choice_.clear();
+  _mark_frame_dirty(0);
 }
 
 void SymbolicSimulator::print_current_step() const
@@ -214,6 +227,7 @@ void SymbolicSimulator::print_current_step_assumptions() const
 void SymbolicSimulator::set_input(const smt::UnorderedTermMap & invar_assign,
                                  const smt::TermVec & pre_assumptions)
 {
+  SimStats::Timer timer(stats_, "set_input");
   if (trace_.empty())
     throw SimulatorException("Simulator.init should be called before set_input");
 
@@ -225,7 +239,7 @@ void SymbolicSimulator::set_input(const smt::UnorderedTermMap & invar_assign,
 
   history_choice_.push_back(ChoiceItem(
       pre_assumptions, invar_assign));  // construct by r-value reference
-  auto & c = history_choice_.back();
+  auto & c = history_choice_.mutable_back();
 
   for (const auto & v : invar_) {
     if (prev_sv.find(v) != prev_sv.end()) {
@@ -241,6 +255,7 @@ void SymbolicSimulator::set_input(const smt::UnorderedTermMap & invar_assign,
 
   unsigned len = history_assumptions_.back().size();
   c.record_prev_assumption_len(len);
+  _mark_frame_dirty(history_assumptions_.size() - 1);
 
   assert(history_assumptions_.size() == history_assumptions_interp_.size());
   assert(history_assumptions_.back().size()
@@ -264,15 +279,15 @@ void SymbolicSimulator::set_input(const smt::UnorderedTermMap & invar_assign,
       assmpt = solver_->make_term(smt::And, assmpt_vec);
     }
 
-    history_assumptions_.back().push_back(assmpt);
-    history_assumptions_interp_.back().push_back(
+    history_assumptions_.mutable_back().push_back(assmpt);
+    history_assumptions_interp_.mutable_back().push_back(
       "ts.asmpt @" + (std::to_string(trace_.size() - 1)));
   }
 
   for (const auto & vect : pre_assumptions) {
     auto assmpt_temp = solver_->substitute(vect, submap);
-    history_assumptions_.back().push_back(assmpt_temp);
-    history_assumptions_interp_.back().push_back(
+    history_assumptions_.mutable_back().push_back(assmpt_temp);
+    history_assumptions_interp_.mutable_back().push_back(
         vect->to_string() + "@" + std::to_string(trace_.size() - 1));
   }
 }  // end of set_input
@@ -283,16 +298,30 @@ void SymbolicSimulator::undo_set_input()
   const auto & c = history_choice_.back();  // avoid copy
   assert(!c.UsedInSim_);
   auto l = c.get_prev_assumption_len();
-  history_assumptions_.back().resize(l);
-  history_assumptions_interp_.back().resize(l);
+  history_assumptions_.mutable_back().resize(l);
+  history_assumptions_interp_.mutable_back().resize(l);
+  _mark_frame_dirty(history_assumptions_.size() - 1);
   history_choice_
       .pop_back();  // you can only pop in the end, o.w. reference will fail
 }
 
+smt::UnorderedTermMap SymbolicSimulator::new_input_map(
+    const smt::UnorderedTermMap & defaults /*={}*/)
+{
+  _check_only_invar(defaults);
+  smt::UnorderedTermMap ret(defaults);
+  for (const auto & v : invar_) {
+    if (ret.find(v) == ret.end())
+      ret.emplace(v, new_var(v->get_sort()->get_width(), v->to_string(), true));
+  }
+  return ret;
+}
+
 /// similar to cur(), but will check no reference to the input variables
 smt::Term SymbolicSimulator::interpret_state_expr_on_curr_frame(
     const smt::Term & expr) const
 {
+  SimStats::Timer timer(stats_, "substitute");
   if (!_expr_only_sv(expr))
     throw SimulatorException("expr should only contain only state variables");
   const auto & prev_sv = trace_.back();
@@ -302,6 +331,7 @@ smt::Term SymbolicSimulator::interpret_state_expr_on_curr_frame(
 smt::Term SymbolicSimulator::interpret_input_and_state_expr_on_curr_frame(
     const smt::Term & expr, const smt::UnorderedTermMap & iv_map) const
 {
+  SimStats::Timer timer(stats_, "substitute");
   if (!_expr_only_sv(expr)){
     const auto & sv_mapping = trace_.back();
     assert(history_choice_.size() != 0);
@@ -327,9 +357,10 @@ smt::TermVec SymbolicSimulator::interpret_state_expr_on_curr_frame(
 
 void SymbolicSimulator::sim_one_step()
 {
+  SimStats::Timer timer(stats_, "sim_one_step");
   assert(history_choice_.size() != 0);
 
-  auto & c = history_choice_.back();
+  auto & c = history_choice_.mutable_back();
   c.setSim();
 
   const auto & invar_assign = c.var_assign_;
@@ -337,13 +368,59 @@ void SymbolicSimulator::sim_one_step()
   smt::UnorderedTermMap svmap;
   auto submap = prev_sv;
   submap.insert(invar_assign.begin(), invar_assign.end());
+  bool timed = _abstraction_timed();
+  std::unordered_map<smt::Term, double> update_time;
   for (const auto & sv : ts_.state_updates()) {
+    if (!timed) {
+      svmap[sv.first] = solver_->substitute(sv.second, submap);
+      continue;
+    }
+    auto start = std::chrono::steady_clock::now();
     svmap[sv.first] = solver_->substitute(sv.second, submap);
+    std::chrono::duration<double> d = std::chrono::steady_clock::now() - start;
+    update_time.emplace(sv.first, d.count());
   }
   trace_.push_back(
       std::move(svmap));  // svmap will not be used afterwards, avoid copy
   history_assumptions_.push_back({});
   history_assumptions_interp_.push_back({});
+  _mark_frame_dirty(history_assumptions_.size() - 1);
+  _apply_simplify_policy();
+  _apply_abstraction_budget(update_time);
+}
+
+void SymbolicSimulator::sim_steps(
+    unsigned n,
+    const std::vector<smt::UnorderedTermMap> & inputs,
+    const std::vector<smt::TermVec> & pre_assumptions,
+    const smt::UnorderedTermMap & defaults /*={}*/)
+{
+  sim_steps(
+      n,
+      [&inputs](unsigned i) {
+        return i < inputs.size() ? inputs.at(i) : smt::UnorderedTermMap();
+      },
+      pre_assumptions,
+      defaults);
+}
+
+void SymbolicSimulator::sim_steps(
+    unsigned n,
+    const std::function<smt::UnorderedTermMap(unsigned)> & input_of,
+    const std::vector<smt::TermVec> & pre_assumptions,
+    const smt::UnorderedTermMap & defaults /*={}*/)
+{
+  for (unsigned i = 0; i < n; ++i) {
+    // inputs not assigned here will get fresh variables in set_input
+    smt::UnorderedTermMap invar_assign(defaults);
+    for (const auto & iv : input_of(i))
+      invar_assign[iv.first] = iv.second;
+    if (i < pre_assumptions.size())
+      set_input(invar_assign, pre_assumptions.at(i));
+    else
+      set_input(invar_assign, {});
+    sim_one_step();
+  }
 }
 
 // void SymbolicSimulator::sim_one_step_direct()
@@ -362,7 +439,7 @@ smt::Term SymbolicSimulator::new_var(int bitwdth,
                                     const std::string & vname /*"=var"*/,
                                     bool x /*=true*/)
 {
-  std::string n = x ? vname + "X" : vname;
+  std::string n = x ? vname + "X" + name_tag_ : vname;
   auto symb_sort = solver_->make_sort(smt::BV, bitwdth);
   smt::Term symb = free_make_symbol(n, symb_sort, name_cnt_, solver_);
 
@@ -388,6 +465,415 @@ StateAsmpt SymbolicSimulator::get_curr_state(const smt::TermVec & assumptions)
   return ret;
 }
 
+smt::Result SymbolicSimulator::_check_sat_assuming(const smt::TermVec & query)
+{
+  if (!stats_.enabled())
+    return solver_->check_sat_assuming(query);
+  auto start = std::chrono::steady_clock::now();
+  auto res = solver_->check_sat_assuming(query);
+  std::chrono::duration<double> d = std::chrono::steady_clock::now() - start;
+  stats_.record_solver(res, d.count());
+  return res;
+}
+
+void SymbolicSimulator::_mark_frame_dirty(size_t idx)
+{
+  solver_dirty_from_ = std::min(solver_dirty_from_, idx);
+}
+
+void SymbolicSimulator::_clear_solver_scopes()
+{
+  size_t nscope = solver_frames_.size() + (solver_scoped_ ? 1 : 0);
+  for (size_t i = 0; i < nscope; ++i)
+    solver_->pop();
+  solver_frames_.clear();
+  solver_constraints_.clear();
+  solver_scoped_ = false;
+  solver_dirty_from_ = 0;
+}
+
+void SymbolicSimulator::_sync_solver(const smt::TermVec & constraints)
+{
+  SimStats::Timer timer(stats_, "sync_solver");
+  if (!solver_scoped_ || constraints != solver_constraints_) {
+    // constraints are in the bottom scope, changing them drops all frames
+    _clear_solver_scopes();
+    solver_->push();
+    for (const auto & c : constraints)
+      solver_->assert_formula(c);
+    solver_constraints_ = constraints;
+    solver_scoped_ = true;
+  }
+
+  // pop the frames that have changed, a frame that has only been
+  // extended by set_input can be kept and extended in place
+  while (solver_frames_.size() > solver_dirty_from_) {
+    size_t idx = solver_frames_.size() - 1;
+    if (idx == solver_dirty_from_ && idx < history_assumptions_.size()) {
+      const auto & asserted = solver_frames_.back();
+      const auto & frame = history_assumptions_.at(idx);
+      if (asserted.size() <= frame.size()
+          && std::equal(asserted.begin(), asserted.end(), frame.begin()))
+        break;
+    }
+    solver_->pop();
+    solver_frames_.pop_back();
+  }
+
+  size_t start = solver_frames_.empty() ? 0 : solver_frames_.size() - 1;
+  for (size_t idx = start; idx < history_assumptions_.size(); ++idx) {
+    if (idx == solver_frames_.size()) {
+      solver_->push();
+      solver_frames_.push_back({});
+    }
+    auto & asserted = solver_frames_.at(idx);
+    const auto & frame = history_assumptions_.at(idx);
+    for (size_t j = asserted.size(); j < frame.size(); ++j) {
+      solver_->assert_formula(frame.at(j));
+      asserted.push_back(frame.at(j));
+    }
+  }
+  solver_dirty_from_ = solver_frames_.size();
+}
+
+void SymbolicSimulator::set_incremental(bool en)
+{
+  if (en && solver_shared_)
+    throw SimulatorException(
+        "incremental solving needs a solver that is not shared with a fork");
+  if (!en)
+    _clear_solver_scopes();
+  incremental_ = en;
+}
+
+smt::Result SymbolicSimulator::check_sat_incremental(
+    const smt::TermVec & goals, const smt::TermVec & constraints /*={}*/)
+{
+  if (!incremental_)
+    throw SimulatorException("incremental solving is not enabled");
+  _sync_solver(constraints);
+  return _check_sat_assuming(goals);
+}
+
+smt::TermVec SymbolicSimulator::_query(const smt::TermVec & goals,
+                                        const smt::TermVec & constraints,
+                                        bool with_assumptions) const
+{
+  smt::TermVec query(goals);
+  query.insert(query.end(), constraints.begin(), constraints.end());
+  if (with_assumptions) {
+    for (const auto & l : history_assumptions_)
+      query.insert(query.end(), l.begin(), l.end());
+  }
+  return query;
+}
+
+smt::Result SymbolicSimulator::check_sat_query(const smt::TermVec & goals,
+                                               const smt::TermVec & constraints,
+                                               bool with_assumptions)
+{
+  // the scopes hold the assumptions, a query without them is sent at once
+  // on a solver without scopes, they are asserted again by the next query
+  bool use_scopes = incremental_ && with_assumptions;
+
+  // the whole query is only needed as the cache key
+  // or when it is sent to the solver at once
+  smt::TermVec query;
+  if (query_cache_.enabled() || !use_scopes) {
+    query = _query(goals, constraints, with_assumptions);
+    const smt::Result * cached = query_cache_.lookup(query);
+    if (cached)
+      return *cached;
+  }
+
+  if (!use_scopes && solver_scoped_)
+    _clear_solver_scopes();
+  smt::Result res = use_scopes ? check_sat_incremental(goals, constraints)
+                               : _check_sat_assuming(query);
+  query_cache_.insert(query, res);
+  return res;
+}
+
+BranchClass SymbolicSimulator::classify(const smt::Term & cond,
+                                        const smt::TermVec & assumptions,
+                                        const smt::TermVec & constraints)
+{
+  // a condition that is constantly true does not need the solver, a
+  // constantly false one still needs to know if the assumptions can hold
+  if (cond->is_value() && cond == solver_->make_term(true))
+    return BranchClass::ALWAYS_TRUE;
+
+  auto not_cond = solver_->make_term(smt::Not, cond);
+  smt::TermVec query_base;
+  // the results are copied out of the cache at once, an insert below may
+  // evict the entries they came from
+  std::optional<bool> cached_true;
+  std::optional<bool> cached_false;
+  if (query_cache_.enabled()) {
+    query_base = _query(assumptions, constraints, true);
+    auto q = query_base;
+    q.push_back(cond);
+    if (const auto * r = query_cache_.lookup(q))
+      cached_true = r->is_sat();
+    q.back() = not_cond;
+    if (const auto * r = query_cache_.lookup(q))
+      cached_false = r->is_sat();
+    if (cached_true && cached_false) {
+      if (*cached_true)
+        return *cached_false ? BranchClass::BOTH : BranchClass::ALWAYS_TRUE;
+      return *cached_false ? BranchClass::ALWAYS_FALSE
+                           : BranchClass::INFEASIBLE;
+    }
+  }
+
+  // both checks share one scope, the assumptions are asserted only once
+  if (incremental_)
+    _sync_solver(constraints);
+  solver_->push();
+  if (!incremental_) {
+    for (const auto & c : constraints)
+      solver_->assert_formula(c);
+    for (const auto & l : history_assumptions_)
+      for (const auto & a : l)
+        solver_->assert_formula(a);
+  }
+  for (const auto & a : assumptions)
+    solver_->assert_formula(a);
+
+  // if cond cannot be true, the second check tells whether it is always
+  // false or the assumptions are unsatisfiable
+  bool maybe_true = cached_true.value_or(false);
+  if (!cached_true) {
+    auto r = _check_sat_assuming(smt::TermVec{ cond });
+    if (query_cache_.enabled()) {
+      auto q = query_base;
+      q.push_back(cond);
+      query_cache_.insert(q, r);
+    }
+    maybe_true = r.is_sat();
+  }
+
+  bool maybe_false = cached_false.value_or(false);
+  if (!cached_false) {
+    auto r = _check_sat_assuming(smt::TermVec{ not_cond });
+    if (query_cache_.enabled()) {
+      auto q = query_base;
+      q.push_back(not_cond);
+      query_cache_.insert(q, r);
+    }
+    maybe_false = r.is_sat();
+  }
+  solver_->pop();
+
+  if (!maybe_true)
+    return maybe_false ? BranchClass::ALWAYS_FALSE : BranchClass::INFEASIBLE;
+  return maybe_false ? BranchClass::BOTH : BranchClass::ALWAYS_TRUE;
+}
+
+void SymbolicSimulator::set_simplify_policy(unsigned every, size_t dag_limit)
+{
+  simplify_every_ = every;
+  simplify_dag_limit_ = dag_limit;
+}
+
+void SymbolicSimulator::_apply_simplify_policy()
+{
+  size_t frame = trace_.size() - 1;
+  bool need = simplify_every_ != 0 && frame >= simplify_last_ + simplify_every_;
+  if (!need && simplify_dag_limit_ != 0) {
+    for (const auto & sv : trace_.back()) {
+      if (SimStats::dag_size(sv.second) > simplify_dag_limit_) {
+        need = true;
+        break;
+      }
+    }
+  }
+  if (need)
+    simplify_current_state();
+}
+
+unsigned SymbolicSimulator::simplify_current_state()
+{
+  if (trace_.empty())
+    throw SimulatorException("Simulator.init should be called before simplification");
+  SimStats::Timer timer(stats_, "simplify");
+  simplify_last_ = trace_.size() - 1;
+
+  // the queries below only use check_sat_assuming, the scopes of the
+  // incremental mode would add the constraints to them
+  if (solver_scoped_)
+    _clear_solver_scopes();
+
+  StateAsmpt s(trace_.back(), all_assumptions(), all_assumption_interp());
+  state_simplify_xvar(s, Xvar_, solver_);
+
+  unsigned changed = 0;
+  for (auto & sv : s.update_sv()) {
+    if (!sv.second->is_value()) {
+      auto c = check_if_constant(sv.second, s.get_assumptions(), solver_);
+      if (c)
+        sv.second = c;
+    }
+    if (sv.second != trace_.back().at(sv.first))
+      ++changed;
+  }
+  trace_.mutable_back().swap(s.update_sv());
+  return changed;
+}
+
+void SymbolicSimulator::set_abstraction_budget(size_t dag_limit,
+                                               double seconds)
+{
+  abs_budget_.dag_limit = dag_limit;
+  abs_budget_.seconds = seconds;
+}
+
+void SymbolicSimulator::set_abstraction_budget(const smt::Term & var,
+                                               size_t dag_limit,
+                                               double seconds)
+{
+  if (svar_.find(var) == svar_.end())
+    throw SimulatorException("Expecting " + var->to_string()
+                             + " to be state var");
+  auto & b = abs_budget_var_[var];
+  b.dag_limit = dag_limit;
+  b.seconds = seconds;
+}
+
+const AbstractionBudget & SymbolicSimulator::_budget_of(
+    const smt::Term & var) const
+{
+  auto pos = abs_budget_var_.find(var);
+  return pos == abs_budget_var_.end() ? abs_budget_ : pos->second;
+}
+
+bool SymbolicSimulator::_abstraction_timed() const
+{
+  if (abs_budget_.seconds > 0)
+    return true;
+  for (const auto & b : abs_budget_var_)
+    if (b.second.seconds > 0)
+      return true;
+  return false;
+}
+
+void SymbolicSimulator::_apply_abstraction_budget(
+    const std::unordered_map<smt::Term, double> & update_time)
+{
+  if (abs_budget_var_.empty() && abs_budget_.dag_limit == 0
+      && abs_budget_.seconds == 0)
+    return;
+
+  // the variables within budget are kept by TraceManager::abstract
+  StateAsmpt s(trace_.back(), {}, {});
+  smt::UnorderedTermSet over;
+  for (const auto & sv : s.get_sv()) {
+    const auto & b = _budget_of(sv.first);
+    bool exceeded = false;
+    if (b.seconds > 0) {
+      auto t = update_time.find(sv.first);
+      exceeded = t != update_time.end() && t->second > b.seconds;
+    }
+    if (!exceeded && b.dag_limit > 0 && !sv.second->is_symbol()
+        && !sv.second->is_value())
+      exceeded = SimStats::dag_size(sv.second) > b.dag_limit;
+    if (exceeded) {
+      over.insert(sv.first);
+      abs_keep_.remove_base_var(sv.first);
+    } else
+      abs_keep_.record_base_var(sv.first);
+  }
+  if (over.empty())
+    return;
+
+  StateAsmpt abs = over.size() < s.get_sv().size()
+                       ? abs_keep_.abstract(s)
+                       : StateAsmpt({}, {}, {});
+  size_t frame = trace_.size() - 1;
+  for (const auto & v : over) {
+    auto x = new_var(v->get_sort()->get_width(), v->to_string(), true);
+    abstractions_.push_back({ frame, v, s.get_sv().at(v), x });
+    abs.update_sv().emplace(v, x);
+  }
+  trace_.mutable_back().swap(abs.update_sv());
+}
+
+smt::Term SymbolicSimulator::concretize(const smt::Term & t) const
+{
+  // a recorded value can refer to the X variables of earlier abstractions,
+  // so the latest ones are replaced first
+  smt::Term ret = t;
+  for (auto pos = abstractions_.rbegin(); pos != abstractions_.rend(); ++pos)
+    ret = solver_->substitute(ret, smt::UnorderedTermMap{ { pos->xvar, pos->value } });
+  return ret;
+}
+
+smt::Result SymbolicSimulator::check_sat_concrete(
+    const smt::TermVec & goals,
+    const smt::TermVec & constraints,
+    bool with_assumptions)
+{
+  // the incremental scopes hold the abstract assumptions
+  if (solver_scoped_)
+    _clear_solver_scopes();
+  smt::TermVec query;
+  for (const auto & t : _query(goals, constraints, with_assumptions))
+    query.push_back(concretize(t));
+  return _check_sat_assuming(query);
+}
+
+SymbolicSimulator::Snapshot SymbolicSimulator::snapshot() const
+{
+  return Snapshot{ trace_,
+                   history_choice_,
+                   history_assumptions_,
+                   history_assumptions_interp_,
+                   abstractions_,
+                   simplify_last_ };
+}
+
+void SymbolicSimulator::restore(const Snapshot & s)
+{
+  // the solver scopes of the frames that are still the same can be kept
+  _mark_frame_dirty(history_assumptions_.common_prefix(s.history_assumptions));
+  trace_ = s.trace;
+  history_choice_ = s.history_choice;
+  history_assumptions_ = s.history_assumptions;
+  history_assumptions_interp_ = s.history_assumptions_interp;
+  abstractions_ = s.abstractions;
+  simplify_last_ = s.simplify_last;
+}
+
+std::shared_ptr<SymbolicSimulator> SymbolicSimulator::fork()
+{
+  // the scopes of one would be asserted in the queries of the other,
+  // so neither keeps any as they share the solver
+  set_incremental(false);
+  solver_shared_ = true;
+  auto ret = std::make_shared<SymbolicSimulator>(*this);
+  // the copied index refers to the entries of this cache
+  ret->query_cache_ = QueryCache(query_cache_.capacity());
+  return ret;
+}
+
+std::map<std::string, size_t> SymbolicSimulator::state_dag_sizes() const
+{
+  std::map<std::string, size_t> ret;
+  if (trace_.empty())
+    return ret;
+  for (const auto & sv : trace_.back())
+    ret.emplace(sv.first->to_string(), SimStats::dag_size(sv.second));
+  return ret;
+}
+
+std::vector<size_t> SymbolicSimulator::frame_assumption_counts() const
+{
+  std::vector<size_t> ret;
+  for (const auto & l : history_assumptions_)
+    ret.push_back(l.size());
+  return ret;
+}
+
 smt::Term SymbolicSimulator::set_var(int bitwdth, std::string vname /*= "var"*/)
 {
   if (bitwdth < 0)
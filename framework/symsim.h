@@ -10,7 +10,11 @@
 
 #include "utils/exceptions.h"
 
+#include "query_cache.h"
+#include "shared_frames.h"
+#include "sim_stats.h"
 #include "term_manip.h"
+#include "tracemgr.h"
 #include "ts.h"
 
 #include <functional>
@@ -29,6 +33,32 @@ typedef std::variant<int, std::string, smt::Term> value_type;
 /// from string (variable name) to value
 typedef std::map<std::string, value_type> assignment_type;
 
+/// which ways a branch condition can go under the assumptions
+enum class BranchClass
+{
+  ALWAYS_TRUE,
+  ALWAYS_FALSE,
+  BOTH,
+  INFEASIBLE  // the assumptions cannot hold, neither way is possible
+};
+
+/// the budget of a state variable before its value is abstracted,
+/// 0 means no limit
+struct AbstractionBudget
+{
+  size_t dag_limit = 0;  // nodes in the DAG of its value
+  double seconds = 0;    // time to compute its value in one step
+};
+
+/// the value of var on frame was replaced by the fresh X variable xvar
+struct AbstractionRecord
+{
+  size_t frame;
+  smt::Term var;
+  smt::Term value;
+  smt::Term xvar;
+};
+
 class SymbolicSimulator
 {
  private:
@@ -61,7 +91,8 @@ class SymbolicSimulator
   // we will keep a reference to ts
   // and a copy of the pointer to the solver
   SymbolicSimulator(TransitionSystem & ts, const smt::SmtSolver & s)
-      : ts_(ts), solver_(s), invar_(ts.inputvars()), svar_(ts.statevars())
+      : ts_(ts), solver_(s), invar_(ts.inputvars()), svar_(ts.statevars()),
+        abs_keep_(ts, solver_)
   {
   }
 
@@ -70,16 +101,71 @@ class SymbolicSimulator
   smt::SmtSolver solver_;  // smt::SmtSolver is a smart pointer
   const smt::UnorderedTermSet & invar_;
   const smt::UnorderedTermSet & svar_;
-  std::vector<smt::UnorderedTermMap> trace_;
-  std::vector<ChoiceItem> history_choice_;
-  std::vector<smt::TermVec> history_assumptions_;
-  std::vector<std::vector<std::string>> history_assumptions_interp_;
+  // the frames are shared with snapshots and forks until they are modified
+  SharedFrames<smt::UnorderedTermMap> trace_;
+  SharedFrames<ChoiceItem> history_choice_;
+  SharedFrames<smt::TermVec> history_assumptions_;
+  SharedFrames<std::vector<std::string>> history_assumptions_interp_;
   std::unordered_map<std::string, int> name_cnt_;
+  /// added to the names of new X variables, see set_name_tag
+  std::string name_tag_;
   smt::UnorderedTermSet Xvar_;
 
+  // incremental solving: the solver holds one scope for the extra
+  // constraints and then one scope per frame of history_assumptions_
+  bool incremental_ = false;
+  bool solver_scoped_ = false;
+  /// set by fork, the solver cannot hold scopes anymore
+  bool solver_shared_ = false;
+  smt::TermVec solver_constraints_;
+  /// the assumptions asserted in the scope of each frame
+  std::vector<smt::TermVec> solver_frames_;
+  /// frames starting from this index may differ from history_assumptions_
+  size_t solver_dirty_from_ = 0;
+  /// results of check_sat_query, disabled by default
+  QueryCache query_cache_;
+  /// counters and timers, disabled by default
+  mutable SimStats stats_;
+
+  // simplification policy, see set_simplify_policy
+  unsigned simplify_every_ = 0;
+  size_t simplify_dag_limit_ = 0;
+  /// the frame that was simplified last
+  size_t simplify_last_ = 0;
+
+  /// run simplify_current_state if the policy asks for it
+  void _apply_simplify_policy();
+
+  // abstraction of the state variables over their budget
+  AbstractionBudget abs_budget_;
+  std::unordered_map<smt::Term, AbstractionBudget> abs_budget_var_;
+  std::vector<AbstractionRecord> abstractions_;
+  /// keeps the state variables within budget, reused across steps
+  TraceManager abs_keep_;
+
+  const AbstractionBudget & _budget_of(const smt::Term & var) const;
+  /// whether some budget limits the time of a state update
+  bool _abstraction_timed() const;
+  /// replace the current values that are over budget by fresh X variables
+  void _apply_abstraction_budget(
+      const std::unordered_map<smt::Term, double> & update_time);
+
   void _check_only_invar(const smt::UnorderedTermMap & vdict) const;
   bool _expr_only_sv(const smt::Term & expr) const;
 
+  /// the whole query (used as the cache key or sent to the solver at once)
+  smt::TermVec _query(const smt::TermVec & goals,
+                      const smt::TermVec & constraints,
+                      bool with_assumptions) const;
+
+  /// solver_->check_sat_assuming, recorded in stats_
+  smt::Result _check_sat_assuming(const smt::TermVec & query);
+
+  void _mark_frame_dirty(size_t idx);
+  void _clear_solver_scopes();
+  /// make the solver scopes hold exactly the constraints and all_assumptions()
+  void _sync_solver(const smt::TermVec & constraints);
+
   /**
    * @brief
    *
@@ -130,6 +216,10 @@ class SymbolicSimulator
   /// usage: set_input -> sim_one_step --> (a new state) -> backtrack ->
   /// undo_set_input
   void undo_set_input();
+  /// create fresh symbolic values for all input variables of the next cycle,
+  /// the ones given in defaults are used instead of fresh variables
+  smt::UnorderedTermMap new_input_map(
+      const smt::UnorderedTermMap & defaults = {});
 
   /// similar to cur(), but will check no reference to the input variables
   smt::Term interpret_state_expr_on_curr_frame(const smt::Term & expr) const;
@@ -140,6 +230,19 @@ class SymbolicSimulator
 
   /// do simulation
   void sim_one_step();
+  /// simulate n steps in one call, the inputs of step i are
+  /// fresh variables, overridden by defaults and then by inputs[i];
+  /// pre_assumptions[i] are added before step i (as in set_input)
+  void sim_steps(unsigned n,
+                 const std::vector<smt::UnorderedTermMap> & inputs,
+                 const std::vector<smt::TermVec> & pre_assumptions,
+                 const smt::UnorderedTermMap & defaults = {});
+  /// the same, but the inputs of step i are given by input_of(i), which is
+  /// called right before step i, so it can look at the current state
+  void sim_steps(unsigned n,
+                 const std::function<smt::UnorderedTermMap(unsigned)> & input_of,
+                 const std::vector<smt::TermVec> & pre_assumptions,
+                 const smt::UnorderedTermMap & defaults = {});
 
   /// get the set of all X variables
   const smt::UnorderedTermSet & get_Xs() const { return Xvar_; }
@@ -152,5 +255,96 @@ class SymbolicSimulator
   /// get solver
   smt::SmtSolver get_solver() const { return solver_; }
 
+  /// put tag in the names of the X variables created from now on, so they
+  /// do not clash with those of another simulator when the states of both
+  /// are brought into one solver
+  void set_name_tag(const std::string & tag) { name_tag_ = tag; }
+
+  /// keep the assumptions asserted in the solver (one scope per frame),
+  /// so that a query only adds its goals. Note that while it is enabled,
+  /// the asserted assumptions also apply to other users of the solver
+  void set_incremental(bool en);
+  bool is_incremental() const { return incremental_; }
+  /// check the goals under all assumptions and the extra constraints,
+  /// only the frames changed since the last query are (re-)asserted
+  smt::Result check_sat_incremental(const smt::TermVec & goals,
+                                    const smt::TermVec & constraints = {});
+
+  /// check the goals and constraints (and all assumptions if
+  /// with_assumptions is set) through the query cache. In incremental
+  /// mode, a query without the assumptions first pops all solver scopes
+  smt::Result check_sat_query(const smt::TermVec & goals,
+                              const smt::TermVec & constraints,
+                              bool with_assumptions);
+  /// the cache used by check_sat_query
+  QueryCache & query_cache() { return query_cache_; }
+
+  /// decide whether cond is always true, always false or can be both under
+  /// all assumptions, the constraints and the extra assumptions, or whether
+  /// these cannot hold at all (INFEASIBLE).
+  /// Both checks run in one solver scope.
+  BranchClass classify(const smt::Term & cond,
+                       const smt::TermVec & assumptions,
+                       const smt::TermVec & constraints = {});
+
+  /// simplify the current state after sim_one_step every `every` cycles,
+  /// or when the DAG of a state variable grows beyond dag_limit nodes.
+  /// 0 disables the corresponding trigger (both are disabled by default)
+  void set_simplify_policy(unsigned every, size_t dag_limit);
+  /// rewrite the current state variables under all assumptions: fix X
+  /// variables, resolve ITE conditions and replace values that can only be
+  /// a constant with that constant, returns the number of changed variables
+  unsigned simplify_current_state();
+
+  /// after each step, replace the value of a state variable with a fresh
+  /// X variable if its DAG is larger than dag_limit or computing it took
+  /// longer than seconds (0: no limit). This sets the default budget,
+  /// the second form sets the budget of one state variable
+  void set_abstraction_budget(size_t dag_limit, double seconds);
+  void set_abstraction_budget(const smt::Term & var,
+                              size_t dag_limit,
+                              double seconds);
+  /// the abstractions made so far
+  const std::vector<AbstractionRecord> & abstractions() const
+  {
+    return abstractions_;
+  }
+  /// replace the X variables introduced by abstraction with the values
+  /// they stand for
+  smt::Term concretize(const smt::Term & t) const;
+  /// check_sat_query, but on the concrete values of the abstracted
+  /// state variables, used to confirm a failing check
+  smt::Result check_sat_concrete(const smt::TermVec & goals,
+                                 const smt::TermVec & constraints,
+                                 bool with_assumptions);
+
+  /// the trace and assumptions at some point, sharing their frames
+  /// with the simulator
+  struct Snapshot
+  {
+    SharedFrames<smt::UnorderedTermMap> trace;
+    SharedFrames<ChoiceItem> history_choice;
+    SharedFrames<smt::TermVec> history_assumptions;
+    SharedFrames<std::vector<std::string>> history_assumptions_interp;
+    std::vector<AbstractionRecord> abstractions;
+    size_t simplify_last;
+  };
+
+  /// take a snapshot of the current trace, only the frame pointers are copied
+  Snapshot snapshot() const;
+  /// go back (or forward) to a snapshot of this simulator
+  void restore(const Snapshot & s);
+  /// an independent simulator that continues from the current state and
+  /// shares the frames so far. It uses the same solver, so incremental mode
+  /// is turned off in both and cannot be enabled again
+  std::shared_ptr<SymbolicSimulator> fork();
+
+  /// time spent in each phase and the solver calls
+  SimStats & stats() { return stats_; }
+  /// the DAG size of the current value of each state variable
+  std::map<std::string, size_t> state_dag_sizes() const;
+  /// the number of assumptions on each frame
+  std::vector<size_t> frame_assumption_counts() const;
+
 };
 }  // namespace wasim
@@ -1,6 +1,14 @@
 #include "symtraverse.h"
 #include "utils/logger.h"
 
+#include <algorithm>
+#include <condition_variable>
+#include <deque>
+#include <exception>
+#include <memory>
+#include <mutex>
+#include <thread>
+
 namespace wasim {
 
 
@@ -77,6 +85,51 @@ bool PerStateStack::deeper_choice()
   return true;
 }
 
+void PerStateStack::set_choices(const std::vector<int> & values)
+{
+  assert(values.size() <= branching_point_.size());
+  stack_.clear();
+  for (size_t idx = 0; idx < values.size(); ++idx)
+    stack_.push_back(branching_point_.at(idx).copy_node_with_value(values.at(idx)));
+  ptr_ = values.size();
+  no_next_choice_ = false;
+}
+
+void SymbolicTraverse::record_branch(const std::vector<StateAsmpt> & branch)
+{
+  if (sink_)
+    sink_->on_branch(branch);
+  if (keep_branches_)
+    all_branches_.push_back(branch);
+  else
+    last_branch_ = branch;
+}
+
+const std::vector<StateAsmpt> & SymbolicTraverse::last_branch() const
+{
+  return keep_branches_ ? all_branches_.back() : last_branch_;
+}
+
+void SymbolicTraverse::new_state_recorded()
+{
+  if (sink_)
+    sink_->on_state(tracemgr_.get_abs_state().back());
+}
+
+void SymbolicTraverse::simplify_abs_state(const smt::UnorderedTermSet & Xs)
+{
+  // TODO : simplification procedure
+  for (auto & abs_state : tracemgr_.update_abs_state()) {
+    bool reachable_before_simplification = tracemgr_.check_reachable(abs_state);
+    state_simplify_xvar(abs_state, Xs, solver_);
+    sygus_simplify(abs_state, Xs, solver_);
+    assert(! abs_state.syntactically_contains_x(Xs));
+    bool reachable_after_simplification = tracemgr_.check_reachable(abs_state);
+    assert(reachable_before_simplification);
+    assert(reachable_after_simplification);
+  }
+}
+
 unsigned SymbolicTraverse::traverse_one_step(
     const smt::TermVec & assumptions,
     const std::vector<TraverseBranchingNode> & branching_point)
@@ -93,6 +146,7 @@ unsigned SymbolicTraverse::traverse_one_step(
   assert(concrete_enough);
   auto is_new_state = tracemgr_.record_state(state, simulator_.get_Xs());
   assert(is_new_state);
+  new_state_recorded();
 
   PerStateStack init_choice(branching_point, simulator_);
 
@@ -135,6 +189,8 @@ unsigned SymbolicTraverse::traverse_one_step(
 
     bool is_new_state =
         tracemgr_.record_state(state, simulator_.get_Xs());
+    if (is_new_state)
+      new_state_recorded();
 
     init_choice.next_choice();
     simulator_.backtrack();
@@ -145,18 +201,168 @@ unsigned SymbolicTraverse::traverse_one_step(
   WASIM_DLOG("traverse_one_step") << "Finish!" ;
   WASIM_DLOG("traverse_one_step") << "Get #state: " << tracemgr_.get_abs_state().size();
 
-  // TODO : simplification procedure
-  for (auto & abs_state_one_step : tracemgr_.update_abs_state()) {
-    bool reachable_before_simplification =
-        tracemgr_.check_reachable(abs_state_one_step);
-    state_simplify_xvar(abs_state_one_step, simulator_.get_Xs(), solver_);
-    sygus_simplify(abs_state_one_step, simulator_.get_Xs(), solver_);
-    assert(! abs_state_one_step.syntactically_contains_x(simulator_.get_Xs()));
-    bool reachable_after_simplification =
-        tracemgr_.check_reachable(abs_state_one_step);
-    assert(reachable_before_simplification);
-    assert(reachable_after_simplification);
+  simplify_abs_state(simulator_.get_Xs());
+  return tracemgr_.get_abs_state().size();
+}
+
+// the copy of the traversal used by a thread of traverse_one_step_parallel
+struct TraverseWorker
+{
+  smt::SmtSolver solver;
+  std::unique_ptr<TransitionSystem> ts;
+  std::unique_ptr<SymbolicSimulator> simulator;
+  std::unique_ptr<TraceManager> tracemgr;
+  std::unique_ptr<smt::TermTranslator> to_main;  // into the solver of the traversal
+  smt::TermVec assumptions;
+};
+
+unsigned SymbolicTraverse::traverse_one_step_parallel(
+    const smt::TermVec & assumptions,
+    const std::vector<TraverseBranchingNode> & branching_point,
+    unsigned num_workers,
+    const SolverMaker & make_solver)
+{
+  auto state = simulator_.get_curr_state(assumptions);
+  bool reachable = tracemgr_.check_reachable(state);
+
+  WASIM_WARN_IF(! reachable) << "[DEBUG warning] not reachable! skip!";
+  if (! reachable)
+    return 0;
+
+  bool concrete_enough =
+      tracemgr_.check_concrete_enough(state, simulator_.get_Xs());
+  assert(concrete_enough);
+  auto is_new_state = tracemgr_.record_state(state, simulator_.get_Xs());
+  assert(is_new_state);
+  new_state_recorded();
+
+  if (num_workers == 0)
+    num_workers = std::max(1u, std::thread::hardware_concurrency());
+
+  // 1. copy the traversal for each worker (here, the solver of the
+  // traversal is only used by this thread)
+  auto start = simulator_.get_curr_state();
+  std::vector<TraverseWorker> workers(num_workers);
+  for (unsigned w = 0; w < num_workers; ++w) {
+    auto & worker = workers.at(w);
+    if (make_solver)
+      worker.solver = make_solver();
+    else {
+      worker.solver = smt::BoolectorSolverFactory::create(false);
+      worker.solver->set_logic("QF_UFBV");
+      worker.solver->set_opt("incremental", "true");
+      worker.solver->set_opt("produce-models", "true");
+      worker.solver->set_opt("produce-unsat-assumptions", "true");
+    }
+    smt::TermTranslator to_worker(worker.solver);
+    worker.ts.reset(new TransitionSystem(sts_, to_worker));
+    worker.simulator.reset(new SymbolicSimulator(*worker.ts, worker.solver));
+    worker.simulator->set_current_state(StateAsmpt(start, to_worker));
+    worker.simulator->set_name_tag("w" + std::to_string(w) + "_");
+    worker.tracemgr.reset(new TraceManager(*worker.ts, worker.solver));
+    for (const auto & v : base_variable_)
+      worker.tracemgr->record_base_var(to_worker.transfer_term(v));
+    for (const auto & x : simulator_.get_Xs())
+      worker.tracemgr->record_x_var(to_worker.transfer_term(x));
+    for (const auto & a : assumptions)
+      worker.assumptions.push_back(to_worker.transfer_term(a, smt::BOOL));
+    worker.to_main.reset(new smt::TermTranslator(solver_));
   }
+
+  // 2. a choice prefix (the values of the first branching points) is a
+  // job, a prefix that does not lead to a concrete state makes a job for
+  // each value of the next branching point
+  std::mutex mtx;  // guards the queue, tracemgr_ and solver_
+  std::condition_variable cv;
+  std::deque<std::vector<int>> jobs = { {} };
+  unsigned busy = 0;
+  bool failed = false;
+  std::exception_ptr error;
+
+  auto run = [&](TraverseWorker & worker) {
+    auto & sim = *worker.simulator;
+    auto & tracemgr = *worker.tracemgr;
+    PerStateStack choice(branching_point, sim);
+    try {
+      while (true) {
+        std::vector<int> prefix;
+        {
+          std::unique_lock<std::mutex> lock(mtx);
+          cv.wait(lock, [&]() { return failed || !jobs.empty() || busy == 0; });
+          if (failed || jobs.empty())
+            return;
+          // depth first, as the sequential traversal
+          prefix = jobs.back();
+          jobs.pop_back();
+          ++busy;
+        }
+
+        choice.set_choices(prefix);
+        WASIM_DLOG("traverse_one_step") << ">> [" << choice.repr() << "]  ";
+        auto iv_asmpt_pair = choice.get_iv_asmpt(worker.assumptions);
+        sim.set_input(iv_asmpt_pair.first, iv_asmpt_pair.second);
+        sim.sim_one_step();
+        auto state = sim.get_curr_state();
+        std::vector<std::vector<int>> deeper;
+
+        if (! tracemgr.check_reachable(state)) {
+          WASIM_DLOG("traverse_one_step") << "not reachable.";
+        } else if (! tracemgr.check_concrete_enough(state, sim.get_Xs())) {
+          if (prefix.size() == branching_point.size())
+            throw SimulatorException("cannot reach a concrete state even if "
+                                     "all choices are made");
+          WASIM_DLOG("traverse_one_step")  << "not concrete. Retry with deeper choice.";
+          int num_values = branching_point.at(prefix.size()).num_values();
+          // pushed in reverse, so value 0 is taken first
+          for (int v = num_values - 1; v >= 0; --v) {
+            deeper.push_back(prefix);
+            deeper.back().push_back(v);
+          }
+        } else {
+          std::lock_guard<std::mutex> lock(mtx);
+          StateAsmpt state_main(state, *worker.to_main);
+          smt::UnorderedTermSet xs_main;
+          for (const auto & x : sim.get_Xs())
+            xs_main.insert(worker.to_main->transfer_term(x));
+          if (tracemgr_.record_state(state_main, xs_main))
+            new_state_recorded();
+        }
+        sim.backtrack();
+        sim.undo_set_input();
+
+        std::lock_guard<std::mutex> lock(mtx);
+        jobs.insert(jobs.end(), deeper.begin(), deeper.end());
+        --busy;
+        cv.notify_all();
+      }
+    } catch (...) {
+      std::lock_guard<std::mutex> lock(mtx);
+      if (!failed)
+        error = std::current_exception();
+      failed = true;
+      cv.notify_all();
+    }
+  };
+
+  std::vector<std::thread> threads;
+  for (auto & worker : workers)
+    threads.emplace_back(run, std::ref(worker));
+  for (auto & t : threads)
+    t.join();
+  if (error)
+    std::rethrow_exception(error);
+
+  // the Xs of the workers are Xs of the traversal as well
+  smt::UnorderedTermSet Xs = simulator_.get_Xs();
+  for (auto & worker : workers)
+    for (const auto & x : worker.simulator->get_Xs())
+      Xs.insert(worker.to_main->transfer_term(x));
+
+  WASIM_DLOG("traverse_one_step") << "=============================" ;
+  WASIM_DLOG("traverse_one_step") << "Finish!" ;
+  WASIM_DLOG("traverse_one_step") << "Get #state: " << tracemgr_.get_abs_state().size();
+
+  simplify_abs_state(Xs);
   return tracemgr_.get_abs_state().size();
 }
 
@@ -177,6 +383,7 @@ unsigned SymbolicTraverse::traverse(
 
   bool is_new_state = tracemgr_.record_state(state, simulator_.get_Xs());
   assert(is_new_state);
+  new_state_recorded();
 
   PerStateStack init_stack(branching_point, simulator_);
   std::vector<PerStateStack> stack_per_state;
@@ -207,7 +414,7 @@ unsigned SymbolicTraverse::traverse(
         simulator_.undo_set_input();
 
         // store current branch (we have finished on this branch)
-        all_branches_.push_back(curr_branch);
+        record_branch(curr_branch);
         curr_branch.pop_back(); // we are going to backtrack
         branch_end_flag = true;
       }
@@ -257,7 +464,7 @@ unsigned SymbolicTraverse::traverse(
     } // end of not concrete enough
 
     const std::vector<wasim::StateAsmpt> & state_vec = 
-      branch_end_flag ? all_branches_.back() : curr_branch;
+      branch_end_flag ? last_branch() : curr_branch;
 
     if (branch_end_flag)
       branch_end_flag = false;
@@ -267,6 +474,7 @@ unsigned SymbolicTraverse::traverse(
 
     if (is_new_state) {
       WASIM_DLOG("traverse") << "A new state!" ;
+      new_state_recorded();
       curr_branch.push_back(curr_state);
       stack_per_state.push_back(PerStateStack(branching_point, simulator_)); // new stack
     } else {
@@ -281,16 +489,7 @@ unsigned SymbolicTraverse::traverse(
   WASIM_DLOG("traverse") << "Finish!" ;
   WASIM_DLOG("traverse") << "Get #state: " << tracemgr_.get_abs_state().size() ;
 
-  // TODO : simplification procedure
-  for (auto & abs_state : tracemgr_.update_abs_state()) {
-    bool reachable_before_simplification = tracemgr_.check_reachable(abs_state);
-    state_simplify_xvar(abs_state, simulator_.get_Xs(), solver_);
-    sygus_simplify(abs_state, simulator_.get_Xs(), solver_);
-    assert(! abs_state.syntactically_contains_x(simulator_.get_Xs()));
-    bool reachable_after_simplification = tracemgr_.check_reachable(abs_state);
-    assert(reachable_before_simplification);
-    assert(reachable_after_simplification);
-  }
+  simplify_abs_state(simulator_.get_Xs());
   return tracemgr_.get_abs_state().size();
 } // end of traverse
 
@@ -19,6 +19,7 @@
 #include "symsim.h"
 #include "tracemgr.h"
 
+#include <functional>
 #include <optional>
 
 using namespace std;
@@ -59,6 +60,16 @@ class TraverseBranchingNode
     return tmp;
   }
 
+  // the same node set to a given value
+  TraverseBranchingNode copy_node_with_value(int value) const {
+    TraverseBranchingNode tmp = *this;
+    tmp.value_ = value;
+    return tmp;
+  }
+
+  // the number of values to try
+  int num_values() const { return pow(2, v_width_); }
+
   std::string repr() const {
     return (v_name_ + " == " + to_string(value_) + " "); }
 
@@ -95,6 +106,9 @@ class PerStateStack
   // try next choice at the next level, return true if possible
   bool deeper_choice();
 
+  // make the choices: the i-th branching point takes values[i]
+  void set_choices(const std::vector<int> & values);
+
  protected:
 
   smt::SmtSolver solver_;
@@ -107,6 +121,20 @@ class PerStateStack
   bool no_next_choice_;
 };
 
+// receives the results of a traversal as soon as they are found
+// (in traverse_one_step_parallel, calls come from the worker threads,
+// one at a time)
+class TraverseSink
+{
+ public:
+  virtual ~TraverseSink() {}
+  // a state that is not equivalent to the states recorded before it
+  // (as kept by the TraceManager, before the final simplification)
+  virtual void on_state(const StateAsmpt & state) {}
+  // a branch of traverse that has been explored completely
+  virtual void on_branch(const std::vector<StateAsmpt> & branch) {}
+};
+
 class SymbolicTraverse
 {
  public:
@@ -127,7 +155,21 @@ class SymbolicTraverse
   unsigned traverse_one_step(const smt::TermVec & assumptions,
                          const std::vector<TraverseBranchingNode> & branching_point );
 
-  // return the total number of states
+  typedef std::function<smt::SmtSolver()> SolverMaker;
+
+  // the same as traverse_one_step, but the choices are explored by
+  // num_workers threads (0: the number of cores), each with its own solver
+  // made by make_solver (Boolector if empty) and a copy of the transition
+  // system and the current state; the states found are recorded here
+  // (which one of several equivalent states is kept may differ)
+  unsigned traverse_one_step_parallel(const smt::TermVec & assumptions,
+                         const std::vector<TraverseBranchingNode> & branching_point,
+                         unsigned num_workers = 0,
+                         const SolverMaker & make_solver = SolverMaker());
+
+  // return the total number of states. There is no parallel version: a
+  // state is new only if it is not in the current branch (or the last
+  // finished one), so each branch depends on the ones explored before it
   unsigned traverse(const smt::TermVec & assumptions,
                 const std::vector<TraverseBranchingNode> & branching_point );
 
@@ -135,6 +177,15 @@ class SymbolicTraverse
   const std::vector<StateAsmpt> & get_abs_state() const { return tracemgr_.get_abs_state(); }
   const std::vector<std::vector<StateAsmpt>> & get_all_branches() const { return all_branches_; }
 
+  // send states and branches to sink as they are found (NULL: no sink),
+  // if keep_branches is false, the branches are not kept in memory
+  // (get_all_branches() stays empty)
+  void set_sink(TraverseSink * sink, bool keep_branches = true)
+  {
+    sink_ = sink;
+    keep_branches_ = keep_branches;
+  }
+
  protected:
   const TransitionSystem & sts_;
   smt::SmtSolver solver_;
@@ -145,6 +196,20 @@ class SymbolicTraverse
 
   // this is all branches that have been explored
   std::vector<std::vector<StateAsmpt>> all_branches_; 
+  // the last one, when they are not kept
+  std::vector<StateAsmpt> last_branch_;
+
+  TraverseSink * sink_ = NULL;
+  bool keep_branches_ = true;
+
+  // a branch is complete
+  void record_branch(const std::vector<StateAsmpt> & branch);
+  const std::vector<StateAsmpt> & last_branch() const;
+  // a new state has been recorded in tracemgr_
+  void new_state_recorded();
+
+  // simplify the recorded states (removing Xs), at the end of a traversal
+  void simplify_abs_state(const smt::UnorderedTermSet & Xs);
 };
 
 }  // namespace wasim
@@ -3,6 +3,9 @@
 
 #include "smt-switch/utils.h"
 
+#include <algorithm>
+#include <functional>
+
 namespace wasim {
 
 bool TraceManager::record_state(const StateAsmpt & state,
@@ -10,12 +13,17 @@ bool TraceManager::record_state(const StateAsmpt & state,
 {
   record_x_var(Xvar);
 
-  for (const auto & s : abs_state_) {
-    if (abs_eq(s, state)) {
+  if (abs_index_dirty_)
+    rebuild_abs_index();
+  auto fp = fingerprint(state);
+  for (auto pos : abs_candidates(fp)) {
+    if (abs_eq(abs_state_.at(pos), state)) {
       return false;
     }
   }
   abs_state_.push_back(abstract(state));
+  abs_fp_.push_back(fp);  // abstract keeps the base variables
+  index_abs_state(abs_state_.size() - 1);
   return true;
 }
 
@@ -26,18 +34,152 @@ bool TraceManager::record_state_nonexisted_in_vec(
 {
   record_x_var(Xvar);
 
+  auto fp = fingerprint(state);
   for (const auto & s : new_state_vec) {
+    if (!may_abs_eq(fingerprint(s), fp)) {
+      ++abs_eq_skipped_;
+      continue;
+    }
     if (abs_eq(s, state)) { // abs_eq will ensure it only compare on base_var
       return false;
     }
   }
   abs_state_.push_back(abstract(state));
+  if (abs_index_dirty_)
+    rebuild_abs_index();
+  else {
+    abs_fp_.push_back(fp);
+    index_abs_state(abs_state_.size() - 1);
+  }
   return true;
 }
 
+TraceManager::AbsFingerprint TraceManager::fingerprint(const StateAsmpt & s) const
+{
+  std::vector<std::pair<std::string, std::string>> named;
+  for (const auto & sv : s.get_sv()) {
+    if (base_var_.find(sv.first) == base_var_.end())
+      continue;
+    // values are compared as text, a solver may not share equal constants
+    named.emplace_back(sv.first->to_string(),
+                       sv.second->is_value() ? sv.second->to_string() : "");
+  }
+  std::sort(named.begin(), named.end());
+
+  AbsFingerprint fp;
+  for (const auto & n : named) {
+    fp.vars.push_back(n.first);
+    fp.values.push_back(n.second);
+  }
+  return fp;
+}
+
+bool TraceManager::may_abs_eq(const AbsFingerprint & s_abs, const AbsFingerprint & s2)
+{
+  // abs_eq needs every base variable of s_abs in s2, with a value that can
+  // be equal (both are sorted by name)
+  size_t pos2 = 0;
+  for (size_t pos = 0; pos < s_abs.vars.size(); ++pos) {
+    while (pos2 < s2.vars.size() && s2.vars.at(pos2) < s_abs.vars.at(pos))
+      ++pos2;
+    if (pos2 == s2.vars.size() || s2.vars.at(pos2) != s_abs.vars.at(pos))
+      return false;
+    const auto & v1 = s_abs.values.at(pos);
+    const auto & v2 = s2.values.at(pos2);
+    if (!v1.empty() && !v2.empty() && v1 != v2)
+      return false;
+  }
+  return true;
+}
+
+static size_t hash_values(const std::vector<std::string> & values)
+{
+  size_t h = values.size();
+  for (const auto & v : values)
+    h ^= std::hash<std::string>()(v) + 0x9e3779b9 + (h << 6) + (h >> 2);
+  return h;
+}
+
+void TraceManager::index_abs_state(size_t pos)
+{
+  const auto & fp = abs_fp_.at(pos);
+  std::string key;
+  for (const auto & v : fp.vars)
+    key += v + " ";
+  auto & group = abs_index_[key];
+  if (group.vars.empty())
+    group.vars = fp.vars;
+
+  bool concrete = true;
+  for (const auto & v : fp.values)
+    concrete = concrete && !v.empty();
+  if (concrete)
+    group.concrete.emplace(hash_values(fp.values), pos);
+  else
+    group.others.push_back(pos);
+}
+
+void TraceManager::rebuild_abs_index()
+{
+  abs_fp_.clear();
+  abs_index_.clear();
+  for (size_t pos = 0; pos < abs_state_.size(); ++pos) {
+    abs_fp_.push_back(fingerprint(abs_state_.at(pos)));
+    index_abs_state(pos);
+  }
+  abs_index_dirty_ = false;
+}
+
+std::vector<size_t> TraceManager::abs_candidates(const AbsFingerprint & fp)
+{
+  std::vector<size_t> ret;
+  size_t num_total = 0;
+  for (const auto & g : abs_index_) {
+    const auto & group = g.second;
+    num_total += group.concrete.size() + group.others.size();
+
+    // the values of fp on the variables of the group
+    std::vector<std::string> values;
+    size_t pos2 = 0;
+    bool found_all = true;
+    for (const auto & var : group.vars) {
+      while (pos2 < fp.vars.size() && fp.vars.at(pos2) < var)
+        ++pos2;
+      if (pos2 == fp.vars.size() || fp.vars.at(pos2) != var) {
+        found_all = false;
+        break;
+      }
+      values.push_back(fp.values.at(pos2));
+    }
+    if (!found_all)
+      continue;  // a base variable of these states is missing in fp
+
+    bool concrete = true;
+    for (const auto & v : values)
+      concrete = concrete && !v.empty();
+    if (concrete) {
+      auto range = group.concrete.equal_range(hash_values(values));
+      for (auto it = range.first; it != range.second; ++it)
+        if (abs_fp_.at(it->second).values == values)
+          ret.push_back(it->second);
+    } else {
+      for (const auto & e : group.concrete)
+        if (may_abs_eq(abs_fp_.at(e.second), fp))
+          ret.push_back(e.second);
+    }
+    for (auto pos : group.others)
+      if (may_abs_eq(abs_fp_.at(pos), fp))
+        ret.push_back(pos);
+  }
+  // in the order of abs_state_, as before the index
+  std::sort(ret.begin(), ret.end());
+  abs_eq_skipped_ += num_total - ret.size();
+  return ret;
+}
 
 bool TraceManager::abs_eq(const StateAsmpt & s_abs, const StateAsmpt & s2)
 {
+  ++abs_eq_calls_;
   smt::TermVec expr_vec;
   // for each of the state var in s_abs, find the expression in both
   for (const auto & sv : s_abs.get_sv()) {
@@ -91,6 +233,8 @@ bool TraceManager::check_concrete_enough(const StateAsmpt & s_in, const smt::Uno
     assert(false);
   }
 
+  // all (v, X) pairs of the state are checked in one batch
+  std::vector<IndependenceChecker::ExprVarPair> pairs;
   for (const auto & sv : s_in.get_sv()) {
     auto s = sv.first;
     auto v = sv.second;
@@ -98,20 +242,20 @@ bool TraceManager::check_concrete_enough(const StateAsmpt & s_in, const smt::Uno
       continue;
     }
     smt::UnorderedTermSet allv_in_v;
-    smt::UnorderedTermSet intersec_res;
 
     smt::get_free_symbols(v, allv_in_v);
     for (const auto & var : allv_in_v) {
       if (Xvar_.find(var) != Xvar_.end()) {
-        intersec_res.insert(var);
+        pairs.emplace_back(v, var);
       }
-    } // intersec_res is now all X contained in v
+    } // pairs now has all X contained in v
+  }
 
-    for (const auto & X : intersec_res) {
-      auto ind = e_is_independent_of_v(v, X, s_in.get_assumptions());
-      if (!ind) {
-        return false;
-      }
+  // a few pairs per state, not worth a solver per thread
+  auto ind = e_is_independent_of_v_batch(pairs, s_in.get_assumptions(), 1);
+  for (bool i : ind) {
+    if (!i) {
+      return false;
     }
   }
   return true;
@@ -1,5 +1,8 @@
 #pragma once
+#include <map>
 #include <set>
+#include <string>
+#include <unordered_map>
 #include "smt-switch/boolector_factory.h"
 #include "smt-switch/cvc5_factory.h"
 #include "smt-switch/smt.h"
@@ -14,7 +17,8 @@ class TraceManager
 {
  public:
   TraceManager(const TransitionSystem & ts, smt::SmtSolver & s)
-      : ts_(ts), solver_(s), invar_(ts.inputvars()), svar_(ts.statevars())
+      : ts_(ts), solver_(s), invar_(ts.inputvars()), svar_(ts.statevars()),
+        abs_index_dirty_(false), abs_eq_calls_(0), abs_eq_skipped_(0)
   {
   }
  
@@ -28,20 +32,60 @@ class TraceManager
 
   std::vector<StateAsmpt> abs_state_;
 
+  // The values of the base variables of a state, used to rule out
+  // abstract equivalence without the solver: two states cannot be
+  // equivalent if a base variable has different constants in them.
+  struct AbsFingerprint
+  {
+    std::vector<std::string> vars;    // names of the base variables, sorted
+    std::vector<std::string> values;  // the constant, "" if not a constant
+  };
+
+  // the states in abs_state_ with the same base variables; those whose
+  // base variables are all constants are found by the hash of the values
+  struct AbsIndexGroup
+  {
+    std::vector<std::string> vars;
+    std::unordered_multimap<size_t, size_t> concrete;  // -> position
+    std::vector<size_t> others;
+  };
+
+  std::vector<AbsFingerprint> abs_fp_;  // of abs_state_
+  std::map<std::string, AbsIndexGroup> abs_index_;
+  bool abs_index_dirty_;  // base_var_ or abs_state_ changed outside
+  size_t abs_eq_calls_;
+  size_t abs_eq_skipped_;
+
+  AbsFingerprint fingerprint(const StateAsmpt & s) const;
+  // false if s_abs cannot be abstractly equivalent to s2
+  static bool may_abs_eq(const AbsFingerprint & s_abs, const AbsFingerprint & s2);
+  void index_abs_state(size_t pos);
+  void rebuild_abs_index();
+  // the positions in abs_state_ that may be equivalent to a state
+  std::vector<size_t> abs_candidates(const AbsFingerprint & fp);
+
  public:
   const std::vector<StateAsmpt> & get_abs_state() const { return abs_state_; }
 
-  std::vector<StateAsmpt> & update_abs_state() { return abs_state_; }
+  std::vector<StateAsmpt> & update_abs_state()
+  {
+    abs_index_dirty_ = true;
+    return abs_state_;
+  }
+
+  // the number of abs_eq checks made, and avoided by the index
+  size_t num_abs_eq_calls() const { return abs_eq_calls_; }
+  size_t num_abs_eq_skipped() const { return abs_eq_skipped_; }
 
   void record_x_var(const smt::Term & var) { Xvar_.insert(var); }
   void record_x_var(const smt::TermVec & var) { Xvar_.insert(var.begin(), var.end()); }
   void record_x_var(const smt::UnorderedTermSet & var) { Xvar_.insert(var.begin(), var.end()); }
 
-  void record_base_var(const smt::Term & var) { base_var_.insert(var); }
-  void record_base_var(const smt::TermVec & var) { base_var_.insert(var.begin(), var.end()); }
-  void record_base_var(const smt::UnorderedTermSet & var) { base_var_.insert(var.begin(), var.end()); }
+  void record_base_var(const smt::Term & var) { base_var_.insert(var); abs_index_dirty_ = true; }
+  void record_base_var(const smt::TermVec & var) { base_var_.insert(var.begin(), var.end()); abs_index_dirty_ = true; }
+  void record_base_var(const smt::UnorderedTermSet & var) { base_var_.insert(var.begin(), var.end()); abs_index_dirty_ = true; }
 
-  void remove_base_var(const smt::Term & var) { base_var_.erase(var); };
+  void remove_base_var(const smt::Term & var) { base_var_.erase(var); abs_index_dirty_ = true; };
 
   // record a state into abs_state_, return true if it is not abstractly
   // equivalent to any state in abs_state_
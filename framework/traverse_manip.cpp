@@ -47,7 +47,8 @@ void extend_branch_next_phase(
     smt::TermVec flag_asmpt,
     assignment_type phase_marker,
     std::vector<TraverseBranchingNode> order,
-    smt::SmtSolver & solver)
+    smt::SmtSolver & solver,
+    unsigned num_workers /*=1*/)
 {
   auto branch_list_old(branch_list);
   branch_list.clear();
@@ -68,12 +69,15 @@ void extend_branch_next_phase(
     }
     SymbolicTraverse traverse_temp(sts, simulator_temp, solver, base_variable);
     auto assumptions = flag_asmpt;
-    // TODO: you should first set the state to s before this (due to API change of traverse_one_step
-    traverse_temp.traverse_one_step(assumptions, order, { s });
+    // the simulator is already at s
+    if (num_workers == 1)
+      traverse_temp.traverse_one_step(assumptions, order);
+    else
+      traverse_temp.traverse_one_step_parallel(assumptions, order, num_workers);
     cout << "number of state " << flag << ": 1-> "
-         << traverse_temp.tracemgr_.abs_state_one_step_.size() << endl;
+         << traverse_temp.get_abs_state().size() << endl;
 
-    for (auto & nextstate : traverse_temp.tracemgr_.abs_state_one_step_) {
+    for (auto & nextstate : traverse_temp.get_abs_state()) {
       auto state_vec_extend(state_list);
       state_vec_extend.push_back(nextstate);
       branch_list.push_back(state_vec_extend);
@@ -40,6 +40,8 @@ void extend_branch_init(std::vector<std::vector<StateAsmpt>> & branch_list,
                         std::vector<TraverseBranchingNode> order,
                         smt::SmtSolver & solver);
 
+// the one-step traversal from each state is split over num_workers threads
+// (traverse_one_step_parallel, 0 : the number of cores) if it is not 1
 void extend_branch_next_phase(
     std::vector<std::vector<StateAsmpt>> & branch_list,
     SymbolicSimulator & simulator,
@@ -49,8 +51,11 @@ void extend_branch_next_phase(
     smt::TermVec flag_asmpt,
     assignment_type phase_marker,
     std::vector<TraverseBranchingNode> order,
-    smt::SmtSolver & solver);
+    smt::SmtSolver & solver,
+    unsigned num_workers = 1);
 
+// the multi-step traversal always runs on one thread, see
+// SymbolicTraverse::traverse
 void extend_branch_same_phase(
     std::vector<std::vector<StateAsmpt>> & branch_list,
     SymbolicSimulator & simulator,
@@ -1,6 +1,13 @@
 #include <frontend/smt_in.h>
 #include <utils/exceptions.h>
 
+#ifdef __linux__
+#include <sys/mman.h>
+#endif
+#include <unistd.h>
+
+#include <cstdlib>
+
 namespace wasim
 {
   
@@ -13,6 +20,62 @@ WasimSmtLib2Parser::WasimSmtLib2Parser(const std::string & filename,
   assert(!res);  // 0 means success
 }
 
+WasimSmtLib2Parser::WasimSmtLib2Parser(smt::SmtSolver & solver)
+    : super(solver), filename_()
+{
+  set_logic_all();
+}
+
+int WasimSmtLib2Parser::parse_string(const std::string & text)
+{
+  // the reader only takes a file name, so on Linux the text is put in an
+  // anonymous memory file and parsed through its /proc/self/fd entry
+  std::string path;
+  int fd = -1;
+#ifdef __linux__
+  fd = memfd_create("wasim_smt", 0);
+  if (fd >= 0)
+    path = "/proc/self/fd/" + std::to_string(fd);
+#endif
+  char name[] = "/tmp/wasim_smt_XXXXXX";
+  bool temp_file = fd < 0;
+  if (temp_file) {
+    // a private temporary file, removed once it is parsed
+    fd = mkstemp(name);
+    if (fd < 0)
+      throw SimulatorException("unable to create a buffer for parsing");
+    path = name;
+  }
+  auto release = [&]() {
+    close(fd);
+    if (temp_file)
+      unlink(name);
+  };
+
+  const char * pos = text.data();
+  size_t left = text.size();
+  while (left > 0) {
+    ssize_t n = write(fd, pos, left);
+    if (n <= 0) {
+      release();
+      throw SimulatorException("unable to write the buffer for parsing");
+    }
+    pos += n;
+    left -= n;
+  }
+
+  filename_ = path;
+  int res;
+  try {
+    res = parse(path);
+  } catch (...) {
+    release();
+    throw;
+  }
+  release();
+  return res;
+}
+
 smt::Term WasimSmtLib2Parser::register_arg(const std::string & name,
                                           const smt::Sort & sort)
 {
@@ -40,5 +103,13 @@ smt::Term WasimSmtLib2Parser::return_defs()
   return NULL;
 }
 
+smt::Term WasimSmtLib2Parser::get_def(const std::string & name) const
+{
+  auto pos = defs_.find(name);
+  if (pos == defs_.end())
+    throw SimulatorException("No function definition named " + name);
+  return pos->second;
+}
+
 
 } // namespace wasim
@@ -10,10 +10,17 @@ class WasimSmtLib2Parser : public smt::SmtLibReader
 {
  public:
   WasimSmtLib2Parser(const std::string & filename, smt::SmtSolver & solver);
+  // nothing is parsed until parse_string is called
+  WasimSmtLib2Parser(smt::SmtSolver & solver);
 
   typedef SmtLibReader super;
 
   smt::Term return_defs();
+  // the body of the function defined as name
+  smt::Term get_def(const std::string & name) const;
+  // parse commands held in memory (on Linux, no file is created on disk),
+  // returns 0 on success like parse
+  int parse_string(const std::string & text);
 
  protected:
   // overloaded function, used when arg list of function is parsed
@@ -0,0 +1,586 @@
+#include <frontend/state_archive.h>
+#include <framework/term_manip.h>
+#include <utils/exceptions.h>
+
+#include <cstring>
+#include <iostream>
+
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+
+namespace wasim {
+
+static const char MAGIC[] = "WASIMST1";
+static const char MAGIC_END[] = "WASIMEND";
+static const size_t MAGIC_LEN = 8;
+
+enum : uint8_t
+{
+  REC_TERM = 'T',
+  REC_STATE = 'S'
+};
+
+enum : uint8_t
+{
+  NODE_SYMBOL = 0,
+  NODE_VALUE = 1,
+  NODE_CONST_ARRAY = 2,
+  NODE_OP = 3
+};
+
+enum : uint8_t
+{
+  SORT_BOOL = 0,
+  SORT_BV = 1,
+  SORT_ARRAY = 2
+};
+
+// ---------------------------------------------------------------------
+// writer
+
+StateArchiveWriter::StateArchiveWriter(const std::string & filename,
+                                       const smt::SmtSolver & solver,
+                                       bool append)
+    : filename_(filename), solver_(solver), offset_(0), closed_(false)
+{
+  std::ifstream exists(filename);
+  if (append && exists.good()) {
+    exists.close();
+    // continue after the last record, the index is written again by close
+    StateArchiveReader reader(filename, solver);
+    for (uint32_t id = 0; id < reader.num_terms(); ++id)
+      term_id_.emplace(reader.term(id), id);
+    term_offsets_ = reader.term_offsets_;
+    index_ = reader.index_;
+    offset_ = reader.data_end();
+
+    fout_.open(filename, std::ios::in | std::ios::out | std::ios::binary);
+    if (!fout_.is_open())
+      throw SimulatorException("unable to open file for write " + filename);
+    fout_.seekp(offset_);
+    // drop the old index, a reader recovers the records until close
+    if (::truncate(filename.c_str(), offset_) != 0)
+      throw SimulatorException("unable to truncate " + filename);
+    return;
+  }
+
+  fout_.open(filename, std::ios::out | std::ios::trunc | std::ios::binary);
+  if (!fout_.is_open())
+    throw SimulatorException("unable to open file for write " + filename);
+  fout_.write(MAGIC, MAGIC_LEN);
+  offset_ = MAGIC_LEN;
+}
+
+StateArchiveWriter::~StateArchiveWriter()
+{
+  // a destructor cannot throw, call close() to see the errors
+  try {
+    close();
+  } catch (const std::exception & e) {
+    std::cerr << "WARNING: state archive " << filename_
+              << " is not closed properly: " << e.what() << std::endl;
+  }
+}
+
+void StateArchiveWriter::put_u8(uint8_t v)
+{
+  fout_.put(static_cast<char>(v));
+  offset_ += 1;
+}
+
+void StateArchiveWriter::put_u32(uint32_t v)
+{
+  fout_.write(reinterpret_cast<const char *>(&v), sizeof(v));
+  offset_ += sizeof(v);
+}
+
+void StateArchiveWriter::put_u64(uint64_t v)
+{
+  fout_.write(reinterpret_cast<const char *>(&v), sizeof(v));
+  offset_ += sizeof(v);
+}
+
+void StateArchiveWriter::put_str(const std::string & s)
+{
+  put_u32(s.size());
+  fout_.write(s.data(), s.size());
+  offset_ += s.size();
+}
+
+void StateArchiveWriter::put_sort(const smt::Sort & s)
+{
+  switch (s->get_sort_kind()) {
+    case smt::SortKind::BOOL: put_u8(SORT_BOOL); break;
+    case smt::SortKind::BV:
+      put_u8(SORT_BV);
+      put_u32(s->get_width());
+      break;
+    case smt::SortKind::ARRAY:
+      put_u8(SORT_ARRAY);
+      put_sort(s->get_indexsort());
+      put_sort(s->get_elemsort());
+      break;
+    default:
+      throw SimulatorException("unsupported sort in state archive: "
+                               + s->to_string());
+  }
+}
+
+uint32_t StateArchiveWriter::put_term(const smt::Term & t)
+{
+  // post-order without recursion, the children get their ids first
+  std::vector<std::pair<smt::Term, bool>> stack{ { t, false } };
+  while (!stack.empty()) {
+    if (term_id_.find(stack.back().first) != term_id_.end()) {
+      stack.pop_back();
+      continue;
+    }
+    if (!stack.back().second) {
+      stack.back().second = true;
+      smt::Term n = stack.back().first;
+      for (const auto & c : args(n))
+        if (term_id_.find(c) == term_id_.end())
+          stack.push_back({ c, false });
+      continue;
+    }
+    smt::Term n = stack.back().first;
+    stack.pop_back();
+    put_node(n);
+  }
+  return term_id_.at(t);
+}
+
+void StateArchiveWriter::put_node(const smt::Term & t)
+{
+  uint32_t id = term_offsets_.size();
+  term_offsets_.push_back(offset_);
+  put_u8(REC_TERM);
+  put_sort(t->get_sort());
+  if (t->is_symbol()) {
+    put_u8(NODE_SYMBOL);
+    put_str(t->to_string());
+  } else if (t->is_value()
+             && t->get_sort()->get_sort_kind() == smt::SortKind::ARRAY) {
+    // a constant array, given by its element
+    smt::TermVec children = args(t);
+    if (children.size() != 1)
+      throw SimulatorException("unsupported array value in state archive: "
+                               + t->to_string());
+    put_u8(NODE_CONST_ARRAY);
+    put_u32(term_id_.at(children.at(0)));
+  } else if (t->is_value()) {
+    put_u8(NODE_VALUE);
+    put_str(t->to_string());
+  } else {
+    auto op = t->get_op();
+    put_u8(NODE_OP);
+    put_u32(op.prim_op);
+    put_u32(op.num_idx);
+    put_u64(op.idx0);
+    put_u64(op.idx1);
+    smt::TermVec children = args(t);
+    put_u32(children.size());
+    for (const auto & c : children)
+      put_u32(term_id_.at(c));
+  }
+  term_id_.emplace(t, id);
+}
+
+void StateArchiveWriter::write(size_t i, size_t j, const StateAsmpt & state)
+{
+  if (closed_)
+    throw SimulatorException("state archive " + filename_ + " is closed");
+
+  // the terms go first, so a state record only refers to written terms
+  std::vector<std::pair<uint32_t, uint32_t>> sv;
+  for (const auto & p : state.get_sv())
+    sv.push_back({ put_term(p.first), put_term(p.second) });
+  std::vector<uint32_t> asmpt;
+  for (const auto & a : state.get_assumptions())
+    asmpt.push_back(put_term(a));
+
+  index_[{ i, j }] = offset_;
+  put_u8(REC_STATE);
+  put_u32(i);
+  put_u32(j);
+  put_u32(sv.size());
+  for (const auto & p : sv) {
+    put_u32(p.first);
+    put_u32(p.second);
+  }
+  const auto & interp = state.get_assumption_interpretations();
+  put_u32(asmpt.size());
+  for (size_t idx = 0; idx < asmpt.size(); ++idx) {
+    put_u32(asmpt.at(idx));
+    put_str(idx < interp.size() ? interp.at(idx) : std::string());
+  }
+}
+
+void StateArchiveWriter::flush()
+{
+  fout_.flush();
+  if (fout_.fail())
+    throw SimulatorException("unable to write " + filename_);
+}
+
+void StateArchiveWriter::close()
+{
+  if (closed_)
+    return;
+  // only tried once, a failed archive is left without its index
+  closed_ = true;
+  uint64_t index_offset = offset_;
+  put_u32(index_.size());
+  for (const auto & e : index_) {
+    put_u32(e.first.first);
+    put_u32(e.first.second);
+    put_u64(e.second);
+  }
+  put_u32(term_offsets_.size());
+  for (auto off : term_offsets_)
+    put_u64(off);
+  put_u64(index_offset);
+  fout_.write(MAGIC_END, MAGIC_LEN);
+  offset_ += MAGIC_LEN;
+  fout_.close();
+  if (fout_.fail())
+    throw SimulatorException("unable to write " + filename_);
+  // an appended archive may have had a longer (recovered) tail
+  if (::truncate(filename_.c_str(), offset_) != 0)
+    throw SimulatorException("unable to truncate " + filename_);
+}
+
+// ---------------------------------------------------------------------
+// reader
+
+void StateArchiveReader::Cursor::need(size_t n) const
+{
+  if (static_cast<size_t>(end - pos) < n)
+    throw SimulatorException("truncated state archive");
+}
+
+uint8_t StateArchiveReader::Cursor::u8()
+{
+  need(1);
+  return static_cast<uint8_t>(*pos++);
+}
+
+uint32_t StateArchiveReader::Cursor::u32()
+{
+  uint32_t v;
+  need(sizeof(v));
+  memcpy(&v, pos, sizeof(v));
+  pos += sizeof(v);
+  return v;
+}
+
+uint64_t StateArchiveReader::Cursor::u64()
+{
+  uint64_t v;
+  need(sizeof(v));
+  memcpy(&v, pos, sizeof(v));
+  pos += sizeof(v);
+  return v;
+}
+
+std::string StateArchiveReader::Cursor::str()
+{
+  uint32_t len = u32();
+  need(len);
+  std::string ret(pos, len);
+  pos += len;
+  return ret;
+}
+
+StateArchiveReader::StateArchiveReader(const std::string & filename,
+                                       const smt::SmtSolver & solver)
+    : solver_(solver), data_(NULL), size_(0), recovered_(false), data_end_(0)
+{
+  int fd = ::open(filename.c_str(), O_RDONLY);
+  if (fd < 0)
+    throw SimulatorException("unable to open file for read " + filename);
+  struct stat st;
+  if (fstat(fd, &st) != 0) {
+    ::close(fd);
+    throw SimulatorException("unable to stat " + filename);
+  }
+  size_ = st.st_size;
+  if (size_ > 0) {
+    void * p = mmap(NULL, size_, PROT_READ, MAP_PRIVATE, fd, 0);
+    if (p == MAP_FAILED) {
+      ::close(fd);
+      throw SimulatorException("unable to map " + filename);
+    }
+    data_ = static_cast<const char *>(p);
+  }
+  ::close(fd);  // the mapping stays valid
+
+  if (size_ < MAGIC_LEN || memcmp(data_, MAGIC, MAGIC_LEN) != 0) {
+    if (data_)
+      munmap(const_cast<char *>(data_), size_);
+    throw SimulatorException(filename + " is not a state archive");
+  }
+  if (!read_index()) {
+    index_.clear();
+    term_offsets_.clear();
+    scan();
+  }
+  terms_.resize(term_offsets_.size());
+}
+
+StateArchiveReader::~StateArchiveReader()
+{
+  if (data_)
+    munmap(const_cast<char *>(data_), size_);
+}
+
+StateArchiveReader::Cursor StateArchiveReader::cursor(uint64_t offset) const
+{
+  if (offset > size_)
+    throw SimulatorException("bad offset in state archive");
+  return Cursor{ data_ + offset, data_ + size_ };
+}
+
+bool StateArchiveReader::read_index()
+{
+  if (size_ < MAGIC_LEN * 2 + sizeof(uint64_t)
+      || memcmp(data_ + size_ - MAGIC_LEN, MAGIC_END, MAGIC_LEN) != 0)
+    return false;
+  uint64_t index_offset;
+  memcpy(&index_offset,
+         data_ + size_ - MAGIC_LEN - sizeof(uint64_t),
+         sizeof(index_offset));
+  if (index_offset < MAGIC_LEN || index_offset > size_)
+    return false;
+  try {
+    auto c = cursor(index_offset);
+    uint32_t nstate = c.u32();
+    for (uint32_t k = 0; k < nstate; ++k) {
+      uint32_t i = c.u32();
+      uint32_t j = c.u32();
+      index_[{ i, j }] = c.u64();
+    }
+    uint32_t nterm = c.u32();
+    term_offsets_.reserve(nterm);
+    for (uint32_t k = 0; k < nterm; ++k)
+      term_offsets_.push_back(c.u64());
+  }
+  catch (const SimulatorException &) {
+    return false;
+  }
+  data_end_ = index_offset;
+  return true;
+}
+
+void StateArchiveReader::scan()
+{
+  // rebuild the index from the records, up to the last complete one
+  recovered_ = true;
+  auto c = cursor(MAGIC_LEN);
+  data_end_ = MAGIC_LEN;
+  try {
+    while (c.pos < c.end) {
+      uint64_t offset = c.pos - data_;
+      uint8_t tag = c.u8();
+      if (tag == REC_TERM) {
+        get_node(c);
+        term_offsets_.push_back(offset);
+      } else if (tag == REC_STATE) {
+        uint32_t i = c.u32();
+        uint32_t j = c.u32();
+        uint32_t nsv = c.u32();
+        c.need(nsv * 2 * sizeof(uint32_t));
+        c.pos += nsv * 2 * sizeof(uint32_t);
+        uint32_t nasmpt = c.u32();
+        for (uint32_t k = 0; k < nasmpt; ++k) {
+          c.u32();
+          c.str();
+        }
+        index_[{ i, j }] = offset;
+      } else
+        break;  // the index or garbage
+      data_end_ = c.pos - data_;
+    }
+  }
+  catch (const SimulatorException &) {
+    // a record cut short, ignore it
+  }
+}
+
+smt::Sort StateArchiveReader::get_sort(Cursor & c)
+{
+  uint8_t kind = c.u8();
+  if (kind == SORT_BOOL)
+    return solver_->make_sort(smt::BOOL);
+  if (kind == SORT_BV)
+    return solver_->make_sort(smt::BV, c.u32());
+  if (kind == SORT_ARRAY) {
+    auto idx = get_sort(c);
+    auto elem = get_sort(c);
+    return solver_->make_sort(smt::ARRAY, idx, elem);
+  }
+  throw SimulatorException("bad sort in state archive");
+}
+
+StateArchiveReader::Node StateArchiveReader::get_node(Cursor & c)
+{
+  Node n;
+  n.sort = get_sort(c);
+  n.kind = c.u8();
+  if (n.kind == NODE_SYMBOL || n.kind == NODE_VALUE)
+    n.str = c.str();
+  else if (n.kind == NODE_CONST_ARRAY)
+    n.children.push_back(c.u32());
+  else if (n.kind == NODE_OP) {
+    auto prim_op = static_cast<smt::PrimOp>(c.u32());
+    uint32_t num_idx = c.u32();
+    uint64_t idx0 = c.u64();
+    uint64_t idx1 = c.u64();
+    if (num_idx == 0)
+      n.op = smt::Op(prim_op);
+    else if (num_idx == 1)
+      n.op = smt::Op(prim_op, idx0);
+    else
+      n.op = smt::Op(prim_op, idx0, idx1);
+    uint32_t nchild = c.u32();
+    for (uint32_t k = 0; k < nchild; ++k)
+      n.children.push_back(c.u32());
+  } else
+    throw SimulatorException("bad term in state archive");
+  return n;
+}
+
+smt::Term StateArchiveReader::symbol(const std::string & name,
+                                     const smt::Sort & sort)
+{
+  // the state variables (and the symbols created before) are reused
+  try {
+    return solver_->get_symbol(name);
+  }
+  catch (const std::exception & e) {
+  }
+  if (name.size() > 2 && name.front() == '|' && name.back() == '|') {
+    try {
+      return solver_->get_symbol(name.substr(1, name.size() - 2));
+    }
+    catch (const std::exception & e) {
+    }
+  }
+  return solver_->make_symbol(name, sort);
+}
+
+smt::Term StateArchiveReader::make(const Node & n)
+{
+  switch (n.kind) {
+    case NODE_SYMBOL: return symbol(n.str, n.sort);
+    case NODE_VALUE:
+      if (n.sort->get_sort_kind() == smt::SortKind::BOOL)
+        return solver_->make_term(n.str == "true");
+      if (n.str.compare(0, 2, "#b") == 0)
+        return solver_->make_term(n.str.substr(2), n.sort, 2);
+      if (n.str.compare(0, 2, "#x") == 0)
+        return solver_->make_term(n.str.substr(2), n.sort, 16);
+      return solver_->make_term(n.str, n.sort, 10);
+    case NODE_CONST_ARRAY:
+      return solver_->make_term(terms_.at(n.children.at(0)), n.sort);
+    default: {
+      smt::TermVec children;
+      for (auto id : n.children)
+        children.push_back(terms_.at(id));
+      return solver_->make_term(n.op, children);
+    }
+  }
+}
+
+smt::Term StateArchiveReader::term(uint32_t id)
+{
+  if (id >= terms_.size())
+    throw SimulatorException("bad term id in state archive");
+  // create the missing children first, without recursion
+  std::vector<std::pair<uint32_t, bool>> stack{ { id, false } };
+  while (!stack.empty()) {
+    uint32_t top = stack.back().first;
+    if (terms_.at(top)) {
+      stack.pop_back();
+      continue;
+    }
+    auto c = cursor(term_offsets_.at(top));
+    if (c.u8() != REC_TERM)
+      throw SimulatorException("bad term offset in state archive");
+    Node n = get_node(c);
+    if (!stack.back().second) {
+      stack.back().second = true;
+      for (auto child : n.children) {
+        if (child >= terms_.size())
+          throw SimulatorException("bad term id in state archive");
+        if (!terms_.at(child))
+          stack.push_back({ child, false });
+      }
+      continue;
+    }
+    stack.pop_back();
+    terms_.at(top) = make(n);
+  }
+  return terms_.at(id);
+}
+
+bool StateArchiveReader::has(size_t i, size_t j) const
+{
+  return index_.find({ i, j }) != index_.end();
+}
+
+std::vector<std::pair<size_t, size_t>> StateArchiveReader::keys() const
+{
+  std::vector<std::pair<size_t, size_t>> ret;
+  for (const auto & e : index_)
+    ret.push_back(e.first);
+  return ret;
+}
+
+StateAsmpt StateArchiveReader::read(size_t i, size_t j)
+{
+  auto pos = index_.find({ i, j });
+  if (pos == index_.end())
+    throw SimulatorException("no state (" + std::to_string(i) + ", "
+                             + std::to_string(j) + ") in state archive");
+  auto c = cursor(pos->second);
+  if (c.u8() != REC_STATE)
+    throw SimulatorException("bad state offset in state archive");
+  c.u32();  // i
+  c.u32();  // j
+
+  smt::UnorderedTermMap sv;
+  uint32_t nsv = c.u32();
+  for (uint32_t k = 0; k < nsv; ++k) {
+    uint32_t var = c.u32();
+    uint32_t val = c.u32();
+    sv.emplace(term(var), term(val));
+  }
+  smt::TermVec asmpt;
+  std::vector<std::string> interp;
+  uint32_t nasmpt = c.u32();
+  for (uint32_t k = 0; k < nasmpt; ++k) {
+    asmpt.push_back(term(c.u32()));
+    interp.push_back(c.str());
+  }
+  return StateAsmpt(sv, asmpt, interp);
+}
+
+// ---------------------------------------------------------------------
+// sink
+
+void StateArchiveSink::on_branch(const std::vector<StateAsmpt> & branch)
+{
+  if (next_branch_ < first_branch_) {
+    ++next_branch_;
+    return;
+  }
+  for (size_t j = 0; j < branch.size(); ++j)
+    writer_.write(next_branch_, j, branch.at(j));
+  writer_.flush();
+  ++next_branch_;
+}
+
+}  // namespace wasim
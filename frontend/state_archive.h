@@ -0,0 +1,165 @@
+#pragma once
+#include <framework/ts.h>
+#include <framework/symtraverse.h>
+
+#include "smt-switch/smt.h"
+
+#include <cstdint>
+#include <fstream>
+#include <map>
+#include <string>
+#include <unordered_map>
+#include <utility>
+#include <vector>
+
+namespace wasim {
+
+// A single file holding the states of a traversal, state (i, j) is the
+// j-th state of branch i. Every distinct subterm is stored once.
+//
+// layout:
+//   "WASIMST1"
+//   records, appended in order:
+//     term  : 'T' sort kind ...   (its children are written before it)
+//     state : 'S' i j sv-pairs assumptions
+//   index (written by close):
+//     number of states, (i, j, offset) ...
+//     number of terms, offset ...
+//     offset of the index, "WASIMEND"
+//
+// If the index is missing (the writer did not finish), the reader
+// recovers it by scanning the records.
+// Numbers are stored in the byte order of the host.
+
+class StateArchiveWriter
+{
+ public:
+  /// create an archive, or add states to an existing one if append is set
+  StateArchiveWriter(const std::string & filename,
+                     const smt::SmtSolver & solver,
+                     bool append = false);
+  /// closes the archive if close() was not called, errors are only logged
+  ~StateArchiveWriter();
+
+  void write(size_t i, size_t j, const StateAsmpt & state);
+  /// make the records written so far readable (without the index)
+  void flush();
+  /// write the index, no more states can be written afterwards.
+  /// Throws SimulatorException if the archive cannot be written
+  void close();
+
+ protected:
+  std::string filename_;
+  smt::SmtSolver solver_;
+  std::ofstream fout_;
+  uint64_t offset_;
+  bool closed_;
+
+  std::unordered_map<smt::Term, uint32_t> term_id_;
+  std::vector<uint64_t> term_offsets_;
+  std::map<std::pair<size_t, size_t>, uint64_t> index_;
+
+  void put_u8(uint8_t v);
+  void put_u32(uint32_t v);
+  void put_u64(uint64_t v);
+  void put_str(const std::string & s);
+  void put_sort(const smt::Sort & s);
+
+  /// write the DAG of t (the nodes that are not written yet)
+  uint32_t put_term(const smt::Term & t);
+  void put_node(const smt::Term & t);
+};
+
+class StateArchiveReader
+{
+ public:
+  /// map the archive into memory, terms are created in solver on demand
+  StateArchiveReader(const std::string & filename,
+                     const smt::SmtSolver & solver);
+  ~StateArchiveReader();
+  StateArchiveReader(const StateArchiveReader &) = delete;
+  StateArchiveReader & operator=(const StateArchiveReader &) = delete;
+
+  bool has(size_t i, size_t j) const;
+  StateAsmpt read(size_t i, size_t j);
+  /// the (i, j) of all states, in order
+  std::vector<std::pair<size_t, size_t>> keys() const;
+
+  size_t num_terms() const { return term_offsets_.size(); }
+  /// the term with the given id (ids follow the order of writing)
+  smt::Term term(uint32_t id);
+  /// whether the index was recovered by scanning the records
+  bool recovered() const { return recovered_; }
+  /// where the index starts (or the end of the last complete record)
+  uint64_t data_end() const { return data_end_; }
+
+ protected:
+  smt::SmtSolver solver_;
+  const char * data_;
+  size_t size_;
+  bool recovered_;
+  uint64_t data_end_;
+
+  std::map<std::pair<size_t, size_t>, uint64_t> index_;
+  std::vector<uint64_t> term_offsets_;
+  std::vector<smt::Term> terms_;  // NULL: not created yet
+
+  friend class StateArchiveWriter;  // to continue an archive
+
+  struct Cursor
+  {
+    const char * pos;
+    const char * end;
+    uint8_t u8();
+    uint32_t u32();
+    uint64_t u64();
+    std::string str();
+    void need(size_t n) const;
+  };
+
+  /// a term record before its term is created
+  struct Node
+  {
+    smt::Sort sort;
+    uint8_t kind;
+    std::string str;
+    smt::Op op;
+    std::vector<uint32_t> children;
+  };
+
+  Cursor cursor(uint64_t offset) const;
+  bool read_index();
+  void scan();
+  smt::Sort get_sort(Cursor & c);
+  Node get_node(Cursor & c);
+  smt::Term make(const Node & n);
+  smt::Term symbol(const std::string & name, const smt::Sort & sort);
+};
+
+// writes the branches of a traversal into an archive as they are found
+// (see SymbolicTraverse::set_sink), branch i is stored as the states (i, j)
+// and is readable as soon as it is written. The first first_branch branches
+// are skipped, they are already in the archive: to continue an interrupted
+// traversal, open the writer in append mode and run the same traversal
+// again (same design, start state and branching points, so the branches
+// come in the same order) with first_branch the number of branches already
+// in the archive. The skipped part is explored again, but not written
+class StateArchiveSink : public TraverseSink
+{
+ public:
+  StateArchiveSink(StateArchiveWriter & writer, size_t first_branch = 0)
+      : writer_(writer), first_branch_(first_branch), next_branch_(0)
+  {
+  }
+
+  void on_branch(const std::vector<StateAsmpt> & branch) override;
+  /// the index of the next branch
+  size_t next_branch() const { return next_branch_; }
+
+ protected:
+  StateArchiveWriter & writer_;
+  size_t first_branch_;
+  size_t next_branch_;
+};
+
+}  // namespace wasim
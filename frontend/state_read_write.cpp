@@ -1,4 +1,6 @@
 #include <frontend/state_read_write.h>
+#include <frontend/state_archive.h>
+#include <frontend/state_tree.h>
 #include <utils/exceptions.h>
 
 #include "smt-switch/utils.h"
@@ -46,18 +48,22 @@ void StateRW::write_expr(std::ofstream & fout, const smt::Term & expr, const smt
   fout << ")\n";
 }
 
-smt::Term StateRW::read_expr(std::ifstream & fin) {
-  std::string temp_file = "temp_sv.log";
+void StateRW::read_expr(std::istream & fin, const std::string & name,
+                        std::string & buffer) {
+  // the line is a define-fun of FunNew (see write_expr), it is renamed so
+  // that all definitions of a state can be parsed together
+  static const std::string def_prefix = "(define-fun FunNew ";
 
   std::string linedata;
-  getline(fin, linedata);
-  std::ofstream temp(temp_file);
-  if (!temp.is_open())
-    throw SimulatorException("unable to open file for write " + temp_file); 
-  temp << linedata << endl;
-
-  WasimSmtLib2Parser pi(temp_file, solver_);
-  return pi.return_defs();
+  if (!getline(fin, linedata))
+    throw SimulatorException("unexpected end of state file");
+  if (linedata.compare(0, def_prefix.size(), def_prefix) != 0)
+    throw SimulatorException("expecting a definition in state file, get: " + linedata);
+  buffer += "(define-fun ";
+  buffer += name;
+  buffer += " ";
+  buffer.append(linedata, def_prefix.size(), std::string::npos);
+  buffer += "\n";
 }
 
 
@@ -83,79 +89,81 @@ bool StateRW::StateWrite(const wasim::StateAsmpt & state,
 
 StateAsmpt StateRW::StateRead(const std::string & infile_sv)
 {
-  // 1. read sv
-  smt::UnorderedTermMap state_sv;
-
   std::ifstream fin(infile_sv);
+  if (!fin.is_open())
+    throw SimulatorException("unable to open file for read " + infile_sv);
+  return StateRead(fin);
+}
+
+StateAsmpt StateRW::StateRead(std::istream & fin)
+{
+  // 1. collect the definitions, they are parsed in one go afterwards
   size_t num_sv, num_assumpt;
-  fin >> num_sv >> num_assumpt;
-  
+  if (!(fin >> num_sv >> num_assumpt))
+    throw SimulatorException("unable to read the header of state file");
+  std::string rest_of_line;
+  getline(fin, rest_of_line);
+
+  std::string buffer;
   for (size_t idx = 0; idx < num_sv; ++ idx ) {
-    auto sv = read_expr(fin);
-    auto expr = read_expr(fin);
-    state_sv.emplace(sv, expr);
+    read_expr(fin, "sv" + std::to_string(idx), buffer);
+    read_expr(fin, "val" + std::to_string(idx), buffer);
   }
-  
-  smt::TermVec state_asmpt_vec;
+
   std::vector<std::string> state_asmpt_interp_vec;
   for (size_t idx = 0; idx < num_assumpt; ++ idx ) {
-    auto asmpt = read_expr(fin);
-    state_asmpt_vec.push_back(asmpt);
+    read_expr(fin, "asmpt" + std::to_string(idx), buffer);
 
     std::string assumpt_interp;
     getline(fin, assumpt_interp);
     state_asmpt_interp_vec.push_back(assumpt_interp);
   }
 
+  // 2. parse them
+  WasimSmtLib2Parser pi(solver_);
+  if (pi.parse_string(buffer) != 0)
+    throw SimulatorException("unable to parse state file");
+
+  smt::UnorderedTermMap state_sv;
+  for (size_t idx = 0; idx < num_sv; ++ idx ) {
+    auto sv = pi.get_def("sv" + std::to_string(idx));
+    auto expr = pi.get_def("val" + std::to_string(idx));
+    state_sv.emplace(sv, expr);
+  }
+
+  smt::TermVec state_asmpt_vec;
+  for (size_t idx = 0; idx < num_assumpt; ++ idx )
+    state_asmpt_vec.push_back(pi.get_def("asmpt" + std::to_string(idx)));
+
   StateAsmpt state_ret(state_sv, state_asmpt_vec, state_asmpt_interp_vec);
   return state_ret;
 }
 
-#if 0
+std::string StateRW::tree_archive(const std::string & dir)
+{
+  return dir + "states.archive";
+}
+
 void StateRW::StateWriteTree(const std::vector<std::vector<StateAsmpt>> & branch_list,
                              const std::string & out_dir)
 {
-  for (int i = 0; i < branch_list.size(); i++) {
-    auto state_list = branch_list.at(i);
-    for (int j = 0; j < state_list.size(); j++) {
-      auto state = state_list.at(j);
-      std::string outfile_sv =
-          out_dir + "state_sv_" + to_string(i) + "_" + to_string(j);
-      std::string outfile_asmpt =
-          out_dir + "state_asmpt_" + to_string(i) + "_" + to_string(j);
-      StateWrite(state, outfile_sv, outfile_asmpt);
-      // cout << "i = " << to_string(i) << ", j = " << to_string(j) << endl;
-      // cout << outfile_sv << endl;
-    }
+  // one archive instead of a file per state, shared subterms are written once
+  StateArchiveWriter archive(tree_archive(out_dir), solver_);
+  for (size_t i = 0; i < branch_list.size(); i++) {
+    const auto & state_list = branch_list.at(i);
+    for (size_t j = 0; j < state_list.size(); j++)
+      archive.write(i, j, state_list.at(j));
   }
+  archive.close();
 }
 
 std::vector<std::vector<StateAsmpt>> StateRW::StateReadTree(const std::string & in_dir,
                                                             int num_i,
                                                             int num_j)
 {
-  cout << "Reading files. Please wait for seconds." << endl;
-  std::vector<std::vector<StateAsmpt>> branch_list = {};
-  for (int i = 0; i < num_i; i++) {
-    std::vector<StateAsmpt> state_list = {};
-    for (int j = 0; j < num_j; j++) {
-      std::string infile_sv =
-          in_dir + "state_sv_" + to_string(i) + "_" + to_string(j);
-      std::string infile_asmpt =
-          in_dir + "state_asmpt_" + to_string(i) + "_" + to_string(j);
-      // std::string infile_asmpt = "";
-      auto state = StateRead(infile_sv, infile_asmpt);
-      state_list.push_back(state);
-
-      // cout << "i = " << i << ", j = " << j << endl;
-      // cout << infile_sv << endl;
-    }
-    branch_list.push_back(state_list);
-  }
-  cout << "Reading complete!" << endl;
-
-  return branch_list;
+  // to read states on demand, or in parallel, use a StateTree directly
+  StateTree tree(tree_archive(in_dir), solver_);
+  return tree.get_tree(num_i, num_j);
 }
-#endif
 
 } // end of namespace wasim
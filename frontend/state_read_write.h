@@ -15,17 +15,23 @@ class StateRW
                   const std::string & outfile_sv);
   // Read/Write a single state
   StateAsmpt StateRead(const std::string & infile_sv);
+  // the same, from a stream holding the content of a state file
+  StateAsmpt StateRead(std::istream & fin);
 
-  // Read/Write a tree of states
+  // Read/Write a tree of states, kept in a single StateArchive in the
+  // directory (state j of branch i is state (i, j) of the archive)
   void StateWriteTree(const std::vector<std::vector<StateAsmpt>> & branch_list,
                       const std::string & out_dir);
   std::vector<std::vector<StateAsmpt>> StateReadTree(const std::string & in_dir,
                                                      int i,
                                                      int j);
+  // the archive used by StateWriteTree/StateReadTree
+  static std::string tree_archive(const std::string & dir);
  protected:
   void write_sv_val_pair(std::ofstream & fout, const smt::Term & sv, const smt::Term & val);
   void write_expr(std::ofstream & fout, const smt::Term & sv, const smt::Sort & svtype);
-  smt::Term read_expr(std::ifstream & fin);
+  // append the next definition of fin to buffer, named as name
+  void read_expr(std::istream & fin, const std::string & name, std::string & buffer);
 
 
  private:
@@ -0,0 +1,182 @@
+#include <frontend/state_tree.h>
+#include <utils/exceptions.h>
+
+#include "smt-switch/boolector_factory.h"
+#include "smt-switch/cvc5_factory.h"
+
+#include <memory>
+
+namespace wasim {
+
+StateTree::StateTree(const std::string & filename,
+                     const smt::SmtSolver & solver,
+                     size_t capacity)
+    : filename_(filename),
+      solver_(solver),
+      reader_(filename, solver),
+      capacity_(capacity)
+{
+}
+
+StateTree::~StateTree()
+{
+  for (auto & w : workers_)
+    if (w->thread.joinable())
+      w->thread.join();
+  // their terms belong to the solvers of the workers
+  prefetched_.clear();
+}
+
+StateAsmpt StateTree::get(size_t i, size_t j)
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  key_type key(i, j);
+  auto pos = cache_.find(key);
+  if (pos != cache_.end()) {
+    lru_.splice(lru_.begin(), lru_, pos->second.second);
+    return pos->second.first;
+  }
+  auto pre = prefetched_.find(key);
+  if (pre != prefetched_.end()) {
+    Worker & w = *pre->second.second;
+    std::lock_guard<std::mutex> wlock(w.mtx);
+    StateAsmpt state(pre->second.first, *w.translator);
+    prefetched_.erase(pre);
+    insert(key, state);
+    return state;
+  }
+  auto state = reader_.read(i, j);
+  insert(key, state);
+  return state;
+}
+
+std::vector<std::vector<StateAsmpt>> StateTree::get_tree(int num_i, int num_j)
+{
+  std::vector<std::vector<StateAsmpt>> branch_list;
+  for (int i = 0; i < num_i; i++) {
+    std::vector<StateAsmpt> state_list;
+    for (int j = 0; j < num_j; j++) {
+      if (has(i, j))
+        state_list.push_back(get(i, j));
+    }
+    branch_list.push_back(state_list);
+  }
+  return branch_list;
+}
+
+void StateTree::insert(const key_type & key, const StateAsmpt & state)
+{
+  auto pos = cache_.find(key);
+  if (pos != cache_.end()) {
+    lru_.splice(lru_.begin(), lru_, pos->second.second);
+    return;
+  }
+  lru_.push_front(key);
+  cache_.emplace(key, std::make_pair(state, lru_.begin()));
+  evict();
+}
+
+void StateTree::evict()
+{
+  if (capacity_ == 0)
+    return;
+  while (cache_.size() > capacity_) {
+    cache_.erase(lru_.back());
+    lru_.pop_back();
+  }
+}
+
+size_t StateTree::size() const
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  return cache_.size();
+}
+
+void StateTree::set_capacity(size_t capacity)
+{
+  std::lock_guard<std::mutex> lock(mtx_);
+  capacity_ = capacity;
+  evict();
+}
+
+void StateTree::prefetch(const std::vector<key_type> & keys,
+                         unsigned num_threads,
+                         const SolverMaker & make_solver)
+{
+  if (num_threads == 0)
+    num_threads = 1;
+  if (num_threads > keys.size())
+    num_threads = keys.size();
+  // the workers keep their own copy of the keys
+  auto shared_keys = std::make_shared<std::vector<key_type>>(keys);
+  for (unsigned t = 0; t < num_threads; ++t) {
+    workers_.emplace_back(new Worker());
+    Worker * w = workers_.back().get();
+    if (make_solver)
+      w->solver = make_solver();
+    else if (solver_->get_solver_enum() == smt::CVC5) {
+      w->solver = smt::Cvc5SolverFactory::create(false);
+      w->solver->set_logic("QF_UFBV");
+    } else if (solver_->get_solver_enum() == smt::BTOR) {
+      w->solver = smt::BoolectorSolverFactory::create(false);
+      w->solver->set_logic("QF_UFBV");
+    } else
+      throw SimulatorException(
+          "prefetch needs make_solver for the kind of solver of the tree");
+    w->translator.reset(new smt::TermTranslator(solver_));
+    w->thread = std::thread([this, w, shared_keys, t, num_threads]() {
+      prefetch_worker(*w, *shared_keys, t, num_threads);
+    });
+  }
+}
+
+void StateTree::wait()
+{
+  // the workers are kept, the states they have read are in their solvers
+  for (auto & w : workers_)
+    if (w->thread.joinable())
+      w->thread.join();
+  if (error_) {
+    auto err = error_;
+    error_ = nullptr;
+    std::rethrow_exception(err);
+  }
+}
+
+void StateTree::prefetch_worker(Worker & worker,
+                                const std::vector<key_type> & keys,
+                                size_t begin,
+                                size_t step)
+{
+  try {
+    // the reader and the states it creates are in the solver of the
+    // worker, which get also uses (to translate) under worker.mtx
+    std::unique_lock<std::mutex> wlock(worker.mtx);
+    StateArchiveReader reader(filename_, worker.solver);
+    wlock.unlock();
+
+    for (size_t idx = begin; idx < keys.size(); idx += step) {
+      const auto & key = keys.at(idx);
+      {
+        std::lock_guard<std::mutex> lock(mtx_);
+        if (cache_.find(key) != cache_.end()
+            || prefetched_.find(key) != prefetched_.end())
+          continue;
+      }
+      wlock.lock();
+      auto state = reader.read(key.first, key.second);
+      // get takes mtx_ and then worker.mtx, never the other way round
+      wlock.unlock();
+      std::lock_guard<std::mutex> lock(mtx_);
+      prefetched_.emplace(key, std::make_pair(state, &worker));
+    }
+    // the reader drops its terms on return
+    wlock.lock();
+  } catch (...) {
+    std::lock_guard<std::mutex> lock(mtx_);
+    if (!error_)
+      error_ = std::current_exception();
+  }
+}
+
+}  // namespace wasim
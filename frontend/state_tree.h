@@ -0,0 +1,99 @@
+#pragma once
+#include <frontend/state_archive.h>
+
+#include "smt-switch/smt.h"
+
+#include <exception>
+#include <functional>
+#include <list>
+#include <map>
+#include <memory>
+#include <mutex>
+#include <string>
+#include <thread>
+#include <utility>
+#include <vector>
+
+namespace wasim {
+
+// A handle on the states saved by StateRW::StateWriteTree.
+// A state is parsed when it is first asked for, or ahead of time by
+// prefetch, which uses worker threads that each parse into their own
+// solver; get translates such a state into the solver of the tree, so
+// that solver is only used on the caller's thread.
+// At most capacity states are kept (least recently used are dropped,
+// 0 means no limit); a dropped state is read again when needed.
+
+class StateTree
+{
+ public:
+  typedef std::pair<size_t, size_t> key_type;
+  typedef std::function<smt::SmtSolver()> SolverMaker;
+
+  StateTree(const std::string & filename,
+            const smt::SmtSolver & solver,
+            size_t capacity = 0);
+  ~StateTree();
+  StateTree(const StateTree &) = delete;
+  StateTree & operator=(const StateTree &) = delete;
+
+  bool has(size_t i, size_t j) const { return reader_.has(i, j); }
+  std::vector<key_type> keys() const { return reader_.keys(); }
+
+  /// state j of branch i, parsed if it is not kept
+  StateAsmpt get(size_t i, size_t j);
+  /// the states (i, j) for i < num_i, j < num_j, like StateRW::StateReadTree
+  std::vector<std::vector<StateAsmpt>> get_tree(int num_i, int num_j);
+
+  /// read the states in the background with num_threads workers,
+  /// make_solver creates the solver of a worker (if empty, a solver of
+  /// the same kind as the solver of the tree)
+  void prefetch(const std::vector<key_type> & keys,
+                unsigned num_threads,
+                const SolverMaker & make_solver = SolverMaker());
+  /// wait for prefetch to finish, rethrows the error of a worker
+  void wait();
+
+  /// the number of states kept
+  size_t size() const;
+  size_t capacity() const { return capacity_; }
+  void set_capacity(size_t capacity);
+
+ protected:
+  std::string filename_;
+  smt::SmtSolver solver_;
+  StateArchiveReader reader_;  // for the solver of the tree
+  size_t capacity_;
+
+  // guards reader_, the cache and prefetched_
+  mutable std::mutex mtx_;
+  std::list<key_type> lru_;  // most recently used first
+  std::map<key_type, std::pair<StateAsmpt, std::list<key_type>::iterator>>
+      cache_;
+
+  struct Worker
+  {
+    smt::SmtSolver solver;
+    /// into the solver of the tree, only used by get
+    std::unique_ptr<smt::TermTranslator> translator;
+    /// guards solver (and the terms in it), held while parsing or translating
+    std::mutex mtx;
+    std::thread thread;
+  };
+  std::vector<std::unique_ptr<Worker>> workers_;
+  /// states parsed by a worker, in its solver, not translated yet
+  std::map<key_type, std::pair<StateAsmpt, Worker *>> prefetched_;
+  std::exception_ptr error_;
+
+  /// keep a state, mtx_ must be held
+  void insert(const key_type & key, const StateAsmpt & state);
+  /// drop states over capacity, mtx_ must be held
+  void evict();
+
+  void prefetch_worker(Worker & worker,
+                       const std::vector<key_type> & keys,
+                       size_t begin,
+                       size_t step);
+};
+
+}  // namespace wasim
@@ -6,6 +6,21 @@
 #include "framework/ts.h"
 #include "frontend/btor2_encoder.h"
 #include "framework/symsim.h"
+#include "framework/symtraverse.h"
+#include "framework/independence_check.h"
+#include "framework/sygus_cache.h"
+#include "framework/sygus_simplify.h"
+#include "frontend/state_archive.h"
+#include "frontend/state_read_write.h"
+#include "frontend/state_tree.h"
+#include "timed-assertion-checker/timed_assertion_checker.h"
+
+#include <condition_variable>
+#include <deque>
+#include <exception>
+#include <mutex>
+#include <sstream>
+#include <thread>
 
 // CHECK url: 
 //   https://cs.brown.edu/~jwicks/boost/libs/python/doc/tutorial/doc/html/python/object.html
@@ -90,8 +105,18 @@ namespace wasim {
   struct NodeRef;
   struct SolverRef;
   struct StateRef;
+  struct InputMapRef;
   struct TransSys;
   struct Symsimulator;
+  struct Traverse;
+  struct ArchiveWriter;
+  struct ArchiveReader;
+  struct StateReadWrite;
+  struct StateTreeRef;
+  struct SygusCacheRef;
+  struct TraceManagerRef;
+  struct IndependenceCheckerRef;
+  struct TimedAssertionBatch;
 
 
   struct SolverRef {
@@ -183,22 +208,7 @@ namespace wasim {
 
     smt::Op get_op() const { return node->get_op(); }
     
-    NodeRef * substitute(const boost::python::dict & d) const { 
-      smt::UnorderedTermMap subst;
-      boost::python::list items = d.items();
-      for(ssize_t i = 0; i < len(items); ++i) {
-          boost::python::object key = items[i][0];
-          boost::python::object value = items[i][1];
-          boost::python::extract<NodeRef *> k(key);
-          boost::python::extract<NodeRef *> v(value);
-
-          if(k.check() && v.check())
-            subst.emplace(k()->node, v()->node);
-          else
-            throw PyWASIMException(PyExc_RuntimeError, "Expecting Term->Term map in substitute");
-      }
-      return new NodeRef(solver->substitute(node, subst), solver);
-    }
+    NodeRef * substitute(const boost::python::object & d) const;
 
     boost::python::list args() const {
       boost::python::list l;
@@ -217,6 +227,37 @@ namespace wasim {
       return "("+op.to_string()+" ..."+")";
     }
 
+    // print the term up to max_depth levels (deeper subterms become ...)
+    // and up to about max_len characters, without serializing the whole DAG
+    std::string abbrev(unsigned max_depth, size_t max_len) const {
+      std::string ret;
+      abbrev_to(node, max_depth, max_len, ret);
+      if (ret.size() > max_len) {
+        ret.resize(max_len);
+        ret += "...";
+      }
+      return ret;
+    }
+
+    static void abbrev_to(const smt::Term & t, unsigned depth, size_t max_len, std::string & out) {
+      if (t->is_symbol() || t->is_value()) {
+        out += t->to_string();
+        return;
+      }
+      if (depth == 0) {
+        out += "...";
+        return;
+      }
+      out += "(" + t->get_op().to_string();
+      for (auto pos = t->begin(); pos != t->end(); ++pos) {
+        if (out.size() > max_len)
+          return;
+        out += " ";
+        abbrev_to(*pos, depth - 1, max_len, out);
+      }
+      out += ")";
+    }
+
     boost::python::list get_vars() const {
       boost::python::list ret;
       smt::UnorderedTermSet free_var_set;
@@ -527,8 +568,14 @@ namespace wasim {
   protected:
     friend struct SolverRef;
     friend struct StateRef;
+    friend struct InputMapRef;
     friend struct TransSys;
     friend struct Symsimulator;
+    friend struct TraceManagerRef;
+    friend struct IndependenceCheckerRef;
+    friend smt::UnorderedTermMap to_term_map(const boost::python::object & d, const std::string & where);
+    friend smt::TermVec to_term_vec(const boost::python::list & l, const std::string & where);
+    friend std::string sygus_problem(NodeRef * expr, const boost::python::list & assumptions, const boost::python::list & xvars);
     smt::SmtSolver solver;
     smt::Term node;
 
@@ -743,6 +790,10 @@ namespace wasim {
       return a->node == b->node;
     }
 
+    // the state_simplify passes, see framework/state_simplify.h
+    static NodeRef * simplify_ite(NodeRef * expr, const boost::python::list & assumptions);
+    static bool contains_X(NodeRef * expr, const boost::python::list & xvars);
+
     static NodeRef * make_term(smt::Op op, const boost::python::list & l) {
       if (len(l) == 0)
         throw PyWASIMException(PyExc_TypeError, std::string("expect non-empty args for make_term "));
@@ -1115,8 +1166,27 @@ namespace wasim {
       }
       sptr->update_sv().swap(newmap);
     }
+
+    /// replace the values that contain the X variables in xvars by the ones SyGuS finds
+    void sygus_simplify(const boost::python::list & xvars) {
+      smt::UnorderedTermSet xvar_set;
+      for (ssize_t idx = 0; idx < len(xvars); ++idx) {
+        boost::python::extract<NodeRef *> x(xvars[idx]);
+        if (!x.check())
+          throw PyWASIMException(PyExc_RuntimeError, "sygus_simplify requires a list of terms");
+        xvar_set.emplace(x()->node);
+      }
+      try {
+        wasim::sygus_simplify(*sptr, xvar_set, solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
     
     friend struct Symsimulator;
+    friend struct ArchiveWriter;
+    friend struct StateReadWrite;
+    friend struct TraceManagerRef;
 
     protected:
       smt::SmtSolver solver;
@@ -1151,6 +1221,112 @@ namespace wasim {
     return NULL;
   }
 
+  /* InputMap : the input variable assignment of the next cycle.
+     It is kept on the C++ side, so Dut can hold it across cycles
+     without rebuilding a dict of NodeRef every cycle */
+  struct InputMapRef {
+    InputMapRef() { throw PyWASIMException(PyExc_RuntimeError, "Cannot create InputMap directly. Use Symsimulator.new_input_map."); }
+    InputMapRef(const smt::UnorderedTermMap & m, const smt::SmtSolver & s) : solver(s), map(m) { }
+    InputMapRef(const InputMapRef & other) : solver(other.solver), map(other.map) { }
+
+    bool contains(NodeRef * k) const { return map.find(k->node) != map.end(); }
+
+    NodeRef * getitem(NodeRef * k) const {
+      auto pos = map.find(k->node);
+      if (pos == map.end())
+        throw PyWASIMException(PyExc_KeyError, k->node->to_string());
+      return new NodeRef(pos->second, solver);
+    }
+
+    void setitem(NodeRef * k, NodeRef * v) { map[k->node] = v->node; }
+
+    void delitem(NodeRef * k) {
+      if (map.erase(k->node) == 0)
+        throw PyWASIMException(PyExc_KeyError, k->node->to_string());
+    }
+
+    void update(const boost::python::object & d);
+
+    size_t size() const { return map.size(); }
+
+    InputMapRef * copy() const { return new InputMapRef(*this); }
+
+    boost::python::dict to_dict() const {
+      boost::python::dict ret;
+      for (const auto & iv : map) {
+        NodeRef * k = new NodeRef(iv.first, solver);
+        NodeRef * v = new NodeRef(iv.second, solver);
+        ret[k] = v;
+      }
+      return ret;
+    }
+
+    friend struct Symsimulator;
+    friend smt::UnorderedTermMap to_term_map(const boost::python::object & d, const std::string & where);
+
+    protected:
+      smt::SmtSolver solver;
+      smt::UnorderedTermMap map;
+  }; // end of InputMapRef
+
+  /// accept either a Term->Term dict or an InputMap
+  smt::UnorderedTermMap to_term_map(const boost::python::object & d, const std::string & where) {
+    boost::python::extract<InputMapRef *> m(d);
+    if (m.check())
+      return m()->map;
+
+    boost::python::extract<boost::python::dict> dct(d);
+    if (!dct.check())
+      throw PyWASIMException(PyExc_RuntimeError, "Expecting Term->Term map in " + where);
+
+    smt::UnorderedTermMap ret;
+    boost::python::list items = dct().items();
+    for(ssize_t i = 0; i < len(items); ++i) {
+        boost::python::object key = items[i][0];
+        boost::python::object value = items[i][1];
+        boost::python::extract<NodeRef *> k(key);
+        boost::python::extract<NodeRef *> v(value);
+
+        if(k.check() && v.check())
+          ret.emplace(k()->node, v()->node);
+        else
+          throw PyWASIMException(PyExc_RuntimeError, "Expecting Term->Term map in " + where);
+    }
+    return ret;
+  }
+
+  /// a list of NodeRef as a TermVec
+  smt::TermVec to_term_vec(const boost::python::list & l, const std::string & where) {
+    smt::TermVec ret;
+    for (ssize_t i = 0; i < len(l); ++i) {
+      boost::python::extract<NodeRef *> n(l[i]);
+      if (!n.check())
+        throw PyWASIMException(PyExc_RuntimeError, "Expecting list of NodeRef in " + where);
+      ret.push_back(n()->node);
+    }
+    return ret;
+  }
+
+  NodeRef * NodeRef::simplify_ite(NodeRef * expr, const boost::python::list & assumptions) {
+    auto asmpt = to_term_vec(assumptions, "expr_simplify_ite");
+    return new NodeRef(expr_simplify_ite(expr->node, asmpt, expr->solver), expr->solver);
+  }
+
+  bool NodeRef::contains_X(NodeRef * expr, const boost::python::list & xvars) {
+    auto xvar_vec = to_term_vec(xvars, "expr_contains_X");
+    return expr_contains_X(expr->node, smt::UnorderedTermSet(xvar_vec.begin(), xvar_vec.end()));
+  }
+
+  void InputMapRef::update(const boost::python::object & d) {
+    for (const auto & iv : to_term_map(d, "InputMap.update"))
+      map[iv.first] = iv.second;
+  }
+
+  NodeRef * NodeRef::substitute(const boost::python::object & d) const {
+    smt::UnorderedTermMap subst = to_term_map(d, "substitute");
+    return new NodeRef(solver->substitute(node, subst), solver);
+  }
+
   /* TransSys : ts */
   struct TransSys {
 
@@ -1331,6 +1507,9 @@ namespace wasim {
     }
 
       friend struct Symsimulator;
+      friend struct Traverse;
+      friend struct TraceManagerRef;
+      friend struct TimedAssertionBatch;
     protected:
       std::shared_ptr<TransitionSystem> sptr;
 
@@ -1338,11 +1517,19 @@ namespace wasim {
   }; // struct TransSys
 
   /* TODO : simulator */
+  struct SimSnapshot {
+    SimSnapshot(const SymbolicSimulator::Snapshot & s) : sptr(std::make_shared<SymbolicSimulator::Snapshot>(s)) { }
+    unsigned tracelen() const { return sptr->trace.size(); }
+
+    std::shared_ptr<SymbolicSimulator::Snapshot> sptr;
+  };
+
   struct Symsimulator {
 
     Symsimulator(TransSys * ts) {
       sptr = std::make_shared<SymbolicSimulator>(*(ts->sptr), ts->sptr->get_solver());
     }
+    Symsimulator(const std::shared_ptr<SymbolicSimulator> & sim) : sptr(sim) { }
 
     /// get the length of the trace
     unsigned tracelen() const { return sptr->tracelen(); }
@@ -1451,29 +1638,9 @@ namespace wasim {
     void set_current_state(const StateRef * s) { sptr->set_current_state(*(s->sptr.get())); }
     /// set the input variable values before simulating next step
     ///  (and also set some assumptions before the next step)
-    void set_input(const boost::python::dict & iv, const boost::python::list & asmpts) {
-      smt::UnorderedTermMap invar_assign;
-      smt::TermVec pre_assumptions;
-
-      boost::python::list items = iv.items();
-      for(ssize_t i = 0; i < len(items); ++i) {
-          boost::python::object key = items[i][0];
-          boost::python::object value = items[i][1];
-          boost::python::extract<NodeRef *> k(key);
-          boost::python::extract<NodeRef *> v(value);
-
-          if(k.check() && v.check())
-            invar_assign.emplace(k()->node, v()->node);
-          else
-            throw PyWASIMException(PyExc_RuntimeError, "Expecting Term->Term map in set_input");
-      }
-      for (ssize_t i = 0; i < len(asmpts); ++i) {
-        boost::python::extract<NodeRef *> key(asmpts[i]);
-        if (key.check())
-          pre_assumptions.push_back(key()->node);
-        else
-          throw PyWASIMException(PyExc_RuntimeError, "Expecting list of NodeRef in set_input");
-      }
+    void set_input(const boost::python::object & iv, const boost::python::list & asmpts) {
+      smt::UnorderedTermMap invar_assign = to_term_map(iv, "set_input");
+      smt::TermVec pre_assumptions = to_term_vec(asmpts, "set_input");
       sptr->set_input(invar_assign, pre_assumptions);
     }
     /// undo the input setting
@@ -1481,31 +1648,92 @@ namespace wasim {
     /// undo_set_input
     void undo_set_input() { sptr->undo_set_input(); }
 
+    /// create fresh input variables for the next cycle in one call,
+    /// defaults (a dict or an InputMap) override the fresh ones
+    InputMapRef * new_input_map(const boost::python::object & defaults) {
+      smt::UnorderedTermMap default_map = to_term_map(defaults, "new_input_map");
+      try {
+        return new InputMapRef(sptr->new_input_map(default_map), sptr->get_solver());
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
     /// similar to cur(), but will check no reference to the input variables
     NodeRef * interpret_state_expr_on_curr_frame(NodeRef * expr) const {
       return new NodeRef(sptr->interpret_state_expr_on_curr_frame(expr->node), sptr->get_solver());
     }
 
-    NodeRef * interpret_input_and_state_expr_on_curr_frame(NodeRef * expr, const boost::python::dict & iv_term_dict) const {
-      smt::UnorderedTermMap iv_map;
-      boost::python::list items = iv_term_dict.items();
-      for(ssize_t i = 0; i < len(items); ++i) {
-          boost::python::object key = items[i][0];
-          boost::python::object value = items[i][1];
-          boost::python::extract<NodeRef *> k(key);
-          boost::python::extract<NodeRef *> v(value);
-
-          if(k.check() && v.check())
-            iv_map.emplace(k()->node, v()->node);
-          else
-            throw PyWASIMException(PyExc_RuntimeError, "Expecting Term->Term map in interpret_input_and_state_expr_on_curr_frame");
-      }
+    NodeRef * interpret_input_and_state_expr_on_curr_frame(NodeRef * expr, const boost::python::object & iv_term_dict) const {
+      smt::UnorderedTermMap iv_map = to_term_map(iv_term_dict, "interpret_input_and_state_expr_on_curr_frame");
       return new NodeRef(sptr->interpret_input_and_state_expr_on_curr_frame(expr->node, iv_map), sptr->get_solver());
     }
 
     /// do simulation
     void sim_one_step() { sptr->sim_one_step(); }
 
+    /// simulate n steps natively
+    ///   inputs : a list of per-step input maps (dict or InputMap), or a callable
+    ///            that takes the step index and returns such a map, it is
+    ///            called right before that step (on the current state)
+    ///   assumptions : a list of per-step lists of assumptions
+    ///   defaults : input values used when a step does not assign them
+    ///   observe : names of signals to return from the final frame
+    /// returns a dict from observed names to their terms in the final frame
+    boost::python::dict sim_steps(unsigned n, const boost::python::object & inputs,
+                                  const boost::python::list & assumptions,
+                                  const boost::python::object & defaults,
+                                  const boost::python::list & observe) {
+      std::vector<smt::UnorderedTermMap> input_vec;
+      std::vector<smt::TermVec> asmpt_vec;
+      smt::UnorderedTermMap default_map = to_term_map(defaults, "sim_steps");
+
+      bool per_step = PyCallable_Check(inputs.ptr());
+      if (!per_step && !inputs.is_none()) {
+        boost::python::extract<boost::python::list> input_list(inputs);
+        if (!input_list.check())
+          throw PyWASIMException(PyExc_RuntimeError, "Expecting a list of input maps or a callable in sim_steps");
+        for (ssize_t i = 0; i < len(input_list()); ++i)
+          input_vec.push_back(to_term_map(input_list()[i], "sim_steps"));
+      }
+
+      for (ssize_t i = 0; i < len(assumptions); ++i) {
+        boost::python::extract<boost::python::list> step_asmpts(assumptions[i]);
+        if (!step_asmpts.check())
+          throw PyWASIMException(PyExc_RuntimeError, "Expecting a list of NodeRef lists in sim_steps");
+        asmpt_vec.push_back(to_term_vec(step_asmpts(), "sim_steps"));
+      }
+
+      try {
+        if (per_step)
+          sptr->sim_steps(
+              n,
+              [&inputs](unsigned i) {
+                return to_term_map(inputs(i), "sim_steps");
+              },
+              asmpt_vec,
+              default_map);
+        else
+          sptr->sim_steps(n, input_vec, asmpt_vec, default_map);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+
+      boost::python::dict ret;
+      for (ssize_t i = 0; i < len(observe); ++i) {
+        boost::python::extract<std::string> name(observe[i]);
+        if (!name.check())
+          throw PyWASIMException(PyExc_RuntimeError, "Expecting a list of signal names in sim_steps");
+        try {
+          NodeRef * v = new NodeRef(sptr->interpret_state_expr_on_curr_frame(sptr->var(name())), sptr->get_solver());
+          ret[name()] = v;
+        } catch (const std::exception & e) {
+          throw PyWASIMException(PyExc_RuntimeError, "Cannot observe `" + name() + "`: " + e.what());
+        }
+      }
+      return ret;
+    }
+
     /// get the set of all X variables
     boost::python::list  get_Xs() const { 
       boost::python::list ret;
@@ -1516,14 +1744,7 @@ namespace wasim {
 
     /// get (a copy of) the current state
     StateRef * get_curr_state(const boost::python::list & assumptions)  {
-      smt::TermVec assumpts;
-      for(ssize_t i = 0; i < len(assumptions); ++i)  {
-        boost::python::extract<NodeRef *>  aspt(assumptions[i]);
-        if(aspt.check())
-          assumpts.push_back(aspt()->node);
-        else
-          throw PyWASIMException(PyExc_RuntimeError, "Expecting list of NodeRef in get_curr_state");
-      }
+      smt::TermVec assumpts = to_term_vec(assumptions, "get_curr_state");
       StateAsmpt ret_state = sptr->get_curr_state(assumpts);
       return new StateRef( ret_state.get_sv(), ret_state.get_assumptions(), ret_state.get_assumption_interpretations(), sptr->get_solver() );
     }
@@ -1550,15 +1771,778 @@ namespace wasim {
     /// get solver
     SolverRef * get_solver() const { return new SolverRef(sptr->get_solver()); }
 
+    /// keep the assumptions of each frame asserted in the solver
+    void set_incremental(bool en) {
+      try {
+        sptr->set_incremental(en);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+    bool is_incremental() const { return sptr->is_incremental(); }
+
+    /// check the goals under all assumptions and the constraints,
+    /// reusing what is already asserted in the solver
+    bool check_sat_incremental(const boost::python::list & goals, const boost::python::list & constraints) {
+      smt::TermVec goal_vec = to_term_vec(goals, "check_sat_incremental");
+      smt::TermVec constr_vec = to_term_vec(constraints, "check_sat_incremental");
+      try {
+        return sptr->check_sat_incremental(goal_vec, constr_vec).is_sat();
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// check the goals and constraints (and all assumptions if with_assumptions is set)
+    /// the result comes from the query cache if the same query has been checked
+    bool check_sat_query(const boost::python::list & goals, const boost::python::list & constraints, bool with_assumptions) {
+      smt::TermVec goal_vec = to_term_vec(goals, "check_sat_query");
+      smt::TermVec constr_vec = to_term_vec(constraints, "check_sat_query");
+      try {
+        return sptr->check_sat_query(goal_vec, constr_vec, with_assumptions).is_sat();
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// classify a branch condition as ALWAYS_TRUE, ALWAYS_FALSE or BOTH,
+    /// INFEASIBLE if the assumptions cannot hold
+    /// under all assumptions, the extra assumptions and the constraints
+    BranchClass classify(NodeRef * cond, const boost::python::list & assumptions, const boost::python::list & constraints) {
+      smt::TermVec asmpt_vec = to_term_vec(assumptions, "classify");
+      smt::TermVec constr_vec = to_term_vec(constraints, "classify");
+      return sptr->classify(cond->node, asmpt_vec, constr_vec);
+    }
+
+    /// set the number of results kept by the query cache, 0 disables it
+    void set_query_cache(size_t capacity) { sptr->query_cache().set_capacity(capacity); }
+    void clear_query_cache() { sptr->query_cache().clear(); }
+
+    boost::python::dict query_cache_stats() const {
+      const auto & cache = sptr->query_cache();
+      boost::python::dict ret;
+      ret["hits"] = cache.hits();
+      ret["misses"] = cache.misses();
+      ret["size"] = cache.size();
+      ret["capacity"] = cache.capacity();
+      return ret;
+    }
+
+    void set_simplify_policy(unsigned every, size_t dag_limit) { sptr->set_simplify_policy(every, dag_limit); }
+    unsigned simplify_current_state() { return sptr->simplify_current_state(); }
+
+    void set_abstraction_budget(size_t dag_limit, double seconds) {
+      sptr->set_abstraction_budget(dag_limit, seconds);
+    }
+    void set_abstraction_budget_var(const std::string & n, size_t dag_limit, double seconds) {
+      try {
+        sptr->set_abstraction_budget(sptr->var(n), dag_limit, seconds);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      } catch (std::out_of_range & e) {
+        throw PyWASIMException(PyExc_KeyError, "No state variable named " + n);
+      }
+    }
+
+    /// list of {frame, var, value, xvar}
+    boost::python::list abstractions() const {
+      boost::python::list ret;
+      for (const auto & a : sptr->abstractions()) {
+        boost::python::dict d;
+        d["frame"] = a.frame;
+        d["var"] = a.var->to_string();
+        d["value"] = new NodeRef(a.value, sptr->get_solver());
+        d["xvar"] = new NodeRef(a.xvar, sptr->get_solver());
+        ret.append(d);
+      }
+      return ret;
+    }
+
+    NodeRef * concretize(const NodeRef & t) const {
+      return new NodeRef(sptr->concretize(t.node), sptr->get_solver());
+    }
+
+    /// check_sat_query on the concrete values of the abstracted state variables
+    bool check_sat_concrete(const boost::python::list & goals, const boost::python::list & constraints, bool with_assumptions) {
+      smt::TermVec goal_vec = to_term_vec(goals, "check_sat_concrete");
+      smt::TermVec constr_vec = to_term_vec(constraints, "check_sat_concrete");
+      return sptr->check_sat_concrete(goal_vec, constr_vec, with_assumptions).is_sat();
+    }
+
+    /// the frames are shared, so these only copy pointers
+    SimSnapshot * snapshot() const { return new SimSnapshot(sptr->snapshot()); }
+    void restore(const SimSnapshot & s) { sptr->restore(*(s.sptr)); }
+    Symsimulator * fork() { return new Symsimulator(sptr->fork()); }
+
+    void set_stats(bool en) { sptr->stats().set_enabled(en); }
+    void reset_stats() { sptr->stats().reset(); }
+
+    boost::python::dict stats() const {
+      const auto & st = sptr->stats();
+      boost::python::dict ret;
+      ret["enabled"] = st.enabled();
+      ret["cycle"] = sptr->tracelen();
+
+      boost::python::dict phases;
+      for (const auto & p : st.phases()) {
+        boost::python::dict ph;
+        ph["calls"] = p.second.calls;
+        ph["seconds"] = p.second.seconds;
+        phases[p.first] = ph;
+      }
+      ret["phases"] = phases;
+
+      const auto & sc = st.solver_calls();
+      boost::python::dict solver;
+      solver["sat"] = sc.sat;
+      solver["unsat"] = sc.unsat;
+      solver["unknown"] = sc.unknown;
+      solver["seconds"] = sc.seconds;
+      ret["solver"] = solver;
+
+      boost::python::dict dag_size;
+      for (const auto & sv : sptr->state_dag_sizes())
+        dag_size[sv.first] = sv.second;
+      ret["dag_size"] = dag_size;
+
+      boost::python::list assumptions;
+      for (auto n : sptr->frame_assumption_counts())
+        assumptions.append(n);
+      ret["assumptions"] = assumptions;
+      return ret;
+    }
+
+    friend struct Traverse;
+    friend struct ArchiveWriter;
+    friend struct ArchiveReader;
+    friend struct StateReadWrite;
+    friend struct StateTreeRef;
+    friend struct TraceManagerRef;
+    friend struct TimedAssertionBatch;
+
     protected:
       std::shared_ptr<SymbolicSimulator> sptr;
   };
 
   /* TODO : tracemgr */
 
-  /* TODO : TraverseBranchingNode */
+  /* TraverseBranchingNode : given as (name, width, on_input) */
+  std::vector<TraverseBranchingNode> to_branching_points(const boost::python::list & l) {
+    std::vector<TraverseBranchingNode> ret;
+    for (ssize_t i = 0; i < len(l); ++i) {
+      boost::python::extract<boost::python::tuple> t(l[i]);
+      if (!t.check() || len(t()) != 3)
+        throw PyWASIMException(PyExc_RuntimeError, "Expecting a list of (name, width, on_input) as branching points");
+      boost::python::extract<std::string> name(t()[0]);
+      boost::python::extract<int> width(t()[1]);
+      boost::python::extract<bool> on_input(t()[2]);
+      if (!name.check() || !width.check() || !on_input.check())
+        throw PyWASIMException(PyExc_RuntimeError, "Expecting a list of (name, width, on_input) as branching points");
+      type_v v = std::make_pair(name(), width());
+      if (on_input())
+        ret.push_back(TraverseBranchingNode(v, std::nullopt));
+      else
+        ret.push_back(TraverseBranchingNode(std::nullopt, v));
+    }
+    return ret;
+  }
+
+  /// the new states of a traversal that runs on a thread of its own, they
+  /// are handed out one at a time and at most `capacity` wait to be taken.
+  /// Each state is copied into a solver of its own on the traversal thread,
+  /// as the solver of the traversal is in use until the iteration ends
+  /// (its state variables are not those of the simulator).
+  /// If the iterator is dropped early, the simulator is set back to where
+  /// the traversal started
+  struct TraverseStates {
+    struct Channel : public TraverseSink {
+      struct Cancelled {};
+
+      std::mutex mtx;
+      std::condition_variable cv;
+      std::deque<std::pair<smt::SmtSolver, StateAsmpt>> states;
+      size_t capacity;
+      bool done = false;
+      bool cancelled = false;
+      std::string error;
+
+      void on_state(const StateAsmpt & state) override {
+        {
+          std::unique_lock<std::mutex> lock(mtx);
+          cv.wait(lock, [this]() { return cancelled || states.size() < capacity; });
+          if (cancelled)
+            throw Cancelled();
+        }
+        smt::SmtSolver s = smt::BoolectorSolverFactory::create(false);
+        s->set_logic("QF_UFBV");
+        s->set_opt("incremental", "true");
+        s->set_opt("produce-models", "true");
+        s->set_opt("produce-unsat-assumptions", "true");
+        smt::TermTranslator tt(s);
+        StateAsmpt copy(state, tt);
+        std::lock_guard<std::mutex> lock(mtx);
+        states.emplace_back(s, copy);
+        cv.notify_all();
+      }
+    };
+
+    TraverseStates(const std::shared_ptr<SymbolicTraverse> & trav,
+                   const std::shared_ptr<SymbolicSimulator> & sim,
+                   const smt::TermVec & assumptions,
+                   const std::vector<TraverseBranchingNode> & branching_points,
+                   bool one_step, size_t capacity)
+        : channel(std::make_shared<Channel>()) {
+      channel->capacity = capacity == 0 ? 1 : capacity;
+      auto ch = channel;
+      auto start = sim->snapshot();
+      worker = std::thread([trav, sim, start, ch, assumptions, branching_points, one_step]() {
+        trav->set_sink(ch.get(), false);
+        try {
+          if (one_step)
+            trav->traverse_one_step(assumptions, branching_points);
+          else
+            trav->traverse(assumptions, branching_points);
+        } catch (const Channel::Cancelled &) {
+          // left in the middle of a step, with the inputs of each frame set
+          sim->restore(start);
+        } catch (const std::exception & e) {
+          std::lock_guard<std::mutex> lock(ch->mtx);
+          ch->error = e.what();
+        } catch (...) {
+          std::lock_guard<std::mutex> lock(ch->mtx);
+          ch->error = "traversal failed";
+        }
+        trav->set_sink(NULL);
+        std::lock_guard<std::mutex> lock(ch->mtx);
+        ch->done = true;
+        ch->cv.notify_all();
+      });
+    }
+
+    ~TraverseStates() {
+      {
+        std::lock_guard<std::mutex> lock(channel->mtx);
+        channel->cancelled = true;
+        channel->cv.notify_all();
+      }
+      if (worker.joinable())
+        worker.join();
+    }
+
+    StateRef * next() {
+      std::unique_lock<std::mutex> lock(channel->mtx);
+      {
+        // let other Python threads run while the traversal works
+        PyThreadState * pystate = PyEval_SaveThread();
+        channel->cv.wait(lock, [this]() { return channel->done || !channel->states.empty(); });
+        PyEval_RestoreThread(pystate);
+      }
+      if (!channel->states.empty()) {
+        const auto & front = channel->states.front();
+        auto ret = new StateRef(new StateAsmpt(front.second), front.first);
+        channel->states.pop_front();
+        channel->cv.notify_all();
+        return ret;
+      }
+      if (!channel->error.empty())
+        throw PyWASIMException(PyExc_RuntimeError, channel->error);
+      PyErr_SetString(PyExc_StopIteration, "no more states");
+      boost::python::throw_error_already_set();
+      return NULL;
+    }
+
+    protected:
+      std::shared_ptr<Channel> channel;
+      std::thread worker;
+  };
+
+  /* SymbolicTraverse */
+  struct Traverse {
+    Traverse(TransSys * ts, Symsimulator * sim, const boost::python::list & base_vars)
+        : ts_ptr(ts->sptr), sim_ptr(sim->sptr) {
+      smt::UnorderedTermSet base_variable;
+      for (const auto & v : to_term_vec(base_vars, "Traverse"))
+        base_variable.insert(v);
+      solver = sim_ptr->get_solver();
+      sptr = std::make_shared<SymbolicTraverse>(*ts_ptr, *sim_ptr, solver, base_variable);
+    }
+
+    unsigned traverse_one_step(const boost::python::list & assumptions, const boost::python::list & branching_points) {
+      return sptr->traverse_one_step(to_term_vec(assumptions, "traverse_one_step"), to_branching_points(branching_points));
+    }
+
+    unsigned traverse_one_step_parallel(const boost::python::list & assumptions, const boost::python::list & branching_points,
+                                        unsigned num_workers) {
+      auto asmpt = to_term_vec(assumptions, "traverse_one_step_parallel");
+      auto points = to_branching_points(branching_points);
+      unsigned ret;
+      PyThreadState * pystate = PyEval_SaveThread();
+      try {
+        ret = sptr->traverse_one_step_parallel(asmpt, points, num_workers);
+      } catch (...) {
+        PyEval_RestoreThread(pystate);
+        throw;
+      }
+      PyEval_RestoreThread(pystate);
+      return ret;
+    }
+
+    unsigned traverse(const boost::python::list & assumptions, const boost::python::list & branching_points) {
+      return sptr->traverse(to_term_vec(assumptions, "traverse"), to_branching_points(branching_points));
+    }
+
+    /// traverse, writing each finished branch into the archive instead of keeping
+    /// it, the first first_branch branches are already there (see StateArchiveSink)
+    /// and are skipped, returns the number of branches
+    size_t traverse_to_archive(const boost::python::list & assumptions, const boost::python::list & branching_points,
+                               ArchiveWriter * writer, size_t first_branch);
+
+    /// an iterator over the new states, while the traversal runs
+    TraverseStates * iter_states(const boost::python::list & assumptions, const boost::python::list & branching_points,
+                                 bool one_step, size_t capacity) {
+      return new TraverseStates(sptr, sim_ptr, to_term_vec(assumptions, "iter_states"),
+                                to_branching_points(branching_points), one_step, capacity);
+    }
+
+    boost::python::list get_abs_state() const {
+      boost::python::list ret;
+      for (const auto & s : sptr->get_abs_state())
+        ret.append(StateRef(new StateAsmpt(s), solver));
+      return ret;
+    }
+
+    boost::python::list get_all_branches() const {
+      boost::python::list ret;
+      for (const auto & b : sptr->get_all_branches()) {
+        boost::python::list branch;
+        for (const auto & s : b)
+          branch.append(StateRef(new StateAsmpt(s), solver));
+        ret.append(branch);
+      }
+      return ret;
+    }
+
+    protected:
+      std::shared_ptr<TransitionSystem> ts_ptr;
+      std::shared_ptr<SymbolicSimulator> sim_ptr;
+      smt::SmtSolver solver;
+      std::shared_ptr<SymbolicTraverse> sptr;
+  };
+
+  /* TraceManager : the abstract states met so far, see framework/tracemgr.h */
+  struct TraceManagerRef {
+    TraceManagerRef(TransSys * ts, Symsimulator * sim) : ts_ptr(ts->sptr), solver(sim->sptr->get_solver()) {
+      sptr = std::make_shared<TraceManager>(*ts_ptr, solver);
+    }
+
+    void record_base_var(const boost::python::list & vars) {
+      sptr->record_base_var(to_term_vec(vars, "record_base_var"));
+    }
+
+    /// true if state is not abstractly equivalent to a recorded one
+    bool record_state(StateRef * state, const boost::python::list & xvars) {
+      auto xvar_vec = to_term_vec(xvars, "record_state");
+      return sptr->record_state(*(state->sptr), smt::UnorderedTermSet(xvar_vec.begin(), xvar_vec.end()));
+    }
+
+    boost::python::list get_abs_state() const {
+      boost::python::list ret;
+      for (const auto & s : sptr->get_abs_state())
+        ret.append(StateRef(new StateAsmpt(s), solver));
+      return ret;
+    }
+
+    size_t num_abs_eq_calls() const { return sptr->num_abs_eq_calls(); }
+    size_t num_abs_eq_skipped() const { return sptr->num_abs_eq_skipped(); }
+
+    protected:
+      std::shared_ptr<TransitionSystem> ts_ptr;  // TraceManager keeps a reference
+      smt::SmtSolver solver;
+      std::shared_ptr<TraceManager> sptr;
+  };
+
+  /* StateArchiveWriter/Reader : states kept in a single file, see frontend/state_archive.h,
+     the terms are those of the solver of a simulator */
+  struct ArchiveWriter {
+    ArchiveWriter(const std::string & filename, Symsimulator * sim, bool append) {
+      try {
+        sptr = std::make_shared<StateArchiveWriter>(filename, sim->sptr->get_solver(), append);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void write(size_t i, size_t j, StateRef * state) {
+      try {
+        sptr->write(i, j, *(state->sptr));
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void flush() {
+      try {
+        sptr->flush();
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// the archive is also closed when this object is deleted, but then the errors are only logged
+    void close() {
+      try {
+        sptr->close();
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    friend struct Traverse;
+    protected:
+      std::shared_ptr<StateArchiveWriter> sptr;
+  };
+
+  size_t Traverse::traverse_to_archive(const boost::python::list & assumptions, const boost::python::list & branching_points,
+                                       ArchiveWriter * writer, size_t first_branch) {
+    StateArchiveSink sink(*(writer->sptr), first_branch);
+    sptr->set_sink(&sink, false);
+    try {
+      sptr->traverse(to_term_vec(assumptions, "traverse_to_archive"), to_branching_points(branching_points));
+    } catch (SimulatorException & e) {
+      sptr->set_sink(NULL);
+      throw PyWASIMException(PyExc_RuntimeError, e.what());
+    }
+    sptr->set_sink(NULL);
+    return sink.next_branch();
+  }
+
+  struct ArchiveReader {
+    ArchiveReader(const std::string & filename, Symsimulator * sim) : solver(sim->sptr->get_solver()) {
+      try {
+        sptr = std::make_shared<StateArchiveReader>(filename, solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    bool has(size_t i, size_t j) const { return sptr->has(i, j); }
+
+    StateRef * read(size_t i, size_t j) {
+      try {
+        return new StateRef(new StateAsmpt(sptr->read(i, j)), solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    boost::python::list keys() const {
+      boost::python::list ret;
+      for (const auto & k : sptr->keys())
+        ret.append(boost::python::make_tuple(k.first, k.second));
+      return ret;
+    }
+
+    bool recovered() const { return sptr->recovered(); }
+
+    protected:
+      smt::SmtSolver solver;
+      std::shared_ptr<StateArchiveReader> sptr;
+  };
+
+  /* StateRW : a state in a text file, or a tree of states in a directory */
+  struct StateReadWrite {
+    StateReadWrite(Symsimulator * sim) : solver(sim->sptr->get_solver()), rw(solver) { }
+
+    bool write(StateRef * state, const std::string & filename) {
+      try {
+        return rw.StateWrite(*(state->sptr), filename);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    StateRef * read(const std::string & filename) {
+      try {
+        return new StateRef(new StateAsmpt(rw.StateRead(filename)), solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// the same as read, from the content of a state file
+    StateRef * read_string(const std::string & content) {
+      std::istringstream fin(content);
+      try {
+        return new StateRef(new StateAsmpt(rw.StateRead(fin)), solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void write_tree(const boost::python::list & branches, const std::string & out_dir) {
+      std::vector<std::vector<StateAsmpt>> branch_list;
+      for (ssize_t i = 0; i < len(branches); ++i) {
+        boost::python::list branch = boost::python::extract<boost::python::list>(branches[i]);
+        branch_list.emplace_back();
+        for (ssize_t j = 0; j < len(branch); ++j) {
+          boost::python::extract<StateRef *> s(branch[j]);
+          if (!s.check())
+            throw PyWASIMException(PyExc_RuntimeError, "write_tree requires lists of states");
+          branch_list.back().push_back(*(s()->sptr));
+        }
+      }
+      try {
+        rw.StateWriteTree(branch_list, out_dir);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    boost::python::list read_tree(const std::string & in_dir, int num_i, int num_j) {
+      std::vector<std::vector<StateAsmpt>> branch_list;
+      try {
+        branch_list = rw.StateReadTree(in_dir, num_i, num_j);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+      boost::python::list ret;
+      for (const auto & b : branch_list) {
+        boost::python::list branch;
+        for (const auto & s : b)
+          branch.append(StateRef(new StateAsmpt(s), solver));
+        ret.append(branch);
+      }
+      return ret;
+    }
+
+    protected:
+      smt::SmtSolver solver;
+      StateRW rw;
+  };
+
+  /* StateTree : the states of an archive, read on demand or prefetched in the background */
+  struct StateTreeRef {
+    StateTreeRef(const std::string & filename, Symsimulator * sim, size_t capacity) : solver(sim->sptr->get_solver()) {
+      try {
+        sptr = std::make_shared<StateTree>(filename, solver, capacity);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    bool has(size_t i, size_t j) const { return sptr->has(i, j); }
+
+    boost::python::list keys() const {
+      boost::python::list ret;
+      for (const auto & k : sptr->keys())
+        ret.append(boost::python::make_tuple(k.first, k.second));
+      return ret;
+    }
+
+    StateRef * get(size_t i, size_t j) {
+      try {
+        return new StateRef(new StateAsmpt(sptr->get(i, j)), solver);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// keys is a list of (i, j)
+    void prefetch(const boost::python::list & keys, unsigned num_threads) {
+      std::vector<StateTree::key_type> key_vec;
+      for (ssize_t k = 0; k < len(keys); ++k) {
+        boost::python::extract<boost::python::tuple> t(keys[k]);
+        if (!t.check() || len(t()) != 2)
+          throw PyWASIMException(PyExc_RuntimeError, "prefetch requires a list of (i, j)");
+        key_vec.push_back({ boost::python::extract<size_t>(t()[0]), boost::python::extract<size_t>(t()[1]) });
+      }
+      try {
+        sptr->prefetch(key_vec, num_threads);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void wait() {
+      PyThreadState * pystate = PyEval_SaveThread();
+      try {
+        sptr->wait();
+      } catch (std::exception & e) {
+        PyEval_RestoreThread(pystate);
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+      PyEval_RestoreThread(pystate);
+    }
+
+    size_t size() const { return sptr->size(); }
+    void set_capacity(size_t capacity) { sptr->set_capacity(capacity); }
+
+    protected:
+      smt::SmtSolver solver;
+      std::shared_ptr<StateTree> sptr;
+  };
+
+  /* IndependenceChecker : whether expressions depend on variables, under the same assumptions */
+  struct IndependenceCheckerRef {
+    IndependenceCheckerRef(const boost::python::list & assumptions)
+        : sptr(std::make_shared<IndependenceChecker>(to_term_vec(assumptions, "IndependenceChecker"))) { }
+
+    bool is_independent(NodeRef * expr, NodeRef * var) {
+      try {
+        return sptr->is_independent(expr->node, var->node);
+      } catch (std::exception & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    /// pairs is a list of (e, v), returns a list of bool
+    boost::python::list check(const boost::python::list & pairs, unsigned num_threads) {
+      std::vector<IndependenceChecker::ExprVarPair> pair_vec;
+      for (ssize_t i = 0; i < len(pairs); ++i) {
+        boost::python::extract<boost::python::tuple> t(pairs[i]);
+        if (!t.check() || len(t()) != 2)
+          throw PyWASIMException(PyExc_RuntimeError, "check requires a list of (expr, var)");
+        smt::TermVec ev = to_term_vec(boost::python::list(t()), "check");
+        pair_vec.push_back({ ev.at(0), ev.at(1) });
+      }
+      std::vector<bool> res;
+      try {
+        res = sptr->check(pair_vec, num_threads);
+      } catch (std::exception & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+      boost::python::list ret;
+      for (bool r : res)
+        ret.append(r);
+      return ret;
+    }
+
+    size_t num_queries() const { return sptr->num_queries(); }
+    size_t num_hits() const { return sptr->num_hits(); }
+
+    protected:
+      std::shared_ptr<IndependenceChecker> sptr;
+  };
+
+  /* TimedAssertionBatchChecker : timed assertions (e.g. "out@2 == a@0 + b@1")
+     checked against one simulation of sim */
+  struct TimedAssertionBatch {
+    TimedAssertionBatch(const boost::python::list & assertions, TransSys * ts, Symsimulator * sim)
+        : ts_ptr(ts->sptr), sim_ptr(sim->sptr) {
+      std::vector<std::string> assertion_vec;
+      for (ssize_t i = 0; i < len(assertions); ++i) {
+        boost::python::extract<std::string> a(assertions[i]);
+        if (!a.check())
+          throw PyWASIMException(PyExc_RuntimeError, "TimedAssertionBatchChecker requires a list of strings");
+        assertion_vec.push_back(a());
+      }
+      try {
+        sptr = std::make_shared<tac::TimedAssertionBatchChecker>(assertion_vec, *ts_ptr, *sim_ptr, sim_ptr->get_solver());
+      } catch (std::exception & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void sim_max_step(const std::string & rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name) {
+      sptr->sim_max_step(rst_sig_name, set_rst_to_0, clk_sig_name);
+    }
+
+    void make_assertion_terms() { sptr->make_assertion_terms(); }
+
+    /// a list of {assertion, holds, sat, seconds}, in the order of the assertions
+    boost::python::list check_all(unsigned num_threads) {
+      boost::python::list ret;
+      std::vector<tac::TimedAssertionBatchChecker::Result> results;
+      try {
+        results = sptr->check_all(num_threads);
+      } catch (std::exception & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+      for (const auto & r : results) {
+        boost::python::dict d;
+        d["assertion"] = r.assertion;
+        d["holds"] = r.holds();
+        d["sat"] = r.result.is_sat();
+        d["seconds"] = r.seconds;
+        ret.append(d);
+      }
+      return ret;
+    }
+
+    int get_max_cycle() const { return sptr->get_max_cycle(); }
+
+    protected:
+      std::shared_ptr<TransitionSystem> ts_ptr;  // the checker keeps references
+      std::shared_ptr<SymbolicSimulator> sim_ptr;
+      std::shared_ptr<tac::TimedAssertionBatchChecker> sptr;
+  };
+
+  /* SygusCache : the on-disk cache of SyGuS results */
+  struct SygusCacheRef {
+    SygusCacheRef(const std::string & dir, size_t capacity) {
+      try {
+        sptr = std::make_shared<SygusCache>(dir, capacity);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
 
-  /* TODO : SymbolicTraverse */
+    /// returns (status, result), status is one of "miss", "solved" and "timeout"
+    boost::python::tuple lookup(const std::string & problem, unsigned timeout) {
+      std::string result;
+      auto status = sptr->lookup(problem, timeout, result);
+      const char * status_str = status == SygusCache::SOLVED ? "solved" :
+                                status == SygusCache::TIMEOUT ? "timeout" : "miss";
+      return boost::python::make_tuple(std::string(status_str), result);
+    }
+
+    void store_result(const std::string & problem, const std::string & result) {
+      try {
+        sptr->store_result(problem, result);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void store_timeout(const std::string & problem, unsigned timeout) {
+      try {
+        sptr->store_timeout(problem, timeout);
+      } catch (SimulatorException & e) {
+        throw PyWASIMException(PyExc_RuntimeError, e.what());
+      }
+    }
+
+    void clear() { sptr->clear(); }
+
+    boost::python::dict stats() const {
+      boost::python::dict ret;
+      ret["hits"] = sptr->hits();
+      ret["timeout_hits"] = sptr->timeout_hits();
+      ret["misses"] = sptr->misses();
+      ret["stores"] = sptr->stores();
+      ret["evictions"] = sptr->evictions();
+      return ret;
+    }
+
+    protected:
+      std::shared_ptr<SygusCache> sptr;
+  };
+
+  /// the cache used by sygus_simplify, an empty dir disables it
+  void set_sygus_cache(const std::string & dir, size_t capacity) {
+    try {
+      sygus_set_cache(dir, capacity);
+    } catch (SimulatorException & e) {
+      throw PyWASIMException(PyExc_RuntimeError, e.what());
+    }
+  }
+
+  /// the text of the SyGuS problem of expr, as it is keyed in the cache
+  std::string sygus_problem(NodeRef * expr, const boost::python::list & assumptions, const boost::python::list & xvars) {
+    smt::TermVec xvar_vec = to_term_vec(xvars, "sygus_problem");
+    smt::UnorderedTermSet xvar_set(xvar_vec.begin(), xvar_vec.end());
+    return sygus_problem_text(expr->node, to_term_vec(assumptions, "sygus_problem"), xvar_set);
+  }
 
 } // end namespace wasim
 
@@ -1596,6 +2580,7 @@ BOOST_PYTHON_MODULE(pywasimbase)
     .def("args", &NodeRef::args)
     .def("__hash__", &NodeRef::hash)
     .def("__repr__", &NodeRef::short_str)
+    .def("abbrev", &NodeRef::abbrev)
     .def("__str__", &NodeRef::to_string)
     .def("get_solver", &NodeRef::get_solver, return_value_policy<manage_new_object>() )
     .def("get_vars", &NodeRef::get_vars)
@@ -1680,6 +2665,8 @@ BOOST_PYTHON_MODULE(pywasimbase)
 
   def("is_sat", &NodeRef::is_sat);
   def("same_expr", &NodeRef::same_expr);
+  def("expr_simplify_ite", &NodeRef::simplify_ite, return_value_policy<manage_new_object>());
+  def("expr_contains_X", &NodeRef::contains_X);
   def("make_term", &NodeRef::make_term,
           return_value_policy<manage_new_object>());
   // memory write.
@@ -1777,6 +2764,107 @@ BOOST_PYTHON_MODULE(pywasimbase)
     .def("get_varnames", &StateRef::get_varnames)
     .def("get_sv", &StateRef::get_sv)
     .def("set_sv", &StateRef::set_sv)
+    .def("sygus_simplify", &StateRef::sygus_simplify)
+  ;
+
+  class_<TraverseStates, boost::noncopyable>("TraverseStates", no_init)
+    .def("__iter__", objects::identity_function())
+    .def("__next__", &TraverseStates::next, return_value_policy<manage_new_object>())
+  ;
+
+  class_<Traverse>("Traverse", init<TransSys *, Symsimulator *, const boost::python::list &>())
+    .def("traverse_one_step", &Traverse::traverse_one_step)
+    .def("traverse_one_step_parallel", &Traverse::traverse_one_step_parallel)
+    .def("traverse", &Traverse::traverse)
+    .def("traverse_to_archive", &Traverse::traverse_to_archive)
+    .def("iter_states", &Traverse::iter_states, return_value_policy<manage_new_object>())
+    .def("get_abs_state", &Traverse::get_abs_state)
+    .def("get_all_branches", &Traverse::get_all_branches)
+  ;
+
+  class_<TraceManagerRef>("TraceManager", init<TransSys *, Symsimulator *>())
+    .def("record_base_var", &TraceManagerRef::record_base_var)
+    .def("record_state", &TraceManagerRef::record_state)
+    .def("get_abs_state", &TraceManagerRef::get_abs_state)
+    .def("num_abs_eq_calls", &TraceManagerRef::num_abs_eq_calls)
+    .def("num_abs_eq_skipped", &TraceManagerRef::num_abs_eq_skipped)
+  ;
+
+  class_<ArchiveWriter>("StateArchiveWriter", init<const std::string &, Symsimulator *, bool>())
+    .def("write", &ArchiveWriter::write)
+    .def("flush", &ArchiveWriter::flush)
+    .def("close", &ArchiveWriter::close)
+  ;
+
+  class_<ArchiveReader>("StateArchiveReader", init<const std::string &, Symsimulator *>())
+    .def("has", &ArchiveReader::has)
+    .def("read", &ArchiveReader::read, return_value_policy<manage_new_object>())
+    .def("keys", &ArchiveReader::keys)
+    .def("recovered", &ArchiveReader::recovered)
+  ;
+
+  class_<StateReadWrite>("StateRW", init<Symsimulator *>())
+    .def("write", &StateReadWrite::write)
+    .def("read", &StateReadWrite::read, return_value_policy<manage_new_object>())
+    .def("read_string", &StateReadWrite::read_string, return_value_policy<manage_new_object>())
+    .def("write_tree", &StateReadWrite::write_tree)
+    .def("read_tree", &StateReadWrite::read_tree)
+  ;
+
+  class_<StateTreeRef>("StateTree", init<const std::string &, Symsimulator *, size_t>())
+    .def("has", &StateTreeRef::has)
+    .def("keys", &StateTreeRef::keys)
+    .def("get", &StateTreeRef::get, return_value_policy<manage_new_object>())
+    .def("prefetch", &StateTreeRef::prefetch)
+    .def("wait", &StateTreeRef::wait)
+    .def("size", &StateTreeRef::size)
+    .def("set_capacity", &StateTreeRef::set_capacity)
+  ;
+
+  class_<IndependenceCheckerRef>("IndependenceChecker", init<const boost::python::list &>())
+    .def("is_independent", &IndependenceCheckerRef::is_independent)
+    .def("check", &IndependenceCheckerRef::check)
+    .def("num_queries", &IndependenceCheckerRef::num_queries)
+    .def("num_hits", &IndependenceCheckerRef::num_hits)
+  ;
+
+  class_<TimedAssertionBatch>("TimedAssertionBatchChecker", init<const boost::python::list &, TransSys *, Symsimulator *>())
+    .def("sim_max_step", &TimedAssertionBatch::sim_max_step)
+    .def("make_assertion_terms", &TimedAssertionBatch::make_assertion_terms)
+    .def("check_all", &TimedAssertionBatch::check_all)
+    .def("get_max_cycle", &TimedAssertionBatch::get_max_cycle)
+  ;
+
+  class_<SygusCacheRef>("SygusCache", init<const std::string &, size_t>())
+    .def("lookup", &SygusCacheRef::lookup)
+    .def("store_result", &SygusCacheRef::store_result)
+    .def("store_timeout", &SygusCacheRef::store_timeout)
+    .def("clear", &SygusCacheRef::clear)
+    .def("stats", &SygusCacheRef::stats)
+  ;
+
+  def("sygus_problem", &wasim::sygus_problem);
+  def("sygus_set_cache", &wasim::set_sygus_cache);
+  def("sygus_set_jobs", &sygus_set_jobs);
+  def("sygus_get_jobs", &sygus_get_jobs);
+
+  enum_<BranchClass>("BranchClass")
+    .value("ALWAYS_TRUE", BranchClass::ALWAYS_TRUE)
+    .value("ALWAYS_FALSE", BranchClass::ALWAYS_FALSE)
+    .value("BOTH", BranchClass::BOTH)
+    .value("INFEASIBLE", BranchClass::INFEASIBLE)
+  ;
+
+  class_<InputMapRef>("InputMap")
+    .def("__contains__", &InputMapRef::contains)
+    .def("__getitem__", &InputMapRef::getitem, return_value_policy<manage_new_object>())
+    .def("__setitem__", &InputMapRef::setitem)
+    .def("__delitem__", &InputMapRef::delitem)
+    .def("__len__", &InputMapRef::size)
+    .def("update", &InputMapRef::update)
+    .def("copy", &InputMapRef::copy, return_value_policy<manage_new_object>())
+    .def("__copy__", &InputMapRef::copy, return_value_policy<manage_new_object>())
+    .def("to_dict", &InputMapRef::to_dict)
   ;
 
   class_<SolverRef>("SolverRef")
@@ -1819,6 +2907,10 @@ BOOST_PYTHON_MODULE(pywasimbase)
     .def("__copy__", &TransSys::clone, return_value_policy<manage_new_object>())
   ;
 
+  class_<SimSnapshot>("SimSnapshot", no_init)
+    .def("tracelen", &SimSnapshot::tracelen)
+  ;
+
   class_<Symsimulator>("Symsimulator", init<TransSys *>())
     .def("tracelen", &Symsimulator::tracelen)
     .def("all_assumptions", &Symsimulator::all_assumptions)
@@ -1835,16 +2927,39 @@ BOOST_PYTHON_MODULE(pywasimbase)
     .def("set_current_state", &Symsimulator::set_current_state)
     .def("set_input", &Symsimulator::set_input)
     .def("undo_set_input", &Symsimulator::undo_set_input)
+    .def("new_input_map", &Symsimulator::new_input_map, return_value_policy<manage_new_object>())
 
     .def("interpret_state_expr_on_curr_frame", &Symsimulator::interpret_state_expr_on_curr_frame, return_value_policy<manage_new_object>() )
     .def("interpret_input_and_state_expr_on_curr_frame", &Symsimulator::interpret_input_and_state_expr_on_curr_frame, return_value_policy<manage_new_object>() )
     
     .def("sim_one_step", &Symsimulator::sim_one_step)
+    .def("sim_steps", &Symsimulator::sim_steps)
     .def("get_Xs", &Symsimulator::get_Xs)
     .def("get_curr_state", &Symsimulator::get_curr_state, return_value_policy<manage_new_object>())
     .def("set_var", &Symsimulator::set_var, return_value_policy<manage_new_object>())
     .def("get_var", &Symsimulator::get_var, return_value_policy<manage_new_object>())
     .def("get_solver", &Symsimulator::get_solver, return_value_policy<manage_new_object>())
+    .def("set_incremental", &Symsimulator::set_incremental)
+    .def("is_incremental", &Symsimulator::is_incremental)
+    .def("check_sat_incremental", &Symsimulator::check_sat_incremental)
+    .def("check_sat_query", &Symsimulator::check_sat_query)
+    .def("classify", &Symsimulator::classify)
+    .def("set_query_cache", &Symsimulator::set_query_cache)
+    .def("clear_query_cache", &Symsimulator::clear_query_cache)
+    .def("query_cache_stats", &Symsimulator::query_cache_stats)
+    .def("set_simplify_policy", &Symsimulator::set_simplify_policy)
+    .def("simplify_current_state", &Symsimulator::simplify_current_state)
+    .def("set_abstraction_budget", &Symsimulator::set_abstraction_budget)
+    .def("set_abstraction_budget_var", &Symsimulator::set_abstraction_budget_var)
+    .def("abstractions", &Symsimulator::abstractions)
+    .def("concretize", &Symsimulator::concretize, return_value_policy<manage_new_object>())
+    .def("check_sat_concrete", &Symsimulator::check_sat_concrete)
+    .def("snapshot", &Symsimulator::snapshot, return_value_policy<manage_new_object>())
+    .def("restore", &Symsimulator::restore)
+    .def("fork", &Symsimulator::fork, return_value_policy<manage_new_object>())
+    .def("set_stats", &Symsimulator::set_stats)
+    .def("reset_stats", &Symsimulator::reset_stats)
+    .def("stats", &Symsimulator::stats)
   ;
 
 
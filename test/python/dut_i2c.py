@@ -26,32 +26,9 @@ from pywasim import Dut
 
 
 def task_reset(dut):
-    # arst_i = 1
-    dut.wb_rst_i.value = 0
-    dut.arst_i.value = 1
-    dut.wb_we_i .value =  0
-    dut.wb_stb_i.value =  0
-    dut.wb_cyc_i.value =  0
-
-    dut.step()
-
-    # arst_i = 0
-    dut.wb_rst_i.value = 0
-    dut.arst_i.value = 0
-    dut.wb_we_i .value =  0
-    dut.wb_stb_i.value =  0
-    dut.wb_cyc_i.value =  0
-
-    dut.step()
-
-    # arst_i = 1
-    dut.wb_rst_i.value = 0
-    dut.arst_i.value = 1
-    dut.wb_we_i .value =  0
-    dut.wb_stb_i.value =  0
-    dut.wb_cyc_i.value =  0
-
-    dut.step()
+    # arst_i : 1 -> 0 -> 1, the other control signals are kept low
+    idle = {"wb_rst_i" : 0, "wb_we_i" : 0, "wb_stb_i" : 0, "wb_cyc_i" : 0}
+    dut.run(3, [dict(idle, arst_i = 1), dict(idle, arst_i = 0), dict(idle, arst_i = 1)])
 
     print("task reset done")
 
@@ -1,5 +1,7 @@
 import os
 import sys
+import logging
+import json
 
 script_path = os.path.realpath(__file__)
 parent_dir = os.path.dirname(os.path.dirname(os.path.dirname(script_path)))
@@ -7,6 +9,32 @@ build_dir = os.path.join(parent_dir, 'build')
 sys.path.append(build_dir)
 
 from pywasimbase import *
+
+# log messages, only formatted when they are emitted. Silent (except the warnings)
+# unless enabled, e.g. with set_log_level(logging.DEBUG)
+#   INFO  : the results of the checks
+#   DEBUG : the steps of the simulation and the terms involved
+log = logging.getLogger('pywasim')
+abbrev_depth = 3     # terms in log messages are printed up to this depth
+abbrev_length = 200  # and up to this many characters, None prints them in full
+
+class _term_str(object):
+    # formats a term only when the log message is emitted
+    def __init__(self, term):
+        self.term = term
+    def __str__(self):
+        if abbrev_length is None:
+            return self.term.to_string()
+        return self.term.abbrev(abbrev_depth, abbrev_length)
+
+def set_log_level(level, stream = sys.stdout):
+    # print the log messages at or above level to stream
+    log.setLevel(level)
+    if not any(getattr(h, 'pywasim_handler', False) for h in log.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.pywasim_handler = True
+        log.addHandler(handler)
 # TransSys, Simsimulator
 
 class Dut:
@@ -21,6 +49,7 @@ class Dut:
         self.iv_term_dict = {}
         self.iv_term_dict_default = {}
         self.constraints = []
+        self.stats_file = None  # the stats are appended here after each step, see set_stats
 
         self.initialized = False
         self.prop = self._get_property()
@@ -30,26 +59,22 @@ class Dut:
     def _get_property(self):
         prop_list = self.ts.prop()
         if not prop_list:
-            print("No property to check!")
+            log.warning("No property to check!")
             return None
         elif len(prop_list) == 1:
-            print("property:", prop_list[0])
+            log.info('property: %s', _term_str(prop_list[0]))
             return prop_list[0]
         else:
             prop_i = prop_list[0]
             for idx in range(1, len(prop_list)):
                 # prop_i = pywasim.make_term("And", prop_i, prop_list[idx])
                 prop_i = prop_i & prop_list[idx]
-            print("property:", prop_i)
+            log.info('property: %s', _term_str(prop_i))
             return prop_i
 
     def _create_iv_dict(self):
-        iv_dict = {}
-        idx = str(self.step_cycle())
-        for iv in self.inputvars_list:
-            iv_dict[iv.to_string()] = iv.to_string()+ "X" + idx # inputvar string dict
-        self.iv_term_dict = self.simulator.convert(iv_dict) # create default inputvars term dict
-        self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars
+        # fresh inputvars are created natively in one call, default inputvars override them
+        self.iv_term_dict = self.simulator.new_input_map(self.iv_term_dict_default)
 
     def set_init(self, d = {}):
         if self.initialized:
@@ -75,13 +100,132 @@ class Dut:
 
     def clear_constraint(self):
         self.constraints.clear()
-        
+
+    def set_incremental(self, en = True):
+        # keep trace assumptions and constraints asserted in the solver, one scope per frame,
+        # so a query only adds its goal. check_prop (under the assumptions only) and
+        # check_assertion (alone) give the same verdicts as without it
+        self.simulator.set_incremental(en)
+
+    def set_query_cache(self, capacity = 1024):
+        # remember the results of the last `capacity` distinct queries, 0 disables the cache
+        self.simulator.set_query_cache(capacity)
+
+    def query_cache_stats(self):
+        return self.simulator.query_cache_stats()
+
+    def set_simplify(self, every = 0, dag_limit = 0):
+        # simplify the state variables under the assumptions (and fold the ones that can
+        # only be a constant) every `every` cycles, or once a state variable's term has
+        # more than dag_limit nodes, 0 disables the trigger
+        self.simulator.set_simplify_policy(every, dag_limit)
+
+    def simplify(self):
+        # simplify the current state now, returns the number of changed state variables
+        return self.simulator.simplify_current_state()
+
+    def set_abstraction(self, dag_limit = 0, seconds = 0, var = None):
+        # after each step, the value of a state variable whose term has more than dag_limit
+        # nodes (or took longer than seconds to compute) is replaced by a fresh X variable,
+        # 0 means no limit. The budget is for all state variables, or only for var (a name)
+        if var is None:
+            self.simulator.set_abstraction_budget(dag_limit, seconds)
+        else:
+            self.simulator.set_abstraction_budget_var(var, dag_limit, seconds)
+
+    def abstractions(self):
+        # the abstractions so far, a list of {frame, var, value, xvar}
+        return self.simulator.abstractions()
+
+    def _confirm(self, goals, constraints, with_assumptions):
+        # a satisfiable query may rely on abstracted state, check it again
+        # on the concrete values of the abstracted state variables
+        if not self.simulator.abstractions():
+            return True
+        res = self.simulator.check_sat_concrete(goals, constraints, with_assumptions)
+        if not res:
+            log.info('the result was spurious due to abstraction')
+        return res
+
+    def set_stats(self, en = True, json_file = None):
+        # count the time of convert/set_input/sim_one_step/substitute and the solver calls,
+        # if json_file is given, stats() is appended to it (one line) after each step/run
+        self.simulator.set_stats(en)
+        if self.stats_file is not None:
+            self.stats_file.close()
+        self.stats_file = open(json_file, 'a') if en and json_file else None
+
+    def stats(self):
+        # phases: {name : {calls, seconds}}, solver: {sat, unsat, unknown, seconds},
+        # dag_size: {state var : DAG size of its current value}, assumptions: count per frame
+        return self.simulator.stats()
+
+    def _dump_stats(self):
+        if self.stats_file is not None:
+            self.stats_file.write(json.dumps(self.stats()) + '\n')
+            self.stats_file.flush()
+
     def step(self, num = 1, asmpt = []):
-        for _ in range(num):
-            self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars again, avoid default input vars changed
-            self.simulator.set_input(self.iv_term_dict, asmpt)
-            self.simulator.sim_one_step()
-            self._create_iv_dict()  # create new inputvars
+        self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars again, avoid default input vars changed
+        # the first cycle uses the assigned inputvars, the others get fresh ones and the defaults
+        self.simulator.sim_steps(num, [self.iv_term_dict], [asmpt] * num, self.iv_term_dict_default, [])
+        self._create_iv_dict()  # create new inputvars
+        self._dump_stats()
+
+    def run(self, num, schedule = [], asmpts = [], observe = []):
+        # simulate num cycles in one native call
+        #   schedule: a list of per-cycle {name : value} dicts, or a callable
+        #             that takes the cycle offset and this Dut and returns such a dict,
+        #             it is called right before that cycle, so it sees the current state
+        #   asmpts:   a list of per-cycle assumption lists
+        #   observe:  names of signals whose final values are returned
+        # inputvars already assigned for the current cycle are used in the first cycle
+        # unless the schedule overrides them, unassigned inputvars use the defaults
+        first = self.iv_term_dict.copy()
+        first.update(self.iv_term_dict_default)
+
+        def _first_cycle(d):
+            ret = first.copy()
+            ret.update(d)
+            return ret
+
+        if callable(schedule):
+            def inputs(i):
+                d = self.simulator.convert(schedule(i, self))
+                return _first_cycle(d) if i == 0 else d
+        else:
+            inputs = [self.simulator.convert(d) for d in schedule]
+            inputs[:1] = [_first_cycle(inputs[0] if inputs else {})]
+
+        ret = self.simulator.sim_steps(num, inputs, asmpts, self.iv_term_dict_default, observe)
+        self._create_iv_dict()  # create new inputvars
+        self._dump_stats()
+        return ret
+
+    def snapshot(self):
+        # cheap: the simulator frames are shared until they are changed
+        return (self.simulator.snapshot(), self.iv_term_dict.copy(),
+                dict(self.iv_term_dict_default), list(self.constraints))
+
+    def restore(self, snap):
+        # go back (or forward) to a snapshot of this Dut
+        sim_snap, iv_term_dict, iv_term_dict_default, constraints = snap
+        self.simulator.restore(sim_snap)
+        self.iv_term_dict = iv_term_dict.copy()
+        self.iv_term_dict_default = dict(iv_term_dict_default)
+        self.constraints = list(constraints)
+
+    def fork(self):
+        # an independent Dut that continues from the current cycle (in the same solver,
+        # so incremental mode is turned off in both)
+        other = Dut.__new__(Dut)
+        other.__dict__.update(self.__dict__)
+        other.simulator = self.simulator.fork()
+        other.iv_term_dict = self.iv_term_dict.copy()
+        other.iv_term_dict_default = dict(self.iv_term_dict_default)
+        other.constraints = list(self.constraints)
+        other.stats_file = None
+        return other
 
     def back_step(self):
         self.simulator.backtrack()
@@ -93,46 +237,43 @@ class Dut:
 
     def check_prop(self):
         cur_prop = self.simulator.interpret_state_expr_on_curr_frame(self.prop)
-        assumptions = self.simulator.all_assumptions()
-        print(f"property: {cur_prop.to_string()}")
-        for a in assumptions:
-            print(f"assumption: {a.to_string()}")
-
-        self.solver.push()
-        for a in assumptions:
-            self.solver.assert_formula(a)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('property: %s', _term_str(cur_prop))
+            for a in self.simulator.all_assumptions():
+                log.debug('assumption: %s', _term_str(a))
+
         f = ~cur_prop   # make_term(not, cur_prop)
-        self.solver.assert_formula(f)
-        res = self.solver.check_sat()
-        self.solver.pop()
+        res = self.simulator.check_sat_query([f], [], True)
+        res = res and self._confirm([f], [], True)
 
         if res:
-            print("check prop result: fail!")
+            log.info('check prop result: fail!')
         else:
-            print("check prop result: pass!")
+            log.info('check prop result: pass!')
         return not res  # unsat -> return True
 
     def check_sat(self, asst, asmpts):
-        print('dut.check_sat')
-        asmpts_all = self.simulator.all_assumptions()
-        asmpts_all.extend(asmpts)
-        asmpts_all.extend(self.constraints)
-        asmpts_all.append(asst)
-        return self.solver.check_sat_assuming(asmpts_all)
+        log.debug('dut.check_sat')
+        goals = list(asmpts) + [asst]
+        return self.simulator.check_sat_query(goals, self.constraints, True) and \
+            self._confirm(goals, self.constraints, True)
+
+    def classify(self, cond, asmpts):
+        # BranchClass.ALWAYS_TRUE / ALWAYS_FALSE / BOTH, or INFEASIBLE if the assumptions
+        # cannot hold, both checks share one solver scope
+        return self.simulator.classify(cond, asmpts, self.constraints)
 
     def check_assertion(self, assertion):
-        print(f"dut.check_assertion: {assertion.to_string()}")
+        log.debug('dut.check_assertion: %s', _term_str(assertion))
 
-        self.solver.push()
         formula = ~assertion    # make_term(not, assertion)
-        self.solver.assert_formula(formula)
-        res = self.solver.check_sat()
-        self.solver.pop()
+        res = self.simulator.check_sat_query([formula], [], False)
+        res = res and self._confirm([formula], [], False)
 
         if res:
-            print("check assertion result: fail!")
+            log.info('check assertion result: fail!')
         else:
-            print("check assertion result: pass!")
+            log.info('check assertion result: pass!')
         return not res
 
     def print_curr_sv(self):
@@ -174,7 +315,7 @@ class SignalProxy:
                 signal_nr = nf.substitute(self.dut.iv_term_dict)    # only have input vars
             else:
                 signal_nr = self.dut.simulator.interpret_input_and_state_expr_on_curr_frame(nf, self.dut.iv_term_dict)  # have state vars and input vars
-                print(f"Warning: expr(dut.{self.name}.value) contains current inputvars; Modifying related inputvars afterward may cause (dut.{self.name}.value) changed.")
+                log.warning(f"expr(dut.{self.name}.value) contains current inputvars; Modifying related inputvars afterward may cause (dut.{self.name}.value) changed.")
             return signal_nr
 
     @value.setter
@@ -1,7 +1,13 @@
 import os
 import sys
+import logging
+import json
 import inspect
 import ast
+import textwrap
+import collections
+import multiprocessing
+import time
 from functools import wraps
 
 script_path = os.path.realpath(__file__)
@@ -10,10 +16,33 @@ build_dir = os.path.join(parent_dir, 'build')
 sys.path.append(build_dir)
 
 from pywasimbase import *
-# TransSys, Simsimulator
 
-_all_coroutine = []
-_all_states = []
+# log messages, only formatted when they are emitted. Silent (except the warnings)
+# unless enabled, e.g. with set_log_level(logging.DEBUG)
+#   INFO  : the results of the checks
+#   DEBUG : the steps of the simulation and the terms involved
+log = logging.getLogger('pywasim_async')
+abbrev_depth = 3     # terms in log messages are printed up to this depth
+abbrev_length = 200  # and up to this many characters, None prints them in full
+
+class _term_str(object):
+    # formats a term only when the log message is emitted
+    def __init__(self, term):
+        self.term = term
+    def __str__(self):
+        if abbrev_length is None:
+            return self.term.to_string()
+        return self.term.abbrev(abbrev_depth, abbrev_length)
+
+def set_log_level(level, stream = sys.stdout):
+    # print the log messages at or above level to stream
+    log.setLevel(level)
+    if not any(getattr(h, 'pywasim_handler', False) for h in log.handlers):
+        handler = logging.StreamHandler(stream)
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        handler.pywasim_handler = True
+        log.addHandler(handler)
+# TransSys, Simsimulator
 
 class Dut:
     def __init__(self, btorname):
@@ -28,6 +57,7 @@ class Dut:
         self.iv_term_dict = {}
         self.iv_term_dict_default = {}
         self.constraints = []
+        self.stats_file = None  # the stats are appended here after each step, see set_stats
 
         self.initialized = False
         # self.prop = self._get_property()
@@ -37,26 +67,22 @@ class Dut:
     def _get_property(self):
         prop_list = self.ts.prop()
         if not prop_list:
-            print("No property to check!")
+            log.warning("No property to check!")
             return None
         elif len(prop_list) == 1:
-            print("property:", prop_list[0])
+            log.info('property: %s', _term_str(prop_list[0]))
             return prop_list[0]
         else:
             prop_i = prop_list[0]
             for idx in range(1, len(prop_list)):
                 # prop_i = pywasim.make_term("And", prop_i, prop_list[idx])
                 prop_i = prop_i & prop_list[idx]
-            print("property:", prop_i)
+            log.info('property: %s', _term_str(prop_i))
             return prop_i
 
     def _create_iv_dict(self):
-        iv_dict = {}
-        idx = str(self.step_cycle())
-        for iv in self.inputvars_list:
-            iv_dict[iv.to_string()] = iv.to_string()+ "X" + idx # inputvar string dict
-        self.iv_term_dict = self.simulator.convert(iv_dict) # create default inputvars term dict
-        self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars
+        # fresh inputvars are created natively in one call, default inputvars override them
+        self.iv_term_dict = self.simulator.new_input_map(self.iv_term_dict_default)
 
     def set_init(self, d = {}):
         if self.initialized:
@@ -83,13 +109,132 @@ class Dut:
     def clear_constraint(self):
         self.constraints.clear()
 
+    def set_incremental(self, en = True):
+        # keep trace assumptions and constraints asserted in the solver, one scope per frame,
+        # so a query only adds its goal. check_prop (under the assumptions only) and
+        # check_assertion (alone) give the same verdicts as without it
+        self.simulator.set_incremental(en)
+
+    def set_query_cache(self, capacity = 1024):
+        # remember the results of the last `capacity` distinct queries, 0 disables the cache
+        self.simulator.set_query_cache(capacity)
+
+    def query_cache_stats(self):
+        return self.simulator.query_cache_stats()
+
+    def set_simplify(self, every = 0, dag_limit = 0):
+        # simplify the state variables under the assumptions (and fold the ones that can
+        # only be a constant) every `every` cycles, or once a state variable's term has
+        # more than dag_limit nodes, 0 disables the trigger
+        self.simulator.set_simplify_policy(every, dag_limit)
+
+    def simplify(self):
+        # simplify the current state now, returns the number of changed state variables
+        return self.simulator.simplify_current_state()
+
+    def set_abstraction(self, dag_limit = 0, seconds = 0, var = None):
+        # after each step, the value of a state variable whose term has more than dag_limit
+        # nodes (or took longer than seconds to compute) is replaced by a fresh X variable,
+        # 0 means no limit. The budget is for all state variables, or only for var (a name)
+        if var is None:
+            self.simulator.set_abstraction_budget(dag_limit, seconds)
+        else:
+            self.simulator.set_abstraction_budget_var(var, dag_limit, seconds)
+
+    def abstractions(self):
+        # the abstractions so far, a list of {frame, var, value, xvar}
+        return self.simulator.abstractions()
+
+    def _confirm(self, goals, constraints, with_assumptions):
+        # a satisfiable query may rely on abstracted state, check it again
+        # on the concrete values of the abstracted state variables
+        if not self.simulator.abstractions():
+            return True
+        res = self.simulator.check_sat_concrete(goals, constraints, with_assumptions)
+        if not res:
+            log.info('the result was spurious due to abstraction')
+        return res
+
+    def set_stats(self, en = True, json_file = None):
+        # count the time of convert/set_input/sim_one_step/substitute and the solver calls,
+        # if json_file is given, stats() is appended to it (one line) after each step/run
+        self.simulator.set_stats(en)
+        if self.stats_file is not None:
+            self.stats_file.close()
+        self.stats_file = open(json_file, 'a') if en and json_file else None
+
+    def stats(self):
+        # phases: {name : {calls, seconds}}, solver: {sat, unsat, unknown, seconds},
+        # dag_size: {state var : DAG size of its current value}, assumptions: count per frame
+        return self.simulator.stats()
+
+    def _dump_stats(self):
+        if self.stats_file is not None:
+            self.stats_file.write(json.dumps(self.stats()) + '\n')
+            self.stats_file.flush()
+
     def step(self, num = 1, asmpt = []):
-        for _ in range(num):
-            self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars again, avoid default input vars changed
-            self.simulator.set_input(self.iv_term_dict, asmpt)
-            self.simulator.sim_one_step()
-            self._create_iv_dict()  # create new inputvars
-        print (f'<cycle:{self.step_cycle()-1}>')
+        self.iv_term_dict.update(self.iv_term_dict_default) # set default inputvars again, avoid default input vars changed
+        # the first cycle uses the assigned inputvars, the others get fresh ones and the defaults
+        self.simulator.sim_steps(num, [self.iv_term_dict], [asmpt] * num, self.iv_term_dict_default, [])
+        self._create_iv_dict()  # create new inputvars
+        self._dump_stats()
+        log.debug('<cycle:%d>', self.step_cycle()-1)
+
+    def run(self, num, schedule = [], asmpts = [], observe = []):
+        # simulate num cycles in one native call
+        #   schedule: a list of per-cycle {name : value} dicts, or a callable
+        #             that takes the cycle offset and this Dut and returns such a dict,
+        #             it is called right before that cycle, so it sees the current state
+        #   asmpts:   a list of per-cycle assumption lists
+        #   observe:  names of signals whose final values are returned
+        # inputvars already assigned for the current cycle are used in the first cycle
+        # unless the schedule overrides them, unassigned inputvars use the defaults
+        first = self.iv_term_dict.copy()
+        first.update(self.iv_term_dict_default)
+
+        def _first_cycle(d):
+            ret = first.copy()
+            ret.update(d)
+            return ret
+
+        if callable(schedule):
+            def inputs(i):
+                d = self.simulator.convert(schedule(i, self))
+                return _first_cycle(d) if i == 0 else d
+        else:
+            inputs = [self.simulator.convert(d) for d in schedule]
+            inputs[:1] = [_first_cycle(inputs[0] if inputs else {})]
+
+        ret = self.simulator.sim_steps(num, inputs, asmpts, self.iv_term_dict_default, observe)
+        self._create_iv_dict()  # create new inputvars
+        self._dump_stats()
+        return ret
+
+    def snapshot(self):
+        # cheap: the simulator frames are shared until they are changed
+        return (self.simulator.snapshot(), self.iv_term_dict.copy(),
+                dict(self.iv_term_dict_default), list(self.constraints))
+
+    def restore(self, snap):
+        # go back (or forward) to a snapshot of this Dut
+        sim_snap, iv_term_dict, iv_term_dict_default, constraints = snap
+        self.simulator.restore(sim_snap)
+        self.iv_term_dict = iv_term_dict.copy()
+        self.iv_term_dict_default = dict(iv_term_dict_default)
+        self.constraints = list(constraints)
+
+    def fork(self):
+        # an independent Dut that continues from the current cycle (in the same solver,
+        # so incremental mode is turned off in both)
+        other = Dut.__new__(Dut)
+        other.__dict__.update(self.__dict__)
+        other.simulator = self.simulator.fork()
+        other.iv_term_dict = self.iv_term_dict.copy()
+        other.iv_term_dict_default = dict(self.iv_term_dict_default)
+        other.constraints = list(self.constraints)
+        other.stats_file = None
+        return other
 
     def back_step(self):
         self.simulator.backtrack()
@@ -101,46 +246,48 @@ class Dut:
 
     def check_prop(self):
         cur_prop = self.simulator.interpret_state_expr_on_curr_frame(self.prop)
-        assumptions = self.simulator.all_assumptions()
-        print(f"property: {cur_prop.to_string()}")
-        for a in assumptions:
-            print(f"assumption: {a.to_string()}")
-
-        self.solver.push()
-        for a in assumptions:
-            self.solver.assert_formula(a)
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug('property: %s', _term_str(cur_prop))
+            for a in self.simulator.all_assumptions():
+                log.debug('assumption: %s', _term_str(a))
+
         f = ~cur_prop   # make_term(not, cur_prop)
-        self.solver.assert_formula(f)
-        res = self.solver.check_sat()
-        self.solver.pop()
+        res = self.simulator.check_sat_query([f], [], True)
+        res = res and self._confirm([f], [], True)
 
         if res:
-            print("check prop result: fail!")
+            log.info('check prop result: fail!')
         else:
-            print("check prop result: pass!")
+            log.info('check prop result: pass!')
         return not res  # unsat -> return True
 
     def check_sat(self, asst, asmpts):
-        print('dut.check_sat')
-        asmpts_all = self.simulator.all_assumptions()
-        asmpts_all.extend(asmpts)
-        asmpts_all.extend(self.constraints)
-        asmpts_all.append(asst)
-        return self.solver.check_sat_assuming(asmpts_all)
+        log.debug('dut.check_sat')
+        goals = list(asmpts) + [asst]
+        return self.simulator.check_sat_query(goals, self.constraints, True) and \
+            self._confirm(goals, self.constraints, True)
+
+    def classify(self, cond, asmpts):
+        # BranchClass.ALWAYS_TRUE / ALWAYS_FALSE / BOTH, or INFEASIBLE if the assumptions
+        # cannot hold, both checks share one solver scope
+        return self.simulator.classify(cond, asmpts, self.constraints)
+
+    def is_feasible(self, asmpts):
+        # whether the assumptions (e.g. a branch condition) can hold on the current trace
+        return self.simulator.check_sat_query(list(asmpts), self.constraints, True) and \
+            self._confirm(list(asmpts), self.constraints, True)
 
     def check_assertion(self, assertion):
-        print(f"assertion: {assertion.to_string()}")
+        log.debug('assertion: %s', _term_str(assertion))
 
-        self.solver.push()
         formula = ~assertion    # make_term(not, assertion)
-        self.solver.assert_formula(formula)
-        res = self.solver.check_sat()
-        self.solver.pop()
+        res = self.simulator.check_sat_query([formula], [], False)
+        res = res and self._confirm([formula], [], False)
 
         if res:
-            print("check assertion result: fail!")
+            log.info('check assertion result: fail!')
         else:
-            print("check assertion result: pass!")
+            log.info('check assertion result: pass!')
         return not res
 
     def print_curr_sv(self):
@@ -201,7 +348,7 @@ class SignalProxy:
                 signal_nr = nf.substitute(self.dut.iv_term_dict)
             else:
                 signal_nr = self.dut.simulator.interpret_input_and_state_expr_on_curr_frame(nf, self.dut.iv_term_dict)  # have state vars and input vars
-                print(f"Warning: expr(dut.{self.name}.value) contains current inputvars; Modifying related inputvars afterward may cause (dut.{self.name}.value) changed.")
+                log.warning(f"expr(dut.{self.name}.value) contains current inputvars; Modifying related inputvars afterward may cause (dut.{self.name}.value) changed.")
             return signal_nr
 
     @value.setter
@@ -247,10 +394,17 @@ class SignalProxy:
 
 
 class async_simulator(object):
-    def __init__(self, dut):
+    def __init__(self, dut, merge_branches = False):
         self._state_ptr = None # should point to a pywasim_local_state object
         self.dut = dut
         self.finished = False
+        self.scheduler = task_scheduler() # the tasks running on this simulator
+        self.merge_branches = merge_branches # join branches that reach the same point, see task_scheduler.merge
+        # used by explore_parallel, see decide()
+        self.path = None      # the fork decisions to replay, None: keep both sides
+        self.split_depth = 0  # forks after the path and before this depth are handed back
+        self.taken = []       # the decisions made so far
+        self.spawned = []     # the paths handed back
     def get_var(self, name):
         return self.dut.simulator.get_var(name)
     def set_var(self, name, width:int):
@@ -258,19 +412,36 @@ class async_simulator(object):
 
     def check_valid(self, expr):
         assert (self._state_ptr)
-        print('<solver call>')
+        log.debug('<solver call>')
         can_sat = self.dut.check_sat(~expr, self._state_ptr.branch_cond)
-        print('<end solver call>')
+        log.debug('<end solver call>')
         if can_sat:
             # the behavior here should be controllable
             # it should also be debuggable
             # maybe dump waveform
             raise AssertionError('check_valid failed')
-            print("check_valid failed")
+            log.info("check_valid failed")
             return False
-        print("check_valid pass")
+        log.info("check_valid pass")
         return True        
         
+    def decide(self):
+        # which side of a wait_cond fork to follow: True/False, or None to keep both.
+        # Replays self.path, then keeps the false side and hands back the true side
+        # as a new path, until split_depth forks have been made
+        if self.path is None:
+            return None
+        n = len(self.taken)
+        if n < len(self.path):
+            d = self.path[n]
+        elif n < self.split_depth:
+            self.spawned.append(tuple(self.taken) + (True,))
+            d = False
+        else:
+            return None
+        self.taken.append(d)
+        return d
+
     def _set_stateptr(self, ptr):
         self._state_ptr = ptr
         
@@ -310,6 +481,129 @@ class await_condition(object):
         self.execthread = execthread
     # you will need to test if this is ready
 
+
+class task_scheduler(object):
+    # keeps the states of one async_simulator, so that in each cycle
+    # only the states that can make progress are touched:
+    #   ready   : states that can run now
+    #   timers  : states waiting for wait_cycle, bucketed by the cycle they wake up
+    #   waiters : states waiting for wait_task, by the task they wait for
+    #   pending : states waiting for wait_cond, checked after every dut.step()
+    #   stalled : states waiting for a task that never finishes, they stay blocked
+    def __init__(self):
+        self.states = []
+        self.ready = collections.deque()
+        self.timers = {}
+        self.waiters = {}
+        self.pending = []
+        self.stalled = []
+        self.cycle = 0
+        self.alive = 0
+
+    def add(self, st):
+        st.idx = len(self.states)
+        self.states.append(st)
+        self.ready.append(st)
+        self.alive += 1
+        return st
+
+    def block(self, st):
+        # file a state that has just set its await_cond
+        cond = st.await_cond
+        if cond.cycle:
+            self.timers.setdefault(self.cycle + cond.cycle, []).append(st)
+        elif cond.execthread is not None:
+            task = cond.execthread.resolve()
+            if task.finished:
+                st.await_cond = None
+                self.ready.append(st)
+            elif task.dropped:
+                self.stall(st)
+            else:
+                self.waiters.setdefault(id(task), []).append(st)
+        else:
+            assert cond.cond is not None
+            self.pending.append(st)
+
+    def finish(self, st):
+        self.alive -= 1
+        st.finish_merged()
+        for w in self.waiters.pop(id(st), []):
+            # the task it waits has finished, remove its blocker
+            w.await_cond = None
+            self.ready.append(w)
+
+    def drop(self, st, into = None):
+        # remove a state that is merged into (or covered by) another one,
+        # or that no execution reaches (into is None)
+        st.dropped = True
+        self.alive -= 1
+        waiting = self.waiters.pop(id(st), [])
+        if into is not None:
+            # it finishes when into finishes, its waiters follow
+            st.merged_into = into
+            into.merged.append(st)
+            self.waiters.setdefault(id(into), []).extend(waiting)
+        else:
+            for w in waiting:
+                self.stall(w)
+
+    def stall(self, st):
+        # st waits for a dropped task : it stays blocked but is no longer
+        # counted as alive, and so are the states waiting for it
+        st.dropped = True
+        self.alive -= 1
+        self.stalled.append(st)
+        for w in self.waiters.pop(id(st), []):
+            self.stall(w)
+
+    def merge(self, states, dut):
+        # states at the same point of the same task are joined by disjoining their
+        # branch conditions, the infeasible ones and those covered by a sibling are dropped
+        groups = collections.OrderedDict()
+        for st in states:
+            for key, group in groups.items():
+                if _same_point(group[0], st):
+                    group.append(st)
+                    break
+            else:
+                groups[len(groups)] = [st]
+
+        ret = []
+        for group in groups.values():
+            if len(group) == 1:
+                ret.append(group[0])
+                continue
+            kept = []
+            for st in group:
+                if not dut.is_feasible(st.branch_cond):
+                    self.drop(st)
+                    continue
+                covering = next((k for k in kept if _implies(dut, st.branch_cond, k.branch_cond)), None)
+                if covering is not None:
+                    self.drop(st, covering)
+                    continue
+                for k in [k for k in kept if _implies(dut, k.branch_cond, st.branch_cond)]:
+                    kept.remove(k)
+                    self.drop(k, st)
+                kept.append(st)
+            if not kept:
+                continue
+            survivor = kept[0]
+            if len(kept) > 1:
+                survivor.branch_cond = _disjoin([k.branch_cond for k in kept])
+                for k in kept[1:]:
+                    self.drop(k, survivor)
+            ret.append(survivor)
+        return ret
+
+    def tick(self):
+        # one cycle passed, wake up the expired timers
+        self.cycle += 1
+        for st in self.timers.pop(self.cycle, []):
+            st.await_cond = None
+            self.ready.append(st)
+
 class pywasim_local_state(object):
     def __init__(self, coroutine, args, kwargs):
         self.coroutine = coroutine
@@ -321,6 +615,10 @@ class pywasim_local_state(object):
         self.local = {}
         self.await_cond = None  # await condition could be clock(n)
         self.branch_cond = []
+        self.idx = -1  # set when it is added to a task_scheduler
+        self.dropped = False  # no longer runs : merged, infeasible or stalled
+        self.merged_into = None  # the state it is merged into
+        self.merged = []  # the states merged into it
         
     def clone(self): # it returns a passthrough object
         ret = pywasim_local_state(self.coroutine, [], {}) # you don't need to clone args and kwargs because it will not branch at invocation
@@ -335,57 +633,55 @@ class pywasim_local_state(object):
         
     def return_value(self):
         return self.retval
+
+    def resolve(self):
+        # the state that runs on behalf of this one
+        st = self
+        while st.merged_into is not None:
+            st = st.merged_into
+        return st
+
+    def finish_merged(self):
+        # the states merged into this one finish with it
+        for m in self.merged:
+            m.finished = True
+            m.retval = self.retval
+            m.finish_merged()
     
     def step(self):
         if self.finished:
-            print ('<coroutine finished>')
+            log.debug('<coroutine finished>')
             return
-        if self.pc >= len(self.coroutine.funbody):
-            print ('<coroutine finished>')
+        if self.pc >= len(self.coroutine.instrs):
+            log.debug('<coroutine finished>')
             self.finished = True
             return
-                    
-        print(f'<coroutine.pc:{self.pc}>')
+
+        log.debug('<coroutine.pc:%d>', self.pc)
+        instr = self.coroutine.instrs[self.pc]
         self.local['sim']._set_stateptr(self)
-        if isinstance(self.coroutine.funbody[self.pc], ast.Expr):
-            expr = self.coroutine.funbody[self.pc]
-            if isinstance(expr.value, ast.Call):
-                if isinstance(expr.value.func, ast.Attribute) and expr.value.func.value.id == 'sim' and expr.value.func.attr == 'wait_cond':
-                    # in sim.wait_cond(...), you should not immediately
-                    # interpret variables
-                    self.local['sim'].dut._do_not_interpret_var = True
-        
-        if isinstance(self.coroutine.funbody[self.pc], ast.Return):
-            ret = self.coroutine.funbody[self.pc]
-            self.retval = eval(ret.value, {},  self.local)
-            print ('<coroutine finished>')
-            self.finished = True
-        else:
+        # in sim.wait_cond(...), you should not immediately
+        # interpret variables
+        self.local['sim'].dut._do_not_interpret_var = instr.wait_cond
+        self.pc += 1
+
+        if instr.kind == _instr.EXEC:
             # sim.await will set await_cond
-            tmp_stmt = ast.Module(body=[self.coroutine.funbody[self.pc]], type_ignores=[])
-            exec(compile(tmp_stmt, "<ast>", "exec"), {}, self.local)
-            
+            exec(instr.code, {}, self.local)
+        elif instr.kind == _instr.JUMP_IF_NOT:
+            if not eval(instr.code, {}, self.local):
+                self.pc = instr.target
+        elif instr.kind == _instr.JUMP:
+            self.pc = instr.target
+        else:
+            assert instr.kind == _instr.RETURN
+            self.retval = eval(instr.code, {}, self.local) if instr.code is not None else None
+            log.debug('<coroutine finished>')
+            self.finished = True
+
         self.local['sim']._set_stateptr(None)
         self.local['sim'].dut._do_not_interpret_var = False
-        self.pc += 1
-        
-        # currently, it is only a quick and dirty implementation
-        # in general it is not as easy as it seems to be
-        # you should check if it is a while-loop and maintain the frames yourself
-        # in this way, you can also handle for example:
-        #    if dut.a.value == 0:
-        #        ...
-        #    else:
-        #        ...
-        # 
-        # and create branches as you see fit
-        #
-        # currently you can write it as
-        #     if sim.check_sat(dut.a.value == 0):
-        #        ...
-        #
-        # but this does not create execution branches
-        
+
     def parse_arg(self):
         assert (self.pc < 0 and not self.finished)
         # parse its args, set the local variables
@@ -404,40 +700,217 @@ class pywasim_local_state(object):
             idx += 1
         if idx < len(self.args):
             if func_node.args.vararg:
-                self.local[func_node.args.vararg] = self.args[idx:]
+                self.local[func_node.args.vararg.arg] = self.args[idx:]
             else:
-                raise RuntimeError('too many arguments ' + self.args[idx:])
+                raise RuntimeError('too many arguments ' + str(self.args[idx:]))
         if len(self.kwargs):
             if func_node.args.kwarg:
-                self.local[func_node.args.kwarg] = self.kwargs
+                self.local[func_node.args.kwarg.arg] = self.kwargs
             else:
-                raise RuntimeError('too many arguments ' + self.kwargs)
+                raise RuntimeError('too many arguments ' + str(self.kwargs))
         self.pc = 0
-                
-                
+
+
+class _instr(object):
+    # a task body is compiled once into a flat list of instructions,
+    # so a state is just (pc, local) and can be cloned when it branches
+    EXEC = 0         # run a simple statement
+    JUMP_IF_NOT = 1  # evaluate an expression, jump to target if it is false
+    JUMP = 2         # jump to target
+    RETURN = 3       # evaluate the return value (if any) and finish
+
+    __slots__ = ('kind', 'code', 'target', 'wait_cond')
+
+    def __init__(self, kind, code = None, target = None, wait_cond = False):
+        self.kind = kind
+        self.code = code
+        self.target = target
+        self.wait_cond = wait_cond
+
+
+def _same_value(a, b):
+    if a is b:
+        return True
+    if isinstance(a, NodeRef) and isinstance(b, NodeRef):
+        return same_expr(a, b)
+    return False
+
+def _same_point(a, b):
+    # whether two states will behave the same from now on (apart from their branch conditions)
+    if a.coroutine is not b.coroutine or a.pc != b.pc or a.pc < 0 or a.finished or b.finished:
+        return False
+    wa, wb = a.await_cond, b.await_cond
+    if (wa is None) != (wb is None):
+        return False
+    if wa is not None:
+        if wa.cycle != wb.cycle or wa.execthread is not wb.execthread or \
+                (wa.cond is None) != (wb.cond is None):
+            return False
+        if wa.cond is not None and not _same_value(wa.cond, wb.cond):
+            return False
+    if a.local.keys() != b.local.keys():
+        return False
+    return all(_same_value(v, b.local[k]) for k, v in a.local.items())
+
+def _conjoin(conds):
+    ret = conds[0]
+    for c in conds[1:]:
+        ret = ret & c
+    return ret
+
+def _implies(dut, bc_a, bc_b):
+    # bc_a -> bc_b, i.e., bc_a /\ ~bc_b is not satisfiable
+    if not bc_b:
+        return True
+    return not dut.check_sat(~_conjoin(bc_b), bc_a)
+
+def _disjoin(branch_conds):
+    # keep the common prefix, disjoin the rest
+    prefix = []
+    for conds in zip(*branch_conds):
+        if not all(_same_value(conds[0], c) for c in conds[1:]):
+            break
+        prefix.append(conds[0])
+    rests = [bc[len(prefix):] for bc in branch_conds]
+    if any(len(r) == 0 for r in rests):
+        return prefix
+    ret = _conjoin(rests[0])
+    for r in rests[1:]:
+        ret = ret | _conjoin(r)
+    return prefix + [ret]
+
+def _calls_wait_cond(node):
+    for n in ast.walk(node):
+        if isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute) and \
+                isinstance(n.func.value, ast.Name) and n.func.value.id == 'sim' and n.func.attr == 'wait_cond':
+            return True
+    return False
+
+
+class _task_compiler(object):
+    def __init__(self, filename):
+        self.filename = filename
+        self.instrs = []
+        self.loops = [] # (continue target, list of break instructions to patch)
+        self.tmp_cnt = 0
+
+    def _stmt_code(self, stmt):
+        return compile(ast.Module(body=[stmt], type_ignores=[]), self.filename, "exec")
+
+    def _expr_code(self, expr):
+        return compile(ast.fix_missing_locations(ast.Expression(body=expr)), self.filename, "eval")
+
+    def _emit(self, kind, code = None, target = None, wait_cond = False):
+        self.instrs.append(_instr(kind, code, target, wait_cond))
+        return self.instrs[-1]
+
+    def _tmp_name(self, prefix):
+        self.tmp_cnt += 1
+        return f'__{prefix}{self.tmp_cnt}'
+
+    def _loop(self, cont_target, body, orelse):
+        breaks = []
+        self.loops.append((cont_target, breaks))
+        self.compile_body(body)
+        self.loops.pop()
+        self._emit(_instr.JUMP, target = cont_target)
+        return breaks
+
+    def compile_body(self, stmts):
+        for stmt in stmts:
+            if isinstance(stmt, ast.If):
+                test = self._emit(_instr.JUMP_IF_NOT, self._expr_code(stmt.test), wait_cond = _calls_wait_cond(stmt.test))
+                self.compile_body(stmt.body)
+                if stmt.orelse:
+                    skip_else = self._emit(_instr.JUMP)
+                    test.target = len(self.instrs)
+                    self.compile_body(stmt.orelse)
+                    skip_else.target = len(self.instrs)
+                else:
+                    test.target = len(self.instrs)
+            elif isinstance(stmt, ast.While):
+                start = len(self.instrs)
+                test = self._emit(_instr.JUMP_IF_NOT, self._expr_code(stmt.test), wait_cond = _calls_wait_cond(stmt.test))
+                breaks = self._loop(start, stmt.body, stmt.orelse)
+                test.target = len(self.instrs)
+                self.compile_body(stmt.orelse)
+                for b in breaks:
+                    b.target = len(self.instrs)
+            elif isinstance(stmt, ast.For):
+                # iterate over a list with an index kept in the locals,
+                # a live iterator could not be shared by cloned states
+                seq, idx = self._tmp_name('seq'), self._tmp_name('idx')
+                init = ast.parse(f'{seq} = list(__it)\n{idx} = 0').body
+                init[0].value.args[0] = stmt.iter
+                for n in init:
+                    ast.copy_location(n, stmt)
+                    ast.fix_missing_locations(n)
+                    self._emit(_instr.EXEC, self._stmt_code(n), wait_cond = _calls_wait_cond(n))
+                start = len(self.instrs)
+                test = self._emit(_instr.JUMP_IF_NOT, self._expr_code(
+                    ast.copy_location(ast.parse(f'{idx} < len({seq})', mode='eval').body, stmt)))
+                fetch = ast.Assign(targets=[stmt.target], value=ast.parse(f'{seq}[{idx}]', mode='eval').body)
+                advance = ast.parse(f'{idx} += 1').body[0]
+                for n in (fetch, advance):
+                    ast.copy_location(n, stmt)
+                    ast.fix_missing_locations(n)
+                    self._emit(_instr.EXEC, self._stmt_code(n))
+                # the index is already advanced, so continue jumps back to the test
+                breaks = self._loop(start, stmt.body, stmt.orelse)
+                test.target = len(self.instrs)
+                self.compile_body(stmt.orelse)
+                for b in breaks:
+                    b.target = len(self.instrs)
+            elif isinstance(stmt, ast.Break):
+                if not self.loops:
+                    raise SyntaxError("'break' outside loop")
+                self.loops[-1][1].append(self._emit(_instr.JUMP))
+            elif isinstance(stmt, ast.Continue):
+                if not self.loops:
+                    raise SyntaxError("'continue' not properly in loop")
+                self._emit(_instr.JUMP, target = self.loops[-1][0])
+            elif isinstance(stmt, ast.Return):
+                code = self._expr_code(stmt.value) if stmt.value is not None else None
+                self._emit(_instr.RETURN, code, wait_cond = stmt.value is not None and _calls_wait_cond(stmt.value))
+            else:
+                # other compound statements (with/try/...) run as a whole
+                self._emit(_instr.EXEC, self._stmt_code(stmt), wait_cond = _calls_wait_cond(stmt))
+        return self.instrs
+
+
 # create pointers
 class pywasim_coroutine(object):
-    def __init__(self, lines):
+    def __init__(self, lines, filename = "<ast>", firstlineno = 1):
         self.lines = lines.split(sep = '\n')
-        self.astnodes = ast.parse(lines)
+        self.astnodes = ast.parse(textwrap.dedent(lines))
+        # the source starts at firstlineno of filename, so tracebacks point there
+        ast.increment_lineno(self.astnodes, firstlineno - 1)
         assert (len(self.astnodes.body) == 1)
         self.funbody = self.astnodes.body[0].body
-        # print (self.funbody[3])
-        
-    def invoke(self, *args, **kwargs):
-        _all_states.append(pywasim_local_state( coroutine = self, args = args, kwargs = kwargs))
-        return _all_states[-1]  # you can use sim.wait_task() on this
+        # compiled once, every step only executes an instruction
+        self.instrs = _task_compiler(filename).compile_body(self.funbody)
+
+    def invoke(self, sim, *args, **kwargs):
+        st = pywasim_local_state( coroutine = self, args = args, kwargs = kwargs)
+        return sim.scheduler.add(st)  # you can use sim.wait_task() on this
+
+def _find_simulator(args, kwargs):
+    for a in list(args) + list(kwargs.values()):
+        if isinstance(a, async_simulator):
+            return a
+    raise RuntimeError("A task must be given the async_simulator it runs on")
 
 def register_task(func):
-    code = inspect.getsource(func)
-    _all_coroutine.append(pywasim_coroutine(lines = code))
-    l = len(_all_coroutine)
+    source, firstlineno = inspect.getsourcelines(func)
+    coroutine = pywasim_coroutine(lines = ''.join(source), filename = inspect.getsourcefile(func) or "<ast>",
+                                  firstlineno = firstlineno)
     def wrapper(*args, **kwargs):
-        _all_coroutine[l-1].invoke(*args, **kwargs)
+        # the task is registered to the simulator passed in its arguments
+        return coroutine.invoke(_find_simulator(args, kwargs), *args, **kwargs)
     return wrapper # this is used to register the args
     
 def start_loop(sim, dut, bound = -1):
-    if len(_all_states) == 0:
+    if len(sim.scheduler.states) == 0:
         return
 
     if sim.dut is not dut:
@@ -454,78 +927,122 @@ def start_loop(sim, dut, bound = -1):
 
 
 def async_one_step(sim, dut):
-    if len(_all_states) == 0:
+    sched = sim.scheduler
+    if len(sched.states) == 0:
         return
-        
-    any_runnable = True
-    all_finished = True
-
-    while any_runnable:
-        any_runnable = False
-        for idx,st in enumerate(_all_states):  # list of pywasim_local_state
-            print(f'<coroutine #{idx}>')
-            if st.finished:
-                continue
-            #else
-            all_finished = False
-
-            if st.pc < 0:
-                # parse its args, set the local variables
-                st.parse_arg()
-            if st.await_cond is not None and st.await_cond.execthread is not None:
-              # if the task it waits has finished
-              # we can remove its blocker so that it can continue
-              if st.await_cond.execthread.finished:
-                st.await_cond = None
-                
-            # execute the corountine until we need to wait
-            while st.await_cond is None and not st.finished:
-                st.step()
-                any_runnable = True
-
-    if all_finished:
-        print('<finished>')
+
+    if sim.merge_branches and len(sched.ready) > 1:
+        states = list(sched.ready)
+        sched.ready.clear() # the waiters released by a drop are appended
+        sched.ready.extendleft(reversed(sched.merge(states, dut)))
+
+    # execute the ready coroutines until they need to wait
+    while sched.ready:
+        st = sched.ready.popleft()
+        log.debug('<coroutine #%d>', st.idx)
+        if st.pc < 0:
+            # parse its args, set the local variables
+            st.parse_arg()
+        while st.await_cond is None and not st.finished:
+            st.step()
+        if st.finished:
+            sched.finish(st)
+        else:
+            sched.block(st)
+
+    if sched.alive == 0:
+        log.debug('<finished>')
         sim.finish()
         return
 
     # TODO: branch before step
-    print('<dut.step>')
+    log.debug('<dut.step>')
     dut.step()
-    # next go through _all_states and decrease cycle or check condition
-    for idx,st in enumerate(_all_states):
-        print(f'<coroutine #{idx} post>')
-        # assert (st.await_cond) # is not None
-        # as we append passthrough to _all_states, its await_condition may be None 
-        if st.await_cond is None:
-            continue # just skip them
-        print (st.await_cond)
-        if st.await_cond.cycle:
-            st.await_cond.cycle -= 1
-            if st.await_cond.cycle <= 0:
-                st.await_cond = None # remove its blocker so it can continue
+    sched.tick()
+
+    # check the conditions that the pending coroutines wait for
+    pending = sched.pending
+    sched.pending = []
+    for st in pending:
+        log.debug('<coroutine #%d post>', st.idx)
+        # check if this condition can be true
+        # check if this condition can be false
+        cond_curr = dut.simulator.interpret_input_and_state_expr_on_curr_frame(st.await_cond.cond, dut.iv_term_dict)
+        branch = dut.classify(cond_curr, st.branch_cond)
+        log.debug('branch: %s', branch)
+        if branch == BranchClass.ALWAYS_TRUE:
+            st.await_cond = None
+            st.branch_cond.append(cond_curr)
+            sched.ready.append(st)
+        elif branch == BranchClass.ALWAYS_FALSE:
+            st.branch_cond.append(~cond_curr)  # record this as false
+            sched.pending.append(st)
+        elif branch == BranchClass.INFEASIBLE:
+            # no execution reaches this state, it would wait forever
+            log.debug('<coroutine #%d infeasible>', st.idx)
+            sched.drop(st)
+        else:
+            assert(branch == BranchClass.BOTH)
+            take = sim.decide()
+            if take is not None:
+                log.debug('take: %s', take)
+                if take:
+                    st.await_cond = None
+                    st.branch_cond.append(cond_curr)
+                    sched.ready.append(st)
+                else:
+                    st.branch_cond.append(~cond_curr)
+                    sched.pending.append(st)
                 continue
-        elif st.await_cond.cond is not None:
-            # check if this condition can be true
-            # check if this condition can be false
-            cond_curr = dut.simulator.interpret_input_and_state_expr_on_curr_frame(st.await_cond.cond, dut.iv_term_dict)
-            maybe_true = dut.check_sat(cond_curr, st.branch_cond )
-            maybe_false = dut.check_sat(~cond_curr, st.branch_cond )
-            print('branch:',maybe_true, maybe_false)
-            if maybe_true and not maybe_false:
-                st.await_cond = None
-                st.branch_cond.append(cond_curr)
-            elif maybe_false and not maybe_true:
-                st.branch_cond.append(~cond_curr)  # record this as false
-            else:
-                assert(maybe_true and maybe_false)
-                passthrough = st.clone()
-                passthrough.branch_cond.append(cond_curr)
-                st.branch_cond.append(~cond_curr)
-                _all_states.append(passthrough)
-                
-            
-    
-    
+            passthrough = st.clone()
+            passthrough.branch_cond.append(cond_curr)
+            st.branch_cond.append(~cond_curr)
+            sched.pending.append(st)
+            sched.add(passthrough)
 
-    
-    
+    if sim.merge_branches and len(sched.pending) > 1:
+        sched.pending = sched.merge(sched.pending, dut)
+
+
+def _explore_branch(path, setup, args, bound, split_depth):
+    # runs in a worker process, on its own Dut and solver.
+    # A branch is replayed from reset along its path, so exploring all the
+    # branches down to depth d costs O(d^2) simulated forks in total
+    start = time.time()
+    sim, dut = setup(*args)
+    sim.path = tuple(path)
+    sim.split_depth = split_depth
+    res = {'path' : tuple(path), 'passed' : True, 'error' : None}
+    try:
+        start_loop(sim, dut, bound)
+    except Exception as e:
+        # reported for this branch, the other branches keep going
+        res['passed'] = False
+        res['error'] = '%s: %s' % (type(e).__name__, e)
+    sched = sim.scheduler
+    res['spawned'] = sim.spawned
+    res['decisions'] = tuple(sim.taken)
+    res['cycles'] = dut.step_cycle()
+    res['states'] = len(sched.states)
+    res['finished'] = sum(1 for st in sched.states if st.finished and not st.dropped)
+    res['dropped'] = sum(1 for st in sched.states if st.dropped)
+    res['time'] = time.time() - start
+    return res
+
+def explore_parallel(setup, args = (), bound = -1, processes = None, split_depth = 8):
+    # explore the wait_cond forks in a pool of worker processes.
+    # setup(*args) must be a module-level function that creates and initializes a Dut,
+    # starts the tasks on an async_simulator and returns (sim, dut). A branch is sent
+    # to a worker as the list of decisions made at the forks, the worker replays them
+    # on a fresh Dut, keeps one side of the first split_depth forks and hands the
+    # other sides back as new branches. Returns one result dict per branch
+    results = []
+    with multiprocessing.Pool(processes) as pool:
+        outstanding = collections.deque()
+        outstanding.append(pool.apply_async(_explore_branch, ((), setup, args, bound, split_depth)))
+        while outstanding:
+            res = outstanding.popleft().get()
+            results.append(res)
+            for path in res['spawned']:
+                outstanding.append(pool.apply_async(_explore_branch, (path, setup, args, bound, split_depth)))
+    return results
@@ -0,0 +1,187 @@
+import os
+import traceback
+
+import pywasim_async as pywasim
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder_sim(**kwargs):
+    # rega <= a; out <= rega + b
+    dut = pywasim.Dut(os.path.join(design_dir, 'adder.btor2'))
+    sim = pywasim.async_simulator(dut, **kwargs)
+    dut.set_init()
+    return sim, dut
+
+@pywasim.register_task
+def wait_out(sim, dut, v):
+    sim.wait_cond(dut.out.value == v)
+    return v
+
+def test_infeasible_wait_cond():
+    # under constraints that cannot hold, the waiting task is dropped
+    # instead of waiting forever
+    sim, dut = adder_sim()
+    x = sim.set_var('x', 4)
+    dut.set_constraint(x == 1)
+    dut.set_constraint(x == 2)
+    task = wait_out(sim, dut, 3)
+    pywasim.start_loop(sim, dut)
+    assert sim.finished
+    assert task.dropped and task.retval is None
+
+@pywasim.register_task
+def delay(sim, dut, n):
+    sim.wait_cycle(n)
+    return n
+
+@pywasim.register_task
+def join(sim, dut, task):
+    sim.wait_task(task)
+    return task.retval + 1
+
+def test_timers_and_waiters():
+    sim, dut = adder_sim()
+    t1 = delay(sim, dut, 3)
+    t2 = join(sim, dut, t1)
+    start = dut.step_cycle()
+    pywasim.async_one_step(sim, dut)
+    # both are blocked, nothing is left in the ready queue
+    sched = sim.scheduler
+    assert not sched.ready and not sched.pending
+    assert list(sched.timers.keys()) == [3] and sched.timers[3] == [t1]
+    assert sched.waiters[id(t1)] == [t2]
+    pywasim.start_loop(sim, dut)
+    assert t1.retval == 3 and t2.retval == 4
+    assert dut.step_cycle() - start == 3
+
+def test_simulators_apart():
+    # every simulator keeps its own tasks
+    sim1, dut1 = adder_sim()
+    sim2, dut2 = adder_sim()
+    t1 = delay(sim1, dut1, 2)
+    t2 = delay(sim2, dut2, 5)
+    assert sim1.scheduler.states == [t1] and sim2.scheduler.states == [t2]
+    pywasim.start_loop(sim1, dut1)
+    assert sim1.finished and t1.finished
+    assert not sim2.finished and not t2.finished and t2.pc < 0
+    pywasim.start_loop(sim2, dut2)
+    assert t2.retval == 5
+
+def test_merged_task_waiters():
+    # a task merged into another one finishes with it, its waiters follow
+    sim, dut = adder_sim()
+    t1 = delay(sim, dut, 2)
+    t2 = delay(sim, dut, 2)
+    w = join(sim, dut, t1)
+    sched = sim.scheduler
+    sched.ready.remove(t1)
+    sched.drop(t1, t2)
+    assert t1.resolve() is t2 and not t1.finished
+    pywasim.start_loop(sim, dut)
+    assert t1.finished and t1.dropped and t1.retval == 2
+    assert w.finished and w.retval == 3
+
+def test_dropped_task_waiters():
+    # the waiters of a task no execution reaches stay blocked
+    sim, dut = adder_sim()
+    t1 = delay(sim, dut, 2)
+    w = join(sim, dut, t1)
+    sched = sim.scheduler
+    sched.ready.remove(t1)
+    sched.drop(t1)
+    pywasim.start_loop(sim, dut)
+    assert sim.finished
+    assert not w.finished and w.retval is None
+    assert sched.stalled == [w]
+
+@pywasim.register_task
+def wait_twice(sim, dut):
+    n = 0
+    while n < 2:
+        sim.wait_cond(dut.out.value == 3)
+        n += 1
+    return n
+
+def test_merge_branches():
+    # merging is opt-in, it keeps fewer states around
+    counts = []
+    for merge in (False, True):
+        sim, dut = adder_sim(merge_branches = merge)
+        assert sim.merge_branches == merge
+        wait_twice(sim, dut)
+        pywasim.start_loop(sim, dut, 6)
+        sched = sim.scheduler
+        counts.append(len(sched.states) - sum(1 for st in sched.states if st.dropped))
+    assert counts[1] < counts[0]
+
+@pywasim.register_task
+def raise_on_true(sim, dut):
+    sim.wait_cond(dut.out.value == 3)
+    raise ValueError('taken')
+
+def setup_raise():
+    sim, dut = adder_sim()
+    raise_on_true(sim, dut)
+    return sim, dut
+
+def test_explore_parallel_errors():
+    # any error is reported for the branch that raised it
+    results = pywasim.explore_parallel(setup_raise, bound = 3, processes = 2, split_depth = 2)
+    failed = [r for r in results if not r['passed']]
+    assert failed and all(r['error'] == 'ValueError: taken' for r in failed)
+    assert all(r['decisions'][-1] for r in failed)
+    assert any(r['passed'] for r in results)
+
+@pywasim.register_task
+def count(sim, dut, n):
+    total = 0
+    for i in range(n):
+        if i == 2:
+            continue
+        if i == 4:
+            break
+        total += i
+    while total < 10:
+        sim.wait_cycle()
+        total += 1
+    return total
+
+def test_compiled_task():
+    sim, dut = adder_sim()
+    task = count(sim, dut, 8)
+    start = dut.step_cycle()
+    pywasim.start_loop(sim, dut)
+    # 0 + 1 + 3, then one cycle per increment
+    assert task.finished and task.retval == 10
+    assert dut.step_cycle() - start == 6
+
+@pywasim.register_task
+def fails(sim, dut):
+    sim.wait_cycle()
+    raise ValueError('raised in a task')
+
+def test_task_traceback_lines():
+    sim, dut = adder_sim()
+    fails(sim, dut)
+    try:
+        pywasim.start_loop(sim, dut)
+    except ValueError as e:
+        frame = traceback.extract_tb(e.__traceback__)[-1]
+    else:
+        assert False, 'the task should raise'
+    with open(__file__) as f:
+        expected = next(i for i, l in enumerate(f, 1) if "raise ValueError('raised in a task')" in l)
+    assert os.path.realpath(frame.filename) == os.path.realpath(__file__)
+    assert frame.lineno == expected
+
+
+if __name__ == "__main__":
+    test_infeasible_wait_cond()
+    test_timers_and_waiters()
+    test_simulators_apart()
+    test_merged_task_waiters()
+    test_dropped_task_waiters()
+    test_merge_branches()
+    test_explore_parallel_errors()
+    test_compiled_task()
+    test_task_traceback_lines()
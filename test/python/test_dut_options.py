@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import os
+import tempfile
+
+import pywasim
+from pywasim import Dut
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder():
+    # rega <= a; out <= rega + b
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    return dut
+
+def test_stats():
+    dut = adder()
+    dut.step()
+    st = dut.stats()
+    assert not st['enabled'] and st['phases'] == {}
+    assert st['solver']['sat'] + st['solver']['unsat'] == 0
+
+    with tempfile.TemporaryDirectory() as d:
+        fname = os.path.join(d, 'stats.json')
+        dut.set_stats(True, fname)
+        dut.step()
+        dut.step()
+        assert dut.check_assertion(dut.out.value == dut.out.value)
+        st = dut.stats()
+        assert st['enabled']
+        assert st['phases']['sim_one_step']['calls'] == 2
+        assert st['solver']['sat'] + st['solver']['unsat'] >= 1
+        assert set(st['dag_size'].keys()) == {'rego', 'rega'}
+        dut.set_stats(False)
+        with open(fname) as f:
+            lines = [json.loads(l) for l in f]
+        # one line per step
+        assert len(lines) == 2
+        assert lines[1]['phases']['sim_one_step']['calls'] == 2
+
+class _no_format(object):
+    # fails if a log message tries to format it
+    def abbrev(self, depth, length):
+        raise AssertionError('formatted')
+    def to_string(self):
+        raise AssertionError('formatted')
+
+def test_lazy_log():
+    # nothing is formatted unless the level is enabled
+    pywasim.log.debug('term: %s', pywasim._term_str(_no_format()))
+
+    dut = adder()
+    x = dut.simulator.set_var(5, 'x')
+    t = x
+    for _ in range(300):
+        t = t + x
+    out = io.StringIO()
+    pywasim.set_log_level(logging.DEBUG)
+    handler = next(h for h in pywasim.log.handlers if getattr(h, 'pywasim_handler', False))
+    handler.setStream(out)
+    try:
+        dut.check_assertion(t == 0)
+    finally:
+        pywasim.log.setLevel(logging.WARNING)
+    line = next(l for l in out.getvalue().splitlines() if l.startswith('dut.check_assertion'))
+    # the term is abbreviated
+    assert len(line) <= len('dut.check_assertion: ') + pywasim.abbrev_length + 3
+    assert '...' in line
+
+def test_simplify():
+    dut = adder()
+    dut.a.value = 'a0'
+    a0 = dut.simulator.get_var('a0')
+    dut.step(asmpt = [a0 == 5])
+    assert not dut.rega.value.is_value()
+    # rega can only be 5 under the assumption
+    assert dut.simplify() >= 1
+    assert dut.rega.value.is_value() and dut.rega.value.to_int() == 5
+
+def test_abstraction_steps():
+    # rego is over budget in every frame, rega never is (a symbol)
+    dut = adder()
+    dut.set_abstraction(dag_limit = 2)
+    for i in range(3):
+        dut.a.value = 'a%d' % i
+        dut.step()
+    recs = dut.abstractions()
+    assert [a['var'] for a in recs] == ['rego'] * 3
+    assert [a['frame'] for a in recs] == sorted(set(a['frame'] for a in recs))
+    # the state within budget is kept as it is
+    assert dut.check_assertion(dut.rega.value == dut.simulator.get_var('a2'))
+    assert dut.rego.value.to_string() == recs[-1]['xvar'].to_string()
+
+
+if __name__ == "__main__":
+    test_stats()
+    test_lazy_log()
+    test_simplify()
+    test_abstraction_steps()
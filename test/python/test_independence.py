@@ -0,0 +1,28 @@
+import os
+
+from pywasim import Dut, IndependenceChecker, ite
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def test_batch():
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    x = dut.simulator.set_var(4, 'x')
+    y = dut.simulator.set_var(4, 'y')
+    e1 = ite(y == 1, x, y)  # does not depend on x when y == 0
+    e2 = x + y
+    e3 = y + 1
+
+    checker = IndependenceChecker([y == 0])
+    assert checker.check([(e1, x), (e2, x), (e3, x), (e1, x)], 2) == [True, False, True, True]
+    # the repeated pair is solved once
+    assert checker.num_queries() == 4 and checker.num_hits() == 1
+    # later queries are answered from the memo
+    assert not checker.is_independent(e2, x)
+    assert checker.num_queries() == 5 and checker.num_hits() == 2
+
+    # without the assumption, e1 depends on x
+    assert IndependenceChecker([]).check([(e1, x), (e3, x)], 1) == [False, True]
+
+
+if __name__ == "__main__":
+    test_batch()
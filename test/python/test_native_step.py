@@ -0,0 +1,50 @@
+import os
+
+from pywasim import Dut, zero_extend
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder():
+    # rega <= a; out <= rega + b, so out@2 == a@0 + b@1
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    return dut
+
+def test_new_input_map():
+    dut = adder()
+    # every inputvar gets a fresh variable, the defaults override them
+    iv = dut.simulator.new_input_map({})
+    assert len(iv) == len(dut.inputvars_list)
+    iv2 = dut.simulator.new_input_map({})
+    a = dut.simulator.var('a')
+    assert iv[a].to_string() != iv2[a].to_string()
+
+    dut.b.value_def = 3
+    dut.step()
+    assert dut.b.value.is_value() and dut.b.value.to_int() == 3
+    assert not dut.a.value.is_value()
+
+def test_run_schedule():
+    dut = adder()
+    ret = dut.run(2, [{'a' : 'a0'}, {'b' : 'b1'}], observe = ['out'])
+    a0 = dut.simulator.get_var('a0')
+    b1 = dut.simulator.get_var('b1')
+    assert dut.check_assertion(ret['out'] == zero_extend(a0, 1) + zero_extend(b1, 1))
+
+def test_run_schedule_callable():
+    dut = adder()
+    seen = []
+    def schedule(i, d):
+        # called right before cycle i, on the state it starts from
+        seen.append((i, d.step_cycle()))
+        return {'a' : 1, 'b' : 2}
+    ret = dut.run(3, schedule, observe = ['out'])
+    start = seen[0][1]
+    assert seen == [(0, start), (1, start + 1), (2, start + 2)]
+    assert ret['out'].is_value() and ret['out'].to_int() == 3
+
+
+if __name__ == "__main__":
+    test_new_input_map()
+    test_run_schedule()
+    test_run_schedule_callable()
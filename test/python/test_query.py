@@ -0,0 +1,136 @@
+import os
+
+from pywasim import Dut, BranchClass, zero_extend
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder_two_cycles(incremental = False):
+    # rega <= a; out <= rega + b, after two cycles out == a0 + b1
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_incremental(incremental)
+    dut.set_init()
+    dut.a.value = 'a0'
+    dut.step()
+    dut.b.value = 'b1'
+    dut.step()
+    a0 = dut.simulator.get_var('a0')
+    b1 = dut.simulator.get_var('b1')
+    return dut, a0, b1
+
+def test_incremental():
+    # the same answers with and without one solver scope per frame
+    for incremental in (False, True):
+        dut, a0, b1 = adder_two_cycles(incremental)
+        assert dut.simulator.is_incremental() == incremental
+        out = dut.out.value
+        assert dut.check_assertion(out == zero_extend(a0, 1) + zero_extend(b1, 1))
+        assert not dut.check_assertion(out == zero_extend(a0, 1))
+
+        dut.set_constraint(a0 == 0)
+        assert dut.check_sat(out == zero_extend(b1, 1), [])
+        assert not dut.check_sat(out != zero_extend(b1, 1), [])
+        dut.clear_constraint()
+        assert dut.check_sat(out != zero_extend(b1, 1), [])
+
+        # backtracking drops the scope of the last frame
+        dut.back_step()
+        assert dut.check_sat(a0 == 1, [])
+
+def assertion_verdicts(incremental):
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_incremental(incremental)
+    dut.set_init()
+    dut.a.value = 'a0'
+    a0 = dut.simulator.get_var('a0')
+    dut.step(1, [a0 == 3])
+    rega = dut.simulator.var('rega')
+    ret = []
+    # holds only under the assumption of the step
+    ret.append(dut.check_assertion(dut.rega.value == 3))
+    dut.prop = rega == 3
+    ret.append(dut.check_prop())
+    ret.append(dut.check_sat(dut.rega.value != 3, []))
+    # the constraint conflicts with the assumption
+    dut.set_constraint(a0 == 4)
+    dut.prop = rega == 4
+    ret.append(dut.check_prop())
+    ret.append(dut.check_assertion(dut.rega.value == 4))
+    ret.append(dut.check_sat(dut.rega.value == 3, []))
+    return ret
+
+def test_assertion_verdicts():
+    # check_assertion ignores the assumptions and constraints, check_prop the constraints,
+    # in both modes
+    assert assertion_verdicts(False) == [False, True, False, False, False, False]
+    assert assertion_verdicts(True) == assertion_verdicts(False)
+
+def test_query_cache():
+    dut, a0, b1 = adder_two_cycles()
+    dut.set_query_cache(16)
+    g1 = a0 == 1
+    g2 = b1 == 2
+    assert dut.simulator.check_sat_query([g1, g2], [], True)
+    stats = dut.query_cache_stats()
+    assert stats['misses'] == 1 and stats['hits'] == 0 and stats['size'] == 1
+
+    # the same set of goals, in another order and with a duplicate
+    assert dut.simulator.check_sat_query([g2, g1, g2], [], True)
+    stats = dut.query_cache_stats()
+    assert stats['hits'] == 1 and stats['size'] == 1
+
+    assert not dut.simulator.check_sat_query([g1, a0 == 2], [], True)
+    assert dut.query_cache_stats()['size'] == 2
+
+    dut.set_query_cache(0)
+    assert dut.simulator.check_sat_query([g1, g2], [], True)
+    assert dut.query_cache_stats()['hits'] == 1
+
+def test_classify():
+    dut, a0, b1 = adder_two_cycles()
+    cond = a0 == 1
+    assert dut.classify(cond, []) == BranchClass.BOTH
+    assert dut.classify(cond, [a0 == 1]) == BranchClass.ALWAYS_TRUE
+    assert dut.classify(cond, [a0 == 2]) == BranchClass.ALWAYS_FALSE
+    assert dut.classify(cond, [a0 == 2, a0 == 3]) == BranchClass.INFEASIBLE
+    # the same answers from the query cache
+    dut.set_query_cache(16)
+    for _ in range(2):
+        assert dut.classify(cond, [a0 == 2]) == BranchClass.ALWAYS_FALSE
+        assert dut.classify(cond, [a0 == 2, a0 == 3]) == BranchClass.INFEASIBLE
+    # a cache of one entry evicts the result of one check while the other is made
+    dut.set_query_cache(1)
+    for _ in range(3):
+        assert dut.classify(cond, [a0 == 2]) == BranchClass.ALWAYS_FALSE
+        assert dut.classify(cond, []) == BranchClass.BOTH
+
+def test_fork_incremental():
+    dut, a0, b1 = adder_two_cycles(incremental = True)
+    out = dut.out.value
+    dut.set_constraint(a0 == 0)
+    assert not dut.check_sat(out != zero_extend(b1, 1), [])
+    child = dut.fork()
+    # they share the solver, neither keeps its scopes
+    assert not dut.simulator.is_incremental() and not child.simulator.is_incremental()
+    try:
+        dut.set_incremental(True)
+    except RuntimeError:
+        pass
+    else:
+        assert False, 'incremental mode needs its own solver'
+
+    # the constraints of one do not leak into the queries of the other
+    dut.step()
+    child.clear_constraint()
+    assert child.check_sat(out != zero_extend(b1, 1), [])
+    assert not dut.check_sat(out != zero_extend(b1, 1), [])
+    child.b.value = 'b2'
+    child.step()
+    assert child.check_sat(a0 == 1, [])
+
+
+if __name__ == "__main__":
+    test_incremental()
+    test_assertion_verdicts()
+    test_query_cache()
+    test_classify()
+    test_fork_incremental()
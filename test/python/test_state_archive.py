@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+from pywasim import Dut, StateArchiveWriter, StateArchiveReader, same_expr
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder_states(n):
+    # the states of n cycles of the adder
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    states = [dut.simulator.get_curr_state([])]
+    for i in range(n):
+        dut.a.value = 'a%d' % i
+        dut.step()
+        states.append(dut.simulator.get_curr_state([]))
+    return dut, states
+
+def same_state(s1, s2):
+    sv1 = {k.to_string() : v for k, v in s1.get_sv().items()}
+    sv2 = {k.to_string() : v for k, v in s2.get_sv().items()}
+    return sv1.keys() == sv2.keys() and all(same_expr(v, sv2[k]) for k, v in sv1.items())
+
+def test_archive():
+    dut, states = adder_states(3)
+    with tempfile.TemporaryDirectory() as d:
+        fname = os.path.join(d, 'states.archive')
+        w = StateArchiveWriter(fname, dut.simulator, False)
+        for j, s in enumerate(states):
+            w.write(0, j, s)
+        w.close()
+        w.close()  # closing again does nothing
+
+        r = StateArchiveReader(fname, dut.simulator)
+        assert not r.recovered()
+        assert r.keys() == [(0, j) for j in range(len(states))]
+        assert not r.has(1, 0)
+        for j, s in enumerate(states):
+            assert same_state(r.read(0, j), s)
+
+        # append a branch, without the index it is recovered by the reader
+        w = StateArchiveWriter(fname, dut.simulator, True)
+        w.write(1, 0, states[-1])
+        w.flush()
+        r = StateArchiveReader(fname, dut.simulator)
+        assert r.recovered() and r.has(1, 0) and r.has(0, 0)
+        assert same_state(r.read(1, 0), states[-1])
+        w.close()
+        assert not StateArchiveReader(fname, dut.simulator).recovered()
+
+def test_archive_close_error():
+    # an archive that cannot be written reports it from close()
+    if not os.path.exists('/dev/full'):
+        return
+    dut, states = adder_states(1)
+    w = StateArchiveWriter('/dev/full', dut.simulator, False)
+    w.write(0, 0, states[-1])
+    try:
+        w.close()
+    except RuntimeError:
+        pass
+    else:
+        assert False, 'close should fail'
+    w.close()  # only tried once
+
+
+if __name__ == "__main__":
+    test_archive()
+    test_archive_close_error()
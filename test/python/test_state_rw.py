@@ -0,0 +1,88 @@
+import os
+import tempfile
+
+from pywasim import Dut, StateRW, StateTree, same_expr
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder_states(n):
+    # the states of n cycles of the adder, with an assumption on each input
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    states = []
+    for i in range(n):
+        dut.a.value = 'a%d' % i
+        dut.step()
+        a = dut.simulator.get_var('a%d' % i)
+        states.append(dut.simulator.get_curr_state([a != i]))
+    return dut, states
+
+def same_state(s1, s2):
+    sv1 = {k.to_string() : v for k, v in s1.get_sv().items()}
+    sv2 = {k.to_string() : v for k, v in s2.get_sv().items()}
+    return sv1.keys() == sv2.keys() and all(same_expr(v, sv2[k]) for k, v in sv1.items()) and \
+        len(s1.get_assumptions()) == len(s2.get_assumptions()) and \
+        all(same_expr(a, b) for a, b in zip(s1.get_assumptions(), s2.get_assumptions()))
+
+def test_state_read():
+    dut, states = adder_states(3)
+    rw = StateRW(dut.simulator)
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as d:
+        os.chdir(d)
+        try:
+            fname = os.path.join(d, 'state_asmpt_0_2')
+            assert rw.write(states[-1], fname)
+            s = rw.read(fname)
+            assert same_state(s, states[-1])
+            with open(fname) as f:
+                assert same_state(rw.read_string(f.read()), s)
+            # parsed in memory, nothing else is written
+            assert os.listdir(d) == ['state_asmpt_0_2']
+        finally:
+            os.chdir(cwd)
+
+    try:
+        rw.read_string('1 0\n(assert true)\n')
+    except RuntimeError:
+        pass
+    else:
+        assert False, 'not a state file'
+
+def test_state_tree():
+    dut, states = adder_states(3)
+    rw = StateRW(dut.simulator)
+    with tempfile.TemporaryDirectory() as d:
+        rw.write_tree([states, states[:1]], d + '/')
+        tree = rw.read_tree(d + '/', 2, 3)
+        assert [len(b) for b in tree] == [3, 1]
+        assert all(same_state(s, states[j]) for j, s in enumerate(tree[0]))
+        assert same_state(tree[1][0], states[0])
+
+def test_state_tree_prefetch():
+    dut, states = adder_states(4)
+    rw = StateRW(dut.simulator)
+    with tempfile.TemporaryDirectory() as d:
+        rw.write_tree([states, states[1:]], d + '/')
+        tree = StateTree(os.path.join(d, 'states.archive'), dut.simulator, 0)
+        keys = tree.keys()
+        assert len(keys) == 7
+        # parsed by the workers in their own solvers, translated by get
+        tree.prefetch(keys, 2)
+        tree.wait()
+        assert tree.size() == 0
+        for i, j in keys:
+            expected = states[j] if i == 0 else states[j + 1]
+            assert same_state(tree.get(i, j), expected)
+        assert tree.size() == 7
+        # the least recently used ones are dropped, and read again on demand
+        tree.set_capacity(2)
+        assert tree.size() == 2
+        assert same_state(tree.get(0, 0), states[0])
+        assert tree.size() == 2
+
+
+if __name__ == "__main__":
+    test_state_read()
+    test_state_tree()
+    test_state_tree_prefetch()
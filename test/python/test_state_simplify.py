@@ -0,0 +1,30 @@
+import os
+
+from pywasim import Dut, expr_simplify_ite, expr_contains_X, ite, same_expr
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def shared_dag(t, depth):
+    # depth nodes, but 2 ** depth paths
+    for _ in range(depth):
+        t = t + t
+    return t
+
+def test_simplify_ite_dag():
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    x = dut.simulator.set_var(4, 'x')
+    y = dut.simulator.set_var(4, 'y')
+    t = shared_dag(ite(y == 3, x, y), 64)
+
+    res = expr_simplify_ite(t, [y == 3])
+    assert [v.to_string() for v in res.get_vars()] == ['x']
+    assert dut.check_assertion(res == shared_dag(x, 64))
+    # the condition may go both ways
+    assert same_expr(expr_simplify_ite(t, []), t)
+
+    assert expr_contains_X(t, [y])
+    assert not expr_contains_X(res, [y])
+
+
+if __name__ == "__main__":
+    test_simplify_ite_dag()
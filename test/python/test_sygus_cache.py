@@ -0,0 +1,93 @@
+import os
+import re
+import tempfile
+
+from pywasim import Dut, SygusCache, sygus_problem, sygus_set_cache, sygus_set_jobs, sygus_get_jobs, zero_extend, ite
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def test_cache_entries():
+    result = '(define-fun FunNew ((cv1 (_ BitVec 4)))\n  (_ BitVec 4)\n  (bvadd cv1 #b0001))\n'
+    with tempfile.TemporaryDirectory() as d:
+        cache = SygusCache(d, 0)
+        assert cache.lookup('p1', 1000) == ('miss', '')
+        # a result of several lines is kept as it is
+        cache.store_result('p1', result)
+        assert cache.lookup('p1', 1000) == ('solved', result)
+        # a timeout only answers for budgets up to the one it used
+        cache.store_timeout('p2\n(check-synth)\n', 100)
+        assert cache.lookup('p2\n(check-synth)\n', 50)[0] == 'timeout'
+        assert cache.lookup('p2\n(check-synth)\n', 200)[0] == 'miss'
+        st = cache.stats()
+        assert st['hits'] == 2 and st['timeout_hits'] == 1 and st['misses'] == 2 and st['stores'] == 2
+
+        # kept across runs
+        assert SygusCache(d, 0).lookup('p1', 1000) == ('solved', result)
+        cache.clear()
+        assert SygusCache(d, 0).lookup('p1', 1000)[0] == 'miss'
+
+def test_canonical_problem():
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    sim = dut.simulator
+    def problem(xname, aname, reverse):
+        x = sim.set_var(4, xname)
+        a = sim.set_var(4, aname)
+        asmpts = [x != 0, a == 3]
+        if reverse:
+            asmpts.reverse()
+        return sygus_problem(x + a, asmpts, [x])
+    p1 = problem('X1', 'p', False)
+    # the names of variables and the order of assumptions do not matter
+    assert p1 == problem('X7', 'q', True)
+    assert 'X1' not in p1 and 'cv0' in p1
+    assert p1 != sygus_problem(sim.get_var('X1') - sim.get_var('p'), [], [sim.get_var('X1')])
+
+def test_jobs():
+    sygus_set_jobs(3)
+    assert sygus_get_jobs() == 3
+    # 0 is the number of cores
+    sygus_set_jobs(0)
+    assert sygus_get_jobs() >= 1
+
+def synth_param(problem):
+    # the (canonical) name of the only argument of FunNew
+    return re.search(r'\(synth-fun FunNew\s*\(\s*\((cv\d+)', problem).group(1)
+
+def test_simplify_state():
+    # both state variables are answered from the cache, together
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    sim = dut.simulator
+    x = sim.set_var(4, 'X0')
+    a = sim.set_var(4, 'a0')
+    b = sim.set_var(4, 'b0')
+    rega = ite(x == 0, a, a + x)
+    rego = ite(x == 0, zero_extend(b, 1), zero_extend(x, 1))
+    state = sim.get_curr_state([x == 0])
+    state.set_sv({sim.var('rega') : rega, sim.var('rego') : rego})
+
+    with tempfile.TemporaryDirectory() as d:
+        cache = SygusCache(d, 0)
+        p = sygus_problem(rega, [x == 0], [x])
+        cache.store_result(p, '(define-fun FunNew ((%s (_ BitVec 4))) (_ BitVec 4) %s)' % ((synth_param(p),) * 2))
+        p = sygus_problem(rego, [x == 0], [x])
+        cache.store_result(p, '(define-fun FunNew ((%s (_ BitVec 4))) (_ BitVec 5) ((_ zero_extend 1) %s))' % ((synth_param(p),) * 2))
+        sygus_set_cache(d, 0)
+        sygus_set_jobs(2)
+        try:
+            state.sygus_simplify([x])
+        finally:
+            sygus_set_cache('', 0)
+            sygus_set_jobs(0)
+
+    sv = {k.to_string() : v for k, v in state.get_sv().items()}
+    assert [v.to_string() for v in sv['rega'].get_vars()] == ['a0']
+    assert [v.to_string() for v in sv['rego'].get_vars()] == ['b0']
+    assert dut.check_assertion(sv['rego'] == zero_extend(b, 1))
+
+
+if __name__ == "__main__":
+    test_cache_entries()
+    test_canonical_problem()
+    test_jobs()
+    test_simplify_state()
@@ -0,0 +1,29 @@
+import os
+
+from pywasim import Dut, TimedAssertionBatchChecker
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+assertions = ['out@2 == a@0 + b@1', 'rega@1 == a@0', 'out@2 == a@0']
+
+def check(num_threads):
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    checker = TimedAssertionBatchChecker(assertions, dut.ts, dut.simulator)
+    # simulated once, to the last cycle of all assertions
+    assert checker.get_max_cycle() == 2
+    checker.sim_max_step('', True, 'clk')
+    checker.make_assertion_terms()
+    return checker.check_all(num_threads)
+
+def test_batch():
+    for num_threads in (1, 2):
+        results = check(num_threads)
+        assert [r['assertion'] for r in results] == assertions
+        assert [r['holds'] for r in results] == [True, True, False]
+        assert results[2]['sat']
+        assert all(r['seconds'] >= 0 for r in results)
+
+
+if __name__ == "__main__":
+    test_batch()
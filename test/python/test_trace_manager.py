@@ -0,0 +1,40 @@
+import os
+
+from pywasim import Dut, TraceManager
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def test_abs_index():
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init()
+    sim = dut.simulator
+    rega = sim.var('rega')
+    rego = sim.var('rego')
+    bv4 = dut.solver.make_bvsort(4)
+    seen = []
+    def state(v):
+        s = sim.get_curr_state([])
+        s.set_sv({rega : v, rego : sim.set_var(5, 'o%d' % len(seen))})
+        seen.append(s)
+        return s
+
+    tm = TraceManager(dut.ts, sim)
+    tm.record_base_var([rega])
+    assert tm.record_state(state(dut.solver.make_constant(1, bv4)), [])
+    # a different constant is told apart without the solver
+    assert tm.record_state(state(dut.solver.make_constant(2, bv4)), [])
+    assert tm.num_abs_eq_calls() == 0 and tm.num_abs_eq_skipped() == 1
+    # only the state with the same constant is checked
+    assert not tm.record_state(state(dut.solver.make_constant(1, bv4)), [])
+    assert tm.num_abs_eq_calls() == 1 and tm.num_abs_eq_skipped() == 2
+    # a symbolic value may equal any of them
+    assert tm.record_state(state(sim.set_var(4, 'a0')), [])
+    assert tm.num_abs_eq_calls() == 3 and tm.num_abs_eq_skipped() == 2
+    # only the base variables are kept
+    abs_states = tm.get_abs_state()
+    assert len(abs_states) == 3
+    assert all(s.get_varnames() == ['rega'] for s in abs_states)
+
+
+if __name__ == "__main__":
+    test_abs_index()
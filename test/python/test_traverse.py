@@ -0,0 +1,105 @@
+import os
+import tempfile
+
+from pywasim import Dut, Traverse, StateArchiveWriter, StateArchiveReader
+
+design_dir = os.path.join(os.path.dirname(os.path.realpath(__file__)), '../../design/pywasim-test')
+
+def adder_traverse():
+    # rega <= a, branching on a reaches rega == 0 .. 15
+    dut = Dut(os.path.join(design_dir, 'adder.btor2'))
+    dut.set_init({'rega' : 0, 'rego' : 0})
+    rega = dut.simulator.var('rega')
+    return dut, Traverse(dut.ts, dut.simulator, [rega])
+
+def rega_values(states):
+    ret = []
+    for s in states:
+        v = {k.to_string() : v for k, v in s.get_sv().items()}['rega']
+        assert v.is_value()
+        ret.append(v.to_int())
+    return sorted(ret)
+
+def test_traverse_parallel():
+    dut, trav = adder_traverse()
+    assert trav.traverse_one_step([], [('a', 4, True)]) == 16
+    expected = rega_values(trav.get_abs_state())
+    assert expected == list(range(16))
+
+    # the same states, with the subtrees explored by several workers
+    dut, trav = adder_traverse()
+    assert trav.traverse_one_step_parallel([], [('a', 4, True)], 3) == 16
+    assert rega_values(trav.get_abs_state()) == expected
+
+def test_iter_states():
+    # the new states come out while the traversal runs, the first one is where it starts
+    dut, trav = adder_traverse()
+    states = list(trav.iter_states([], [('a', 4, True)], True, 2))
+    assert len(states) == 16
+    assert rega_values(states[:1]) == [0]
+    assert rega_values(states) == list(range(16))
+
+    # dropping the iterator stops the traversal, in the middle of a step
+    dut, trav = adder_traverse()
+    tracelen = dut.simulator.tracelen()
+    it = trav.iter_states([], [('a', 4, True)], True, 1)
+    next(it)
+    del it
+    assert len(trav.get_abs_state()) < 16
+    # the simulator is back where the traversal started
+    assert dut.simulator.tracelen() == tracelen
+    dut.a.value = 3
+    dut.step()
+    assert dut.rega.value.to_int() == 3
+
+def test_traverse_to_archive():
+    dut, trav = adder_traverse()
+    trav.traverse([], [('a', 2, True)])
+    branches = trav.get_all_branches()
+    assert branches
+
+    # the same branches, written as they are finished and not kept
+    dut, trav = adder_traverse()
+    with tempfile.TemporaryDirectory() as d:
+        fname = os.path.join(d, 'states.archive')
+        w = StateArchiveWriter(fname, dut.simulator, False)
+        assert trav.traverse_to_archive([], [('a', 2, True)], w, 0) == len(branches)
+        assert trav.get_all_branches() == []
+        # already on disk before the archive is closed
+        r = StateArchiveReader(fname, dut.simulator)
+        assert r.recovered()
+        for i, b in enumerate(branches):
+            assert [rega_values([r.read(i, j)]) for j in range(len(b))] == [rega_values([s]) for s in b]
+            assert not r.has(i, len(b))
+        w.close()
+
+def test_resume_archive():
+    dut, trav = adder_traverse()
+    trav.traverse([], [('a', 2, True)])
+    branches = trav.get_all_branches()
+    assert len(branches) > 1
+
+    with tempfile.TemporaryDirectory() as d:
+        fname = os.path.join(d, 'states.archive')
+        # interrupted after the first branch
+        w = StateArchiveWriter(fname, dut.simulator, False)
+        for j, s in enumerate(branches[0]):
+            w.write(0, j, s)
+        w.close()
+
+        # the traversal is run again, the branch that is there is not written twice
+        dut, trav = adder_traverse()
+        w = StateArchiveWriter(fname, dut.simulator, True)
+        assert trav.traverse_to_archive([], [('a', 2, True)], w, 1) == len(branches)
+        w.close()
+        r = StateArchiveReader(fname, dut.simulator)
+        for i, b in enumerate(branches):
+            assert [rega_values([r.read(i, j)]) for j in range(len(b))] == [rega_values([s]) for s in b]
+        assert not r.has(len(branches), 0)
+
+
+if __name__ == "__main__":
+    test_traverse_parallel()
+    test_iter_states()
+    test_traverse_to_archive()
+    test_resume_archive()
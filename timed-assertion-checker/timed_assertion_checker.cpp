@@ -1,5 +1,13 @@
 #include "timed_assertion_checker.h"
 
+#include "smt-switch/boolector_factory.h"
+
+#include <algorithm>
+#include <chrono>
+#include <exception>
+#include <thread>
+#include <unordered_set>
+
 namespace tac {
 
 verilog_expr::VExprAst::VExprAstPtr update_target_width(verilog_expr::VExprAst::VExprAstPtr& ast, wasim::SymbolicSimulator& sim)
@@ -982,15 +990,21 @@ void TimedAssertionChecker::parse_max_cycle()
     }
 }
 
-void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name)
+// simulate up to max_cycle with fresh inputs (named input name + cycle),
+// and record the term of each var at its cycle into termmap
+static void sim_and_record_vars(wasim::TransitionSystem & ts,
+                                wasim::SymbolicSimulator & sim,
+                                const std::vector<TimedAssertionChecker::Variable> & vars,
+                                int max_cycle,
+                                const std::string &rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name,
+                                std::unordered_map<std::string, smt::Term> & termmap)
 {
     int sim_cycle;
-    const auto& vars = get_var_vec();
     
     //get input var for make vdict
-    smt::UnorderedTermSet input_term_set = ts_.inputvars();
+    smt::UnorderedTermSet input_term_set = ts.inputvars();
     if (clk_sig_name != "") {
-      smt::Term clk_term = sim_.var(clk_sig_name);
+      smt::Term clk_term = sim.var(clk_sig_name);
       input_term_set.erase(clk_term);
     }
     
@@ -999,7 +1013,7 @@ void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool s
         std::cout << "--------------------------------------@" << sim_cycle << std::endl;
         if(sim_cycle != 0)
         {
-          sim_.sim_one_step();
+          sim.sim_one_step();
         }
         
         
@@ -1013,10 +1027,10 @@ void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool s
           input_vdict[rst_sig_name] = set_rst_to_0 ? 0 : 1;
         }
 
-        auto inputmap = sim_.convert(input_vdict); //input_vdict = {{"a", "a" + std::to_string(sim_cycle)}, {"b", "b" + std::to_string(sim_cycle)}}
-        sim_.set_input(inputmap, {}); 
+        auto inputmap = sim.convert(input_vdict); //input_vdict = {{"a", "a" + std::to_string(sim_cycle)}, {"b", "b" + std::to_string(sim_cycle)}}
+        sim.set_input(inputmap, {}); 
 
-        auto s = sim_.get_curr_state();
+        auto s = sim.get_curr_state();
         std::cout << s.print();  //print state value
         std::cout << s.print_assumptions(); //print state assumption
 
@@ -1031,7 +1045,7 @@ void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool s
             {
               if( (input.first -> to_string()) == vars[j].name)
               {
-                ass_termmap[vars[j].fullname] = input.second;
+                termmap[vars[j].fullname] = input.second;
                 skip = true;
                 break;
               }
@@ -1043,13 +1057,18 @@ void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool s
             }
 
             //get term from sim var
-            auto out_term = sim_.var(vars[j].name);  //get var term name
-            ass_termmap[vars[j].fullname] = sim_.interpret_state_expr_on_curr_frame(out_term);
+            auto out_term = sim.var(vars[j].name);  //get var term name
+            termmap[vars[j].fullname] = sim.interpret_state_expr_on_curr_frame(out_term);
           }
         }
     }
 }
 
+void TimedAssertionChecker::sim_max_step(const std::string &rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name)
+{
+    sim_and_record_vars(ts_, sim_, get_var_vec(), max_cycle, rst_sig_name, set_rst_to_0, clk_sig_name, ass_termmap);
+}
+
 void TimedAssertionChecker::print_term_map(){
   std::cout << "-----------------we got the symbolic term----------------" << std::endl;
   std::cout << "---------------------------------------------------------" << std::endl;
@@ -1112,6 +1131,131 @@ void TimedAssertionChecker::check_sat(){
     }
 }
 
+//class TimedAssertionBatchChecker
+TimedAssertionBatchChecker::TimedAssertionBatchChecker(const std::vector<std::string> & verilog_assertions, wasim::TransitionSystem & ts, wasim::SymbolicSimulator& sim, smt::SmtSolver solver)
+    : ts_(ts), sim_(sim), solver_(solver), verilog_assertions_(verilog_assertions), max_cycle(0)
+{
+  std::unordered_set<std::string> seen;
+  for (const auto & assertion : verilog_assertions) {
+    checkers.emplace_back(new TimedAssertionChecker(assertion, ts, sim, solver));
+    const auto & checker = *checkers.back();
+    max_cycle = std::max(max_cycle, checker.get_max_cycle());
+    for (const auto & var_struct : checker.get_var_vec())
+      if (seen.insert(var_struct.fullname).second)
+        var_struct_vec.push_back(var_struct);
+  }
+}
+
+void TimedAssertionBatchChecker::sim_max_step(const std::string &rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name)
+{
+    sim_and_record_vars(ts_, sim_, var_struct_vec, max_cycle, rst_sig_name, set_rst_to_0, clk_sig_name, ass_termmap);
+}
 
+void TimedAssertionBatchChecker::print_term_map(){
+  std::cout << "-----------------we got the symbolic term----------------" << std::endl;
+  std::cout << "---------------------------------------------------------" << std::endl;
+  std::cout << "term <-> symbolic term" << std::endl;
+  for(const auto &var_term : ass_termmap)
+  {
+    std::cout << var_term.first << " <-> " << var_term.second << std::endl;
+  }
+  std::cout << "---------------------------------------------------------" << std::endl;
+}
+
+void TimedAssertionBatchChecker::make_assertion_terms(){
+  for (auto & checker : checkers) {
+    // each checker only looks up its own vars
+    checker->ass_termmap = ass_termmap;
+    checker->make_assertion_term();
+  }
+}
+
+const std::vector<TimedAssertionBatchChecker::Result> & TimedAssertionBatchChecker::check_all(unsigned num_threads, const SolverMaker & make_solver)
+{
+  results.clear();
+  for (size_t i = 0; i < checkers.size(); ++i)
+    results.push_back({verilog_assertions_.at(i), smt::Result(), 0.0});
+  if (checkers.empty())
+    return results;
+
+  if (num_threads == 0)
+    num_threads = std::max(1u, std::thread::hardware_concurrency());
+  if (num_threads > checkers.size())
+    num_threads = checkers.size();
+
+  // the query of assertion i : assumptions and not(assertion)
+  auto check_one = [](const smt::SmtSolver & solver, const smt::TermVec & assumptions, const smt::Term & not_assertion, Result & res) {
+    smt::TermVec query(assumptions);
+    query.push_back(not_assertion);
+    auto start = std::chrono::steady_clock::now();
+    res.result = solver -> check_sat_assuming(query);
+    res.seconds = std::chrono::duration<double>(std::chrono::steady_clock::now() - start).count();
+  };
+
+  auto assumptions = sim_.all_assumptions();
+  if (num_threads == 1) {
+    for (size_t i = 0; i < checkers.size(); ++i)
+      check_one(solver_, assumptions, solver_ -> make_term(smt::PrimOp::Not, checkers.at(i) -> get_sub_assertion_term()), results.at(i));
+    return results;
+  }
+
+  // the terms are translated here, reading the terms of solver_ is not
+  // thread-safe; a worker only uses its own solver
+  struct Worker {
+    smt::SmtSolver solver;
+    smt::TermVec assumptions;
+    std::vector<std::pair<size_t, smt::Term>> queries;  // index, not(assertion)
+    std::exception_ptr error;
+  };
+  std::vector<Worker> workers(num_threads);
+  for (unsigned t = 0; t < num_threads; ++t) {
+    auto & w = workers.at(t);
+    if (make_solver)
+      w.solver = make_solver();
+    else {
+      w.solver = smt::BoolectorSolverFactory::create(false);
+      w.solver -> set_logic("QF_UFBV");
+      w.solver -> set_opt("incremental", "true");
+    }
+    smt::TermTranslator translator(w.solver);
+    for (const auto & a : assumptions)
+      w.assumptions.push_back(translator.transfer_term(a));
+    for (size_t i = t; i < checkers.size(); i += num_threads) {
+      auto not_assertion = solver_ -> make_term(smt::PrimOp::Not, checkers.at(i) -> get_sub_assertion_term());
+      w.queries.emplace_back(i, translator.transfer_term(not_assertion));
+    }
+  }
+
+  std::vector<std::thread> threads;
+  for (auto & w : workers)
+    threads.emplace_back([&w, &check_one, this]() {
+      try {
+        for (const auto & q : w.queries)
+          check_one(w.solver, w.assumptions, q.second, results.at(q.first));
+      } catch (...) {
+        w.error = std::current_exception();
+      }
+    });
+  for (auto & th : threads)
+    th.join();
+  for (const auto & w : workers)
+    if (w.error)
+      std::rethrow_exception(w.error);
+  return results;
+}
+
+void TimedAssertionBatchChecker::print_results() const{
+  std::cout << "---------------------------------------------------------" << std::endl;
+  for (const auto & res : results) {
+    if (res.result.is_sat())
+      std::cout << "X |" << " assert(" + res.assertion + ") | the equation isn't always correct and has counter-example";
+    else if (res.result.is_unsat())
+      std::cout << "√ |" << " assert(" + res.assertion + ") | the equation is always correct";
+    else
+      std::cout << "? |" << " assert(" + res.assertion + ") | " << res.result;
+    std::cout << " (" << res.seconds << " s)" << std::endl;
+  }
+  std::cout << "---------------------------------------------------------" << std::endl;
+}
 
 }   //namespace tac
\ No newline at end of file
@@ -1,6 +1,9 @@
 #pragma once 
+#include <functional>
+#include <memory>
 #include <string>
 #include <unordered_map>
+#include <vector>
 
 #include "vexpparser/interpreter.h"
 #include "smt-switch/smt.h"
@@ -79,4 +82,66 @@ private:
     smt::UnorderedTermMap create_substitution_map();
 };
 
+// check many timed assertions against one simulation: the design is
+// simulated once, up to the max cycle of all of them, each assertion term
+// is made from the shared ass_termmap, and the checks are spread over
+// worker threads, each with a solver of its own
+class TimedAssertionBatchChecker {
+public:
+    typedef std::function<smt::SmtSolver()> SolverMaker;
+    struct Result
+    {
+        std::string assertion;
+        smt::Result result;   // sat : there is a counter-example
+        double seconds;       // time spent in the solver
+        bool holds() const { return result.is_unsat(); }
+    };
+    std::unordered_map<std::string, smt::Term> ass_termmap;
+
+    // parse each assertion, like TimedAssertionChecker
+    TimedAssertionBatchChecker(const std::vector<std::string> & verilog_assertions, wasim::TransitionSystem & ts, wasim::SymbolicSimulator& sim, smt::SmtSolver solver);
+
+    //sim once to the max cycle and catch the vars of all assertions
+    void sim_max_step(const std::string &rst_sig_name, bool set_rst_to_0, const std::string & clk_sig_name);
+
+    //after sim_max_step, print var <-> symbolic map
+    void print_term_map();
+
+    //make all assertion terms from ass_termmap
+    void make_assertion_terms();
+
+    //check all assertions (under the assumptions of the simulator) with
+    //num_threads workers (0 : the number of cores), make_solver creates the
+    //solver of a worker (Boolector if empty); a single worker uses the solver
+    //of the checker
+    const std::vector<Result> & check_all(unsigned num_threads = 0, const SolverMaker & make_solver = SolverMaker());
+
+    //print the result of each assertion
+    void print_results() const;
+
+    const std::vector<Result> & get_results() const {return results;}
+
+    //the checker of assertion i
+    TimedAssertionChecker & get_checker(size_t i) {return *checkers.at(i);}
+    size_t size() const {return checkers.size();}
+
+    //get sim var struct (of all assertions, each var once)
+    const std::vector<TimedAssertionChecker::Variable> & get_var_vec() const {return var_struct_vec;}
+
+    //get max sim cycle
+    int get_max_cycle() const {return max_cycle;}
+
+protected:
+    wasim::TransitionSystem & ts_;
+    wasim::SymbolicSimulator& sim_;
+    smt::SmtSolver solver_;
+
+private:
+    std::vector<std::string> verilog_assertions_;
+    std::vector<std::unique_ptr<TimedAssertionChecker>> checkers;
+    std::vector<TimedAssertionChecker::Variable> var_struct_vec;
+    int max_cycle;
+    std::vector<Result> results;
+};
+
 }   //namespace tac
\ No newline at end of file